@@ -0,0 +1,96 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Per-command dispatch overhead of runtimeHub, two measures:
+# dispatch: protocol message in, command found
+# total: protocol message in, command found, executed and its reply taken back
+# fresh: a new command is built for every request (commandRegistry.createCommand, as the previous if/elif chain did)
+# registry: commandRegistry.findCommand, reusable commands are built once and handed the new parameters
+# No remote client is involved, replies are taken off the internal protocol queue.
+# Usage: python dispatchBenchmark.py [numberOfRequests] [rounds]
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../lib/comm/")
+sys.path.append("../lib/util/")
+sys.path.append("../lib/exception/")
+sys.path.append("../runtime/")
+import os
+import time
+from runtimeHub import runtimeHub
+from comm.streamTransport import streamTransport
+
+# Requests that stay off the network
+_REQUEST_LIST = [
+    ["p", "bench/topic", "payload", "0", "0"],
+    ["g", "", "", "", ""],
+    ["z"],
+    ["yp", "sub", "3"],
+    ["pq", "0", "1"],
+    ["cs", "256", "0", "0"]
+]
+
+
+def _dispatchRound(srcFind, srcProtocolMessage, srcNumberOfRequests):
+    startTime = time.time()
+    for i in range(0, srcNumberOfRequests):
+        srcFind(list(srcProtocolMessage))
+    return time.time() - startTime
+
+
+def _totalRound(srcHub, srcFind, srcProtocolMessage, srcNumberOfRequests):
+    server = srcHub.getSerialCommunicationServer()
+    startTime = time.time()
+    for i in range(0, srcNumberOfRequests):
+        currentCommand = srcFind(list(srcProtocolMessage))
+        srcHub._executeCommand(currentCommand)
+        server.takeInternalProtocol()
+    return time.time() - startTime
+
+
+def runBenchmark(srcNumberOfRequests, srcRounds):
+    readFileDescriptor, writeFileDescriptor = os.pipe()
+    hub = runtimeHub("dispatchBenchmark", "./", streamTransport(readFileDescriptor))
+    registry = hub.getCommandRegistry()
+    # An offline mqttCore so that "p" goes into the offline publish queue
+    hub._findCommand(["i", "dispatchBenchmark", "1", "4", "0"])
+    results = dict()
+    try:
+        for protocolMessage in _REQUEST_LIST:
+            totals = [[], [], [], []]  # fresh dispatch, registry dispatch, fresh total, registry total
+            # Alternate between the two to even out noise
+            for i in range(0, srcRounds):
+                totals[0].append(_dispatchRound(registry.createCommand, protocolMessage, srcNumberOfRequests))
+                totals[1].append(_dispatchRound(registry.findCommand, protocolMessage, srcNumberOfRequests))
+                totals[2].append(_totalRound(hub, registry.createCommand, protocolMessage, srcNumberOfRequests))
+                totals[3].append(_totalRound(hub, registry.findCommand, protocolMessage, srcNumberOfRequests))
+            results[protocolMessage[0]] = [min(roundTimes) / srcNumberOfRequests for roundTimes in totals]
+    finally:
+        os.close(readFileDescriptor)
+        os.close(writeFileDescriptor)
+    return results
+
+
+if __name__ == "__main__":
+    numberOfRequests = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print("Requests per round: " + str(numberOfRequests) + ", rounds: " + str(rounds) + " (best round)")
+    print("%-8s %26s %26s" % ("", "dispatch (us)", "total (us)"))
+    print("%-8s %12s %13s %12s %13s" % ("command", "fresh", "registry", "fresh", "registry"))
+    results = runBenchmark(numberOfRequests, rounds)
+    for protocolMessage in _REQUEST_LIST:
+        print("%-8s %12.2f %13.2f %12.2f %13.2f" % tuple([protocolMessage[0]] + [roundTime * 1000000 for roundTime in results[protocolMessage[0]]]))
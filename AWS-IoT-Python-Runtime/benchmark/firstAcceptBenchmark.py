@@ -0,0 +1,80 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Time to first accept: from launching "python run.py" until the runtime has served the first request from the sketch.
+# No Arduino Yun and no AWS IoT endpoint needed.
+# interpreter: "python -c pass", the part of every launch that the runtime cannot do anything about.
+# first accept: run.py up and the first yield served, the sketch is no longer blocked on the Bridge.
+# setup: the first yield followed by "i", which is where mqttCore, paho and ssl get imported now.
+# With a limit (ms), the first accept median is checked against it and the exit status is 1 when it goes over,
+# so that a regression in startup time fails the run.
+# Usage: python firstAcceptBenchmark.py [rounds] [limitMs]
+
+import sys
+import os
+import time
+import subprocess
+from sketchEmulator import sketchEmulator
+
+_RUNTIME_DIRECTORY = os.path.abspath("../runtime/")
+
+
+def _median(srcList):
+    return sorted(srcList)[len(srcList) // 2]
+
+
+def _interpreterRound():
+    startTime = time.time()
+    subprocess.call([sys.executable, "-c", "pass"])
+    return time.time() - startTime
+
+
+def _runtimeRound(srcIsSetup):
+    startTime = time.time()
+    process = subprocess.Popen([sys.executable, "run.py"], cwd=_RUNTIME_DIRECTORY, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    emulator = sketchEmulator(process.stdin, process.stdout)
+    emulator.yieldMessages()
+    if srcIsSetup:
+        reply = emulator.setup("firstAcceptBenchmark")
+        if reply is None or not reply.startswith("I T"):
+            raise RuntimeError("Unexpected reply: " + str(reply) + ", expecting: I T")
+    readyTime = time.time() - startTime
+    emulator.exitRuntime()
+    process.stdin.close()
+    process.wait()
+    return readyTime
+
+
+def runBenchmark(srcRounds):
+    interpreterTimes = [_interpreterRound() for i in range(0, srcRounds)]
+    firstAcceptTimes = [_runtimeRound(False) for i in range(0, srcRounds)]
+    setupTimes = [_runtimeRound(True) for i in range(0, srcRounds)]
+    return _median(interpreterTimes), _median(firstAcceptTimes), _median(setupTimes)
+
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    limitMs = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    print("Rounds: " + str(rounds) + " (median)")
+    interpreterTime, firstAcceptTime, setupTime = runBenchmark(rounds)
+    print("%-14s %12s" % ("stage", "time (ms)"))
+    print("%-14s %12.1f" % ("interpreter", interpreterTime * 1000))
+    print("%-14s %12.1f   (runtime: %.1f)" % ("first accept", firstAcceptTime * 1000, (firstAcceptTime - interpreterTime) * 1000))
+    print("%-14s %12.1f" % ("setup", setupTime * 1000))
+    if limitMs is not None and firstAcceptTime * 1000 > limitMs:
+        print("First accept over the limit of %.1f ms" % limitMs)
+        sys.exit(1)
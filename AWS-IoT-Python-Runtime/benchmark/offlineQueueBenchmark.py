@@ -0,0 +1,115 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Offline publish queue benchmark: list with pop(0) (previous runtime) vs. offlinePublishQueue (deque).
+# Publish requests are queued through mqttCore.publish while offline and drained by mqttCore._doPublishDraining,
+# with paho's publish replaced by a no-op and no draining interval.
+# A second run queues them into a queue bounded to a tenth of them that drops the oldest.
+# Usage: python offlineQueueBenchmark.py [numberOfMessages] [payloadSize]
+
+import sys
+sys.path.append("../lib/")
+import time
+from util.logManager import logManager
+from util.offlinePublishQueue import offlinePublishQueue
+from protocol.mqttCore import mqttCore
+from protocol.paho.client import MQTTv311
+
+
+# Reference implementation of the previous queue: a list, popped from the head, with the drop count mqttCore logs
+class _listPublishQueue(list):
+
+    def __init__(self, srcMaximumSize, srcDropBehavior=1):
+        list.__init__(self)
+        self._maximumSize = srcMaximumSize
+        self._dropBehavior = srcDropBehavior
+        self._droppedCount = 0
+
+    def getDroppedCount(self):
+        return self._droppedCount
+
+    def append(self, srcData):
+        if self._maximumSize > 0 and len(self) >= self._maximumSize:
+            self._droppedCount += 1
+            if self._dropBehavior == 1:
+                return False
+            list.pop(self, 0)
+            list.append(self, srcData)
+            return False
+        list.append(self, srcData)
+        return True
+
+    def popleft(self):
+        return list.pop(self, 0)
+
+
+def _newMQTTCore(srcQueue):
+    log = logManager("offlineQueueBenchmark", "./")
+    log.disable()
+    core = mqttCore("offlineQueueBenchmark", True, MQTTv311, log)
+    core._offlinePublishQueue = srcQueue
+    core._pahoClient.publish = lambda topic, payload, qos, retain: (0, 1)
+    core.setDrainingIntervalSecond(0)
+    return core
+
+
+def _queue(srcCore, srcNumberOfMessages, srcPayload):
+    startTime = time.time()
+    for i in range(0, srcNumberOfMessages):
+        try:
+            srcCore.publish("benchmark/topic", srcPayload, 1, False)
+        except Exception:
+            pass  # Queue full
+    return time.time() - startTime
+
+
+def runBenchmark(srcNumberOfMessages, srcPayloadSize):
+    payload = "x" * srcPayloadSize
+    results = dict()
+    for name in ["list", "deque"]:
+        # Unbounded: queue everything, then drain it
+        if name == "list":
+            core = _newMQTTCore(_listPublishQueue(0))
+        else:
+            core = _newMQTTCore(offlinePublishQueue(0))
+        enqueueTime = _queue(core, srcNumberOfMessages, payload)
+        startTime = time.time()
+        core._doPublishDraining()
+        drainTime = time.time() - startTime
+        # Bounded to a tenth, dropping the oldest
+        if name == "list":
+            core = _newMQTTCore(_listPublishQueue(srcNumberOfMessages / 10, 0))
+        else:
+            core = _newMQTTCore(offlinePublishQueue(srcNumberOfMessages / 10, 0, (srcNumberOfMessages / 10) * (srcPayloadSize + len("benchmark/topic"))))
+        boundedTime = _queue(core, srcNumberOfMessages, payload)
+        dropCounts = (core._offlinePublishQueue.getDroppedCount(), -1)  # No byte count in the list
+        if name == "deque":
+            dropCounts = core.getOfflinePublishQueueDropCounts()
+        results[name] = (enqueueTime, drainTime, boundedTime, dropCounts)
+    return results
+
+
+if __name__ == "__main__":
+    numberOfMessages = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    payloadSize = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    print("Queued publish requests: " + str(numberOfMessages) + ", payload size: " + str(payloadSize) + " bytes")
+    print("%-6s %14s %14s %20s %10s %14s" % ("queue", "enqueue (ms)", "drain (ms)", "bounded enqueue (ms)", "dropped", "dropped bytes"))
+    results = runBenchmark(numberOfMessages, payloadSize)
+    for name in ["list", "deque"]:
+        enqueueTime, drainTime, boundedTime, dropCounts = results[name]
+        droppedBytes = "-" if dropCounts[1] < 0 else str(dropCounts[1])
+        print("%-6s %14.2f %14.2f %20.2f %10d %14s" % (name, enqueueTime * 1000, drainTime * 1000, boundedTime * 1000, dropCounts[0], droppedBytes))
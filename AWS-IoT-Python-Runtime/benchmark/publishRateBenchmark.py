@@ -0,0 +1,113 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Publish rate benchmark of mqttCore: fixed draining interval (no rate limit) vs. token-bucket rate limit.
+# Draining: requests are queued while offline, then drained while the sketch keeps publishing at the producer rate
+# (those are queued too until the draining completes). Reports the sustained throughput and the peak queue depth.
+# Live: requests are published back to back while connected, those over the rate limit are queued and drained.
+# Reports the time the caller spent publishing, the time until paho got them all and the highest number of them
+# paho got within any one second, which is what a broker-side throttle sees.
+# Paho's publish is replaced by a recorder.
+# Usage: python publishRateBenchmark.py [queuedMessages] [ratePerSecond] [burst] [drainingIntervalSecond] [producerRatePerSecond]
+
+import sys
+sys.path.append("../lib/")
+import time
+import threading
+from util.logManager import logManager
+from util.offlinePublishQueue import offlinePublishQueue
+from protocol.mqttCore import mqttCore
+from protocol.paho.client import MQTTv311
+
+
+def _newMQTTCore(srcPublishTimeList):
+    log = logManager("publishRateBenchmark", "./")
+    log.disable()
+    core = mqttCore("publishRateBenchmark", True, MQTTv311, log)
+    core._offlinePublishQueue = offlinePublishQueue(0)
+    core._pahoClient.publish = lambda topic, payload, qos, retain: (srcPublishTimeList.append(time.time()), (0, 1))[1]
+    return core
+
+
+def _peakPerSecond(srcPublishTimeList):
+    # Highest number of publish requests within a one-second window
+    peak = 0
+    windowStart = 0
+    for i in range(0, len(srcPublishTimeList)):
+        while srcPublishTimeList[i] - srcPublishTimeList[windowStart] >= 1.0:
+            windowStart += 1
+        peak = max(peak, i - windowStart + 1)
+    return peak
+
+
+def _produce(srcCore, srcNumberOfMessages, srcRatePerSecond):
+    for i in range(0, srcNumberOfMessages):
+        srcCore.publish("benchmark/topic", "produced-%d" % i, 1, False)
+        time.sleep(1.0 / srcRatePerSecond)
+
+
+def _drainingRound(srcQueuedMessages, srcRatePerSecond, srcBurst, srcDrainingIntervalSecond, srcProducerRatePerSecond):
+    publishTimeList = []
+    core = _newMQTTCore(publishTimeList)
+    core.setDrainingIntervalSecond(srcDrainingIntervalSecond)
+    core.setPublishRateLimit(srcRatePerSecond, srcBurst)
+    core._drainingComplete = False  # As left by on_disconnect
+    for i in range(0, srcQueuedMessages):
+        core.publish("benchmark/topic", "queued-%d" % i, 1, False)
+    # Back online
+    core._connectResultCode = 0
+    producerThread = threading.Thread(target=_produce, args=[core, srcQueuedMessages / 2, srcProducerRatePerSecond])
+    startTime = time.time()
+    producerThread.start()
+    core._doPublishDraining()
+    drainingTime = time.time() - startTime
+    producerThread.join()
+    publishedCount, drainingThroughput, peakQueueDepth = core.getPublishStatistics()
+    return publishedCount, drainingTime, drainingThroughput, peakQueueDepth, _peakPerSecond(publishTimeList)
+
+
+def _liveRound(srcNumberOfMessages, srcRatePerSecond, srcBurst):
+    publishTimeList = []
+    core = _newMQTTCore(publishTimeList)
+    core.setPublishRateLimit(srcRatePerSecond, srcBurst)
+    core._connectResultCode = 0
+    startTime = time.time()
+    for i in range(0, srcNumberOfMessages):
+        core.publish("benchmark/topic", "live-%d" % i, 1, False)
+    callerTime = time.time() - startTime
+    while len(publishTimeList) < srcNumberOfMessages:
+        time.sleep(0.01)
+    return callerTime, time.time() - startTime, _peakPerSecond(publishTimeList)
+
+
+if __name__ == "__main__":
+    queuedMessages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    ratePerSecond = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    burst = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    drainingIntervalSecond = float(sys.argv[4]) if len(sys.argv) > 4 else 0.05
+    producerRatePerSecond = float(sys.argv[5]) if len(sys.argv) > 5 else 20
+    print("Queued: " + str(queuedMessages) + ", produced while draining: " + str(queuedMessages / 2) + " at " + str(producerRatePerSecond) + "/s")
+    print("%-24s %10s %10s %16s %12s %14s" % ("draining", "published", "time (s)", "throughput (/s)", "peak depth", "peak in 1 s"))
+    for name, rate, intervalSecond in [("interval " + str(drainingIntervalSecond) + " s", 0, drainingIntervalSecond), ("rate " + str(ratePerSecond) + "/s burst " + str(burst), ratePerSecond, drainingIntervalSecond)]:
+        publishedCount, drainingTime, drainingThroughput, peakQueueDepth, peakPerSecond = _drainingRound(queuedMessages, rate, burst, intervalSecond, producerRatePerSecond)
+        print("%-24s %10d %10.2f %16.1f %12d %14d" % (name, publishedCount, drainingTime, drainingThroughput, peakQueueDepth, peakPerSecond))
+    print("")
+    print("Live: " + str(queuedMessages) + " back to back")
+    print("%-24s %10s %10s %14s" % ("publish", "caller (s)", "total (s)", "peak in 1 s"))
+    for name, rate in [("no limit", 0), ("rate " + str(ratePerSecond) + "/s burst " + str(burst), ratePerSecond)]:
+        callerTime, liveTime, peakPerSecond = _liveRound(queuedMessages, rate, burst)
+        print("%-24s %10.2f %10.2f %14d" % (name, callerTime, liveTime, peakPerSecond))
@@ -0,0 +1,132 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Sketch reset to first message, with and without daemon mode. No Arduino Yun and no AWS IoT endpoint needed.
+# Each round is what the sketch does after a reset: launch run.py through the Bridge, then talk to it over stdin/stdout.
+# cold: "python run.py", a new runtime does its imports, "i" and "pq", then the first yield.
+#       Its first message also needs a TLS handshake, CONNACK and SUBACK, which are left out without an endpoint,
+#       so the cold figure is a lower bound.
+# daemon: "python run.py --attach <path>" to a daemon that kept its state, "ra", then the first yield.
+#         One message comes in while the sketch is away and is waiting in the daemon.
+# The daemon runs in this process so that the message can be queued while no sketch is attached.
+# Usage: python reattachBenchmark.py [rounds]
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../lib/comm/")
+sys.path.append("../lib/util/")
+sys.path.append("../lib/exception/")
+sys.path.append("../runtime/")
+import os
+import time
+import tempfile
+import threading
+import subprocess
+from runtimeHub import runtimeHub
+from comm.streamTransport import socketListener
+from sketchEmulator import sketchEmulator
+
+_RUNTIME_DIRECTORY = os.path.abspath("../runtime/")
+
+
+def _median(srcList):
+    return sorted(srcList)[len(srcList) // 2]
+
+
+def _expect(srcReply, srcPrefix):
+    if srcReply is None or not srcReply.startswith(srcPrefix):
+        raise RuntimeError("Unexpected reply: " + str(srcReply) + ", expecting: " + srcPrefix)
+
+
+def _launch(srcArgumentList):
+    # Launch run.py the way the Bridge does, return the process and a sketch talking to it
+    process = subprocess.Popen([sys.executable, "run.py"] + srcArgumentList, cwd=_RUNTIME_DIRECTORY, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    return process, sketchEmulator(process.stdin, process.stdout)
+
+
+def _close(srcProcess):
+    srcProcess.stdin.close()
+    srcProcess.wait()
+
+
+def _coldRound():
+    startTime = time.time()
+    process, emulator = _launch([])
+    _expect(emulator.setup("reattachBenchmark"), "I T")
+    _expect(emulator.configOfflinePublishQueue(0, 1), "PQ T")
+    emulator.yieldMessages()
+    readyTime = time.time() - startTime
+    emulator.exitRuntime()
+    _close(process)
+    return readyTime
+
+
+def _daemonRound(srcHub, srcPath, srcPayload):
+    srcHub.getSerialCommunicationServer().writeToInternalYield(0, srcPayload)  # Arrived while the sketch was away
+    startTime = time.time()
+    process, emulator = _launch(["--attach", srcPath])
+    _expect(emulator.reattach(), "RA T")
+    if emulator.yieldMessages() != 1:
+        raise RuntimeError("The queued message did not come through.")
+    firstMessageTime = time.time() - startTime
+    _close(process)  # Sketch reset, the daemon keeps going
+    return firstMessageTime
+
+
+def _serveDaemon(srcListener, srcHubList):
+    # Same as run.py --daemon, one remote client at a time on the same runtimeHub
+    while True:
+        transport = srcListener.acceptTransport()
+        try:
+            if len(srcHubList) == 0:
+                srcHubList.append(runtimeHub("reattachBenchmark", "./", transport))
+            else:
+                srcHubList[0].attachTransport(transport)
+            srcHubList[0].run()
+        finally:
+            transport.close()
+
+
+def runBenchmark(srcRounds):
+    coldTimes = [_coldRound() for i in range(0, srcRounds)]
+    path = os.path.join(tempfile.mkdtemp(), "runtime.sock")
+    listener = socketListener(path)
+    hubList = []
+    daemonThread = threading.Thread(target=_serveDaemon, args=[listener, hubList])
+    daemonThread.daemon = True
+    daemonThread.start()
+    try:
+        # First attach sets the daemon up, as the very first sketch boot would
+        process, emulator = _launch(["--attach", path])
+        _expect(emulator.reattach(), "RA F")
+        _expect(emulator.setup("reattachBenchmark"), "I T")
+        _expect(emulator.configOfflinePublishQueue(0, 1), "PQ T")
+        _close(process)
+        daemonTimes = [_daemonRound(hubList[0], path, "reattachBenchmark") for i in range(0, srcRounds)]
+    finally:
+        listener.close()  # Removes the socket file
+        os.rmdir(os.path.dirname(path))
+    return _median(coldTimes), _median(daemonTimes)
+
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print("Rounds: " + str(rounds) + " (median)")
+    coldTime, daemonTime = runBenchmark(rounds)
+    print("%-8s %24s" % ("mode", "reset to ready (ms)"))
+    print("%-8s %24.1f   (lower bound: no TLS handshake, CONNACK or SUBACK)" % ("cold", coldTime * 1000))
+    print("%-8s %24.1f   (first queued message delivered)" % ("daemon", daemonTime * 1000))
@@ -0,0 +1,158 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# End-to-end benchmark of the runtime, no Arduino Yun and no AWS IoT endpoint needed.
+# runtimeHub.run() is driven by sketchEmulator over a pair of pipes, the same line protocol the sketch uses.
+# Workloads stay off the network:
+# config: "g" requests
+# publish: "p" requests while disconnected, taken by the offline publish queue (unlimited)
+# yield: messages queued straight into the yield queue, then pulled by the sketch yield loop
+# json: shadow JSON documents stored in jsonManager, then read back by key in chunks
+# Every workload runs for a fixed number of rounds with fixed payloads. Throughput is the median over rounds,
+# latency percentiles are over all requests of all rounds.
+# Usage: python runtimeBenchmark.py [numberOfRequests] [payloadSize] [rounds]
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../lib/comm/")
+sys.path.append("../lib/util/")
+sys.path.append("../lib/exception/")
+sys.path.append("../runtime/")
+import os
+import time
+import platform
+import threading
+from runtimeHub import runtimeHub
+from comm.streamTransport import streamTransport
+from sketchEmulator import sketchEmulator
+
+
+def _startRuntime():
+    requestReadFileDescriptor, requestWriteFileDescriptor = os.pipe()
+    replyReadFileDescriptor, replyWriteFileDescriptor = os.pipe()
+    hub = runtimeHub("runtimeBenchmark", "./", streamTransport(requestReadFileDescriptor, os.fdopen(replyWriteFileDescriptor, "wb")))
+    runtimeThread = threading.Thread(target=hub.run)
+    runtimeThread.daemon = True
+    runtimeThread.start()
+    emulator = sketchEmulator(os.fdopen(requestWriteFileDescriptor, "wb"), os.fdopen(replyReadFileDescriptor, "rb"))
+    return hub, runtimeThread, emulator
+
+
+def _stopRuntime(srcRuntimeThread, srcEmulator):
+    srcEmulator.exitRuntime()
+    srcRuntimeThread.join()
+
+
+def _percentile(srcSortedList, srcPercent):
+    if len(srcSortedList) == 0:
+        return 0.0
+    return srcSortedList[int(round(srcPercent / 100.0 * (len(srcSortedList) - 1)))]
+
+
+def _median(srcList):
+    return sorted(srcList)[len(srcList) // 2]
+
+
+def _expect(srcReply, srcPrefix):
+    if srcReply is None or not srcReply.startswith(srcPrefix):
+        raise RuntimeError("Unexpected reply: " + str(srcReply) + ", expecting: " + srcPrefix)
+
+
+def _configRound(srcHub, srcEmulator, srcNumberOfRequests, srcPayload):
+    startTime = time.time()
+    for i in range(0, srcNumberOfRequests):
+        _expect(srcEmulator.config("example.iot.us-east-1.amazonaws.com", 8883, "certs/rootCA.crt", "certs/private.key", "certs/cert.crt"), "G T")
+    return time.time() - startTime, srcNumberOfRequests, 0
+
+
+def _publishRound(srcHub, srcEmulator, srcNumberOfRequests, srcPayload):
+    startTime = time.time()
+    for i in range(0, srcNumberOfRequests):
+        _expect(srcEmulator.publish("sdk/benchmark", srcPayload, 0, False), "P T")
+    return time.time() - startTime, srcNumberOfRequests, 0
+
+
+def _yieldRound(srcHub, srcEmulator, srcNumberOfRequests, srcPayload):
+    # Messages come in before the round starts, the round is the sketch draining them
+    serialCommunicationServer = srcHub._serialCommunicationServerHub
+    for i in range(0, srcNumberOfRequests):
+        serialCommunicationServer.writeToInternalYield(0, srcPayload)
+    requestsBefore = len(srcEmulator.getLatencyRecords().get("y", []))
+    startTime = time.time()
+    numberOfMessages = srcEmulator.yieldMessages()
+    elapsedTime = time.time() - startTime
+    if numberOfMessages != srcNumberOfRequests:
+        raise RuntimeError("Yield delivered " + str(numberOfMessages) + " out of " + str(srcNumberOfRequests) + " messages.")
+    numberOfRequests = len(srcEmulator.getLatencyRecords()["y"]) - requestsBefore + 1  # Plus "z"
+    return elapsedTime, numberOfRequests, numberOfMessages * len(srcPayload)
+
+
+def _jsonRound(srcHub, srcEmulator, srcNumberOfRequests, srcPayload):
+    document = '{"state": {"desired": {"value": "' + srcPayload + '"}}, "version": 1}'
+    JSONIdentifier = srcHub._jsonManagerHub.storeNewJSON(document, "accepted")
+    requestsBefore = len(srcEmulator.getLatencyRecords().get("j", []))
+    startTime = time.time()
+    for i in range(0, srcNumberOfRequests):
+        reply, value = srcEmulator.getDesiredValueByKey(JSONIdentifier, "value")
+        if value is None or len(value) < len(srcPayload):
+            raise RuntimeError("Unexpected JSON value, last reply: " + reply)
+    elapsedTime = time.time() - startTime
+    return elapsedTime, len(srcEmulator.getLatencyRecords()["j"]) - requestsBefore, 0
+
+
+def _runWorkload(srcName, srcRoundFunction, srcProtocolNames, srcNumberOfRequests, srcPayload, srcRounds):
+    hub, runtimeThread, emulator = _startRuntime()
+    try:
+        _expect(emulator.setup("runtimeBenchmark"), "I T")
+        _expect(emulator.configOfflinePublishQueue(0, 1), "PQ T")
+        emulator.enableLatencyRecords()
+        srcRoundFunction(hub, emulator, min(srcNumberOfRequests, 100), srcPayload)  # Warm up
+        emulator.enableLatencyRecords()  # Start over
+        commandRates = []
+        byteRates = []
+        for i in range(0, srcRounds):
+            elapsedTime, numberOfRequests, numberOfBytes = srcRoundFunction(hub, emulator, srcNumberOfRequests, srcPayload)
+            commandRates.append(numberOfRequests / elapsedTime)
+            byteRates.append(numberOfBytes / elapsedTime)
+        latencies = []
+        for protocolName in srcProtocolNames:
+            latencies.extend(emulator.getLatencyRecords().get(protocolName, []))
+        latencies.sort()
+    finally:
+        _stopRuntime(runtimeThread, emulator)
+    return (srcName, _median(commandRates), _median(byteRates), _percentile(latencies, 50), _percentile(latencies, 90), _percentile(latencies, 99), _percentile(latencies, 100))
+
+
+def runBenchmark(srcNumberOfRequests, srcPayloadSize, srcRounds):
+    payload = "x" * srcPayloadSize
+    results = []
+    results.append(_runWorkload("config", _configRound, ["g"], srcNumberOfRequests, payload, srcRounds))
+    results.append(_runWorkload("publish", _publishRound, ["p"], srcNumberOfRequests, payload, srcRounds))
+    results.append(_runWorkload("yield", _yieldRound, ["z", "y"], srcNumberOfRequests, payload, srcRounds))
+    results.append(_runWorkload("json", _jsonRound, ["j"], srcNumberOfRequests, payload, srcRounds))
+    return results
+
+
+if __name__ == "__main__":
+    numberOfRequests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    payloadSize = int(sys.argv[2]) if len(sys.argv) > 2 else 128
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    print("Python " + platform.python_version() + " on " + platform.platform())
+    print("Requests per round: " + str(numberOfRequests) + ", payload size: " + str(payloadSize) + " bytes, rounds: " + str(rounds))
+    print("%-8s %12s %16s %10s %10s %10s %10s" % ("workload", "commands/s", "yield bytes/s", "p50 (us)", "p90 (us)", "p99 (us)", "max (us)"))
+    for name, commandRate, byteRate, p50, p90, p99, maximum in runBenchmark(numberOfRequests, payloadSize, rounds):
+        print("%-8s %12.0f %16.0f %10.0f %10.0f %10.0f %10.0f" % (name, commandRate, byteRate, p50 * 1e6, p90 * 1e6, p99 * 1e6, maximum * 1e6))
@@ -0,0 +1,108 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Throughput benchmark for the serial bridge framing: line protocol vs. binary length-prefixed frames.
+# Feeds pre-encoded publish requests through serialCommunicationServer.accept and collects the replies,
+# the same way runtimeHub.run does it. Requests come in through a pipe, replies go to an in-memory buffer.
+# Usage: python serialFramingBenchmark.py [numberOfRequests] [payloadSize]
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../lib/comm/")
+import os
+import time
+import threading
+import cStringIO
+from util.logManager import logManager
+from comm.serialCommunicationServer import serialCommunicationServer
+from comm.binaryFrame import binaryFrame
+from comm.streamTransport import streamTransport
+from command.commandPublish import commandPublish
+
+
+def _publishOpcodeTable():
+    return {commandPublish._opcode: commandPublish._commandProtocolName}
+
+
+def _encodeLineRequests(srcNumberOfRequests, srcPayload):
+    request = "\n".join(["5", "p", "sdk/benchmark", srcPayload, "0", "0"]) + "\n"
+    return request * srcNumberOfRequests
+
+
+def _encodeBinaryRequests(srcFrameHandler, srcNumberOfRequests, srcPayload):
+    request = srcFrameHandler.encodeRequest("p", ["sdk/benchmark", srcPayload, "0", "0"])
+    return request * srcNumberOfRequests
+
+
+def _feedPipe(srcWriteFileDescriptor, srcEncodedRequests):
+    written = 0
+    while written < len(srcEncodedRequests):
+        written += os.write(srcWriteFileDescriptor, srcEncodedRequests[written:written + 65536])
+    os.close(srcWriteFileDescriptor)
+
+
+def _runOnce(srcLog, srcBinaryMode, srcEncodedRequests, srcNumberOfRequests):
+    readFileDescriptor, writeFileDescriptor = os.pipe()
+    server = serialCommunicationServer(srcLog, streamTransport(readFileDescriptor))
+    if srcBinaryMode:
+        server.setOpcodeSource(_publishOpcodeTable)
+        server.setBinaryMode(True)
+        server.writeToExternalProtocol()  # Nothing to send, applies the pending mode switch
+    feeder = threading.Thread(target=_feedPipe, args=[writeFileDescriptor, srcEncodedRequests])
+    feeder.start()
+    realStdout = sys.stdout
+    sys.stdout = cStringIO.StringIO()
+    try:
+        startTime = time.time()
+        for i in range(0, srcNumberOfRequests):
+            server.accept()
+            server.writeToInternalProtocol("P T")
+            server.writeToExternalProtocol()
+        elapsedTime = time.time() - startTime
+        bytesOut = sys.stdout.tell()
+    finally:
+        sys.stdout = realStdout
+        feeder.join()
+        os.close(readFileDescriptor)
+    return elapsedTime, bytesOut
+
+
+def runBenchmark(srcNumberOfRequests, srcPayloadSize):
+    log = logManager("serialFramingBenchmark", "./")
+    log.disable()
+    payload = "x" * srcPayloadSize
+    results = []
+    # Line protocol
+    encodedRequests = _encodeLineRequests(srcNumberOfRequests, payload)
+    elapsedTime, bytesOut = _runOnce(log, False, encodedRequests, srcNumberOfRequests)
+    results.append(("line", elapsedTime, len(encodedRequests), bytesOut))
+    # Binary framing
+    frameHandler = binaryFrame()
+    frameHandler.registerOpcode(commandPublish._opcode, commandPublish._commandProtocolName)
+    encodedRequests = _encodeBinaryRequests(frameHandler, srcNumberOfRequests, payload)
+    elapsedTime, bytesOut = _runOnce(log, True, encodedRequests, srcNumberOfRequests)
+    results.append(("binary", elapsedTime, len(encodedRequests), bytesOut))
+    return results
+
+
+if __name__ == "__main__":
+    numberOfRequests = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    payloadSize = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    print("Publish requests: " + str(numberOfRequests) + ", payload size: " + str(payloadSize) + " bytes")
+    print("%-8s %12s %14s %12s %12s" % ("mode", "requests/s", "MB/s (in)", "bytes in", "bytes out"))
+    for mode, elapsedTime, bytesIn, bytesOut in runBenchmark(numberOfRequests, payloadSize):
+        print("%-8s %12.0f %14.2f %12d %12d" % (mode, numberOfRequests / elapsedTime, bytesIn / elapsedTime / 1e6, bytesIn, bytesOut))
@@ -0,0 +1,257 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Python version of the sketch side of the serial bridge (aws_iot_mqtt.cpp in AWS-IoT-Arduino-Yun-Library).
+# Requests and replies follow the same line protocol: number of lines, protocol name, parameters, then ONE reply line.
+# The Bridge echo and the fixed delays of exec_cmd are left out, so that the runtime is the only thing being measured.
+# Return values are the raw replies ("P T", "S3F: ..."), the caller decides what is a failure.
+# The latency of every request is recorded per protocol name when enabled.
+
+import time
+
+
+# Message status passed to callbacks, same as aws_iot_mqtt.h
+STATUS_NORMAL = 0
+STATUS_SHADOW_TIMEOUT = 1
+STATUS_SHADOW_ACCEPTED = 2
+STATUS_SHADOW_REJECTED = 3
+STATUS_MESSAGE_OVERFLOW = 4
+
+
+class _subGroupUnit:
+    def __init__(self):
+        self.isUsed = False
+        self.isShadowGUD = False  # Shadow get/update/delete, freed after its response
+        self.callback = None
+
+
+class sketchEmulator:
+
+    MAX_BUF_SIZE = 256
+    MAX_SUB = 15
+
+    def __init__(self, srcRequestFile, srcReplyFile):
+        # srcRequestFile: where requests are written to the runtime
+        # srcReplyFile: where replies are read from the runtime
+        if srcRequestFile is None or srcReplyFile is None:
+            raise TypeError("None type inputs detected.")
+        self._requestFile = srcRequestFile
+        self._replyFile = srcReplyFile
+        self._subGroup = [_subGroupUnit() for i in range(0, self.MAX_SUB)]
+        self._messageBuffer = ""
+        self._latencyRecords = None
+        self._bytesIn = 0
+        self._bytesOut = 0
+
+    def enableLatencyRecords(self):
+        # Drop the records so far, if any
+        self._latencyRecords = dict()
+
+    def getLatencyRecords(self):
+        # protocolName -> list of request-to-reply latencies in seconds
+        return self._latencyRecords
+
+    def getBytesIn(self):
+        # Bytes received from the runtime
+        return self._bytesIn
+
+    def getBytesOut(self):
+        # Bytes sent to the runtime
+        return self._bytesOut
+
+    def _execute(self, srcProtocolName, srcParameterList):
+        request = str(len(srcParameterList) + 1) + "\n" + srcProtocolName + "\n" + "".join([str(parameter) + "\n" for parameter in srcParameterList])
+        startTime = time.time()
+        self._requestFile.write(request)
+        self._requestFile.flush()
+        reply = self._replyFile.readline()
+        if self._latencyRecords is not None:
+            self._latencyRecords.setdefault(srcProtocolName, []).append(time.time() - startTime)
+        if reply == "":
+            raise EOFError("Runtime closed the tunnel.")
+        self._bytesOut += len(request)
+        self._bytesIn += len(reply)
+        return reply.rstrip("\n")
+
+    def _findUnusedSubGroup(self):
+        for i in range(0, self.MAX_SUB):
+            if not self._subGroup[i].isUsed:
+                return i
+        return self.MAX_SUB
+
+    def _useSubGroup(self, srcSlot, srcIsShadowGUD, srcCallback):
+        self._subGroup[srcSlot].isUsed = True
+        self._subGroup[srcSlot].isShadowGUD = srcIsShadowGUD
+        self._subGroup[srcSlot].callback = srcCallback
+
+    def _freeSubGroup(self, srcSlot):
+        self._subGroup[srcSlot] = _subGroupUnit()
+
+    # MQTT
+    def setup(self, srcClientID, srcCleanSession=True, srcMQTTVersion=4, srcUseWebsocket=False):
+        return self._execute("i", [srcClientID, int(srcCleanSession), srcMQTTVersion, int(srcUseWebsocket)])
+
+    def config(self, srcHost, srcPort, srcCAFile, srcKeyFile, srcCertFile):
+        return self._execute("g", [srcHost, srcPort, srcCAFile, srcKeyFile, srcCertFile])
+
+    def configBackoffTiming(self, srcBaseReconnectQuietTimeSecond, srcMaxReconnectQuietTimeSecond, srcStableConnectionTimeSecond):
+        return self._execute("bf", [srcBaseReconnectQuietTimeSecond, srcMaxReconnectQuietTimeSecond, srcStableConnectionTimeSecond])
+
+    def configOfflinePublishQueue(self, srcQueueSize, srcDropBehavior):
+        return self._execute("pq", [srcQueueSize, srcDropBehavior])
+
+    def configDrainingInterval(self, srcNumberOfSeconds):
+        return self._execute("di", ["%5.2f" % srcNumberOfSeconds])
+
+    def configPublishRateLimit(self, srcRatePerSecond, srcBurst):
+        return self._execute("pr", ["%.2f" % srcRatePerSecond, srcBurst])
+
+    def connect(self, srcKeepAliveInterval=60):
+        return self._execute("c", [srcKeepAliveInterval])
+
+    def publish(self, srcTopic, srcPayload, srcQos=0, srcRetain=False):
+        return self._execute("p", [srcTopic, srcPayload, srcQos, int(srcRetain)])
+
+    def subscribe(self, srcTopic, srcQos, srcCallback):
+        slot = self._findUnusedSubGroup()
+        if slot == self.MAX_SUB:
+            return None  # Out of sketch subscribe memory
+        ret = self._execute("s", [srcTopic, srcQos, slot])
+        if ret.startswith("S T"):
+            self._useSubGroup(slot, False, srcCallback)
+        return ret
+
+    def unsubscribe(self, srcTopic):
+        ret = self._execute("u", [srcTopic])
+        fragments = ret.split(" ")
+        if fragments[0] == "U" and len(fragments) > 1 and fragments[1].isdigit() and int(fragments[1]) < self.MAX_SUB:
+            self._freeSubGroup(int(fragments[1]))
+        return ret
+
+    def disconnect(self):
+        return self._execute("d", [])
+
+    def yieldMessages(self):
+        # Lock the queue, then pull chunks until "Y F", same as aws_iot_mqtt_client::yield
+        # Return the number of messages handed to callbacks
+        # Raise ValueError on a broken protocol
+        numberOfMessages = 0
+        if not self._execute("z", []).startswith("Z T"):
+            raise ValueError("Yield error: " + "lock failed.")
+        while True:
+            reply = self._execute("y", [])
+            if reply.startswith("Y F"):
+                break
+            fragments = reply.split(" ", 3)
+            if fragments[0] != "Y" or len(fragments) < 3 or fragments[2] not in ["0", "1"]:
+                raise ValueError("Yield error: " + reply)
+            slot = int(fragments[1])
+            self._messageBuffer += fragments[3] if len(fragments) == 4 else ""
+            if fragments[2] == "0":
+                self._deliverMessage(slot)
+                numberOfMessages += 1
+        return numberOfMessages
+
+    def _deliverMessage(self, srcSlot):
+        message = self._messageBuffer
+        self._messageBuffer = ""
+        if srcSlot < 0 or srcSlot >= self.MAX_SUB or not self._subGroup[srcSlot].isUsed:
+            return
+        currentUnit = self._subGroup[srcSlot]
+        if currentUnit.callback is not None:
+            if len(message) > self.MAX_BUF_SIZE:
+                currentUnit.callback("OUT OF BUFFER SIZE", STATUS_MESSAGE_OVERFLOW)
+            elif not currentUnit.isShadowGUD:
+                currentUnit.callback(message, STATUS_NORMAL)
+            elif message.startswith("JSON-X"):
+                currentUnit.callback(message, STATUS_SHADOW_TIMEOUT)
+            elif int(message[5:]) % 3 == 0:
+                currentUnit.callback(message, STATUS_SHADOW_ACCEPTED)
+            else:
+                currentUnit.callback(message, STATUS_SHADOW_REJECTED)
+        if currentUnit.isShadowGUD:
+            self._freeSubGroup(srcSlot)
+
+    # Shadow
+    def shadowInit(self, srcThingName):
+        return self._execute("si", [srcThingName, 1])
+
+    def _shadowRequest(self, srcProtocolName, srcParameterListBeforeSlot, srcCallback, srcTimeout):
+        slot = self._findUnusedSubGroup()
+        if slot == self.MAX_SUB:
+            return None  # Out of sketch subscribe memory
+        ret = self._execute(srcProtocolName, srcParameterListBeforeSlot + [slot, srcTimeout])
+        if ret.startswith(srcProtocolName.upper() + " T"):
+            self._useSubGroup(slot, True, srcCallback)
+        return ret
+
+    def shadowGet(self, srcThingName, srcCallback, srcTimeout):
+        return self._shadowRequest("sg", [srcThingName], srcCallback, srcTimeout)
+
+    def shadowUpdate(self, srcThingName, srcPayload, srcCallback, srcTimeout):
+        return self._shadowRequest("su", [srcThingName, srcPayload], srcCallback, srcTimeout)
+
+    def shadowDelete(self, srcThingName, srcCallback, srcTimeout):
+        return self._shadowRequest("sd", [srcThingName], srcCallback, srcTimeout)
+
+    def shadowRegisterDeltaFunc(self, srcThingName, srcCallback):
+        slot = self._findUnusedSubGroup()
+        if slot == self.MAX_SUB:
+            return None  # Out of sketch subscribe memory
+        ret = self._execute("s_rd", [srcThingName, slot])
+        if ret.startswith("S_RD T"):
+            self._useSubGroup(slot, False, srcCallback)
+        return ret
+
+    def shadowUnregisterDeltaFunc(self, srcThingName):
+        ret = self._execute("s_ud", [srcThingName])
+        fragments = ret.split(" ")
+        if fragments[0] == "S_UD" and len(fragments) > 1 and fragments[1].isdigit() and int(fragments[1]) < self.MAX_SUB:
+            self._freeSubGroup(int(fragments[1]))
+        return ret
+
+    # JSON
+    def getValueByKey(self, srcJSONIdentifier, srcKey):
+        # Return (reply of the last request, value), value is None on failure
+        value = ""
+        isFirst = 1
+        while True:
+            reply = self._execute("j", [srcJSONIdentifier, srcKey, isFirst])
+            isFirst = 0
+            if reply.startswith("J0F"):
+                return reply, value
+            if not reply.startswith("J "):
+                return reply, None  # J1F/J2F/J3F/JFF
+            value += reply[2:]
+
+    def getDesiredValueByKey(self, srcJSONIdentifier, srcKey):
+        return self.getValueByKey(srcJSONIdentifier, "state\"desired\"" + srcKey)
+
+    def getReportedValueByKey(self, srcJSONIdentifier, srcKey):
+        return self.getValueByKey(srcJSONIdentifier, "state\"reported\"" + srcKey)
+
+    def getDeltaValueByKey(self, srcJSONIdentifier, srcKey):
+        return self.getValueByKey(srcJSONIdentifier, "state\"" + srcKey)
+
+    def reattach(self):
+        # "RA T <connected> <numberOfSubscriptions> <numberOfDeviceShadows>" from a daemon with state, "RA F" otherwise
+        return self._execute("ra", [])
+
+    def exitRuntime(self):
+        # "~" has no reply
+        self._requestFile.write("1\n~\n")
+        self._requestFile.flush()
@@ -0,0 +1,90 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Startup profile of the runtime: what it costs to get from "python run.py" to the first accept.
+# Every import made while loading runtimeHub and building it is timed through an __import__ hook:
+# self: time spent in the module itself, total: including the modules it imports for the first time.
+# Only first imports are counted, later imports of a loaded module are dictionary lookups.
+# Usage: python startupProfile.py [numberOfModulesToShow]
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../lib/comm/")
+sys.path.append("../lib/util/")
+sys.path.append("../lib/exception/")
+sys.path.append("../runtime/")
+import os
+import time
+import __builtin__
+
+
+class _importProfiler:
+
+    def __init__(self):
+        self._originalImport = __builtin__.__import__
+        self._records = dict()  # module name -> [self time, total time]
+        self._stack = []  # [module name, start time, time in nested first imports]
+
+    def _import(self, name, globals=None, locals=None, fromlist=None, level=-1):
+        modulesBefore = len(sys.modules)
+        self._stack.append([name, time.time(), 0.0])
+        try:
+            return self._originalImport(name, globals, locals, fromlist, level)
+        finally:
+            currentName, startTime, nestedTime = self._stack.pop()
+            totalTime = time.time() - startTime
+            if len(sys.modules) > modulesBefore:  # A first import
+                record = self._records.setdefault(currentName, [0.0, 0.0])
+                record[0] += totalTime - nestedTime
+                record[1] += totalTime
+                if len(self._stack) > 0:
+                    self._stack[-1][2] += totalTime
+
+    def start(self):
+        __builtin__.__import__ = self._import
+
+    def stop(self):
+        __builtin__.__import__ = self._originalImport
+
+    def getRecords(self):
+        return self._records
+
+
+def runProfile():
+    profiler = _importProfiler()
+    readFileDescriptor, writeFileDescriptor = os.pipe()
+    startTime = time.time()
+    profiler.start()
+    try:
+        from runtimeHub import runtimeHub
+        importTime = time.time() - startTime
+        from comm.streamTransport import streamTransport
+        runtimeHub("startupProfile", "./", streamTransport(readFileDescriptor))
+    finally:
+        profiler.stop()
+        os.close(readFileDescriptor)
+        os.close(writeFileDescriptor)
+    return importTime, time.time() - startTime, profiler.getRecords()
+
+
+if __name__ == "__main__":
+    numberOfModules = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    importTime, readyTime, records = runProfile()
+    print("import runtimeHub: %.1f ms, ready for the first accept: %.1f ms, modules loaded: %d" % (importTime * 1000, readyTime * 1000, len(records)))
+    print("%-48s %10s %10s" % ("module", "self (ms)", "total (ms)"))
+    for name, (selfTime, totalTime) in sorted(records.items(), key=lambda item: -item[1][0])[:numberOfModules]:
+        print("%-48s %10.2f %10.2f" % (name, selfTime * 1000, totalTime * 1000))
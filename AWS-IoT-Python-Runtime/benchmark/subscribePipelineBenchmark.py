@@ -0,0 +1,132 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Boot-time subscriptions with a broker round trip: one after the other vs. pipelined. No AWS IoT endpoint needed.
+# mqttCore runs against _simulatedBrokerClient, which stands in for the paho client and acknowledges every
+# SUBSCRIBE/UNSUBSCRIBE from its own thread after the round trip time, as the paho network thread would.
+# sequential: runtimeHub executes "s" requests one at a time (sync mode, no batch).
+# batch: ONE "b" request with all the "s" sub-commands, which runtimeHub pipelines.
+# async: "s" requests as tickets in async mode, run side by side by the ticketExecutor.
+# Usage: python subscribePipelineBenchmark.py [numberOfSubscriptions] [roundTripMs]
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../runtime/")
+import os
+import time
+import threading
+from runtimeHub import runtimeHub
+from comm.streamTransport import streamTransport
+from protocol.mqttCore import mqttCore
+
+
+class _simulatedBrokerClient:
+
+    def __init__(self, srcMQTTCore, srcRoundTripSecond):
+        self._mqttCore = srcMQTTCore
+        self._roundTripSecond = srcRoundTripSecond
+        self._lock = threading.Lock()
+        self._lastMid = 0
+
+    def _nextMid(self):
+        self._lock.acquire()
+        self._lastMid += 1
+        ret = self._lastMid
+        self._lock.release()
+        return ret
+
+    def message_callback_add(self, srcTopic, srcCallback):
+        pass
+
+    def message_callback_remove(self, srcTopic):
+        pass
+
+    def subscribe(self, srcTopic, srcQos):
+        mid = self._nextMid()
+        threading.Timer(self._roundTripSecond, self._mqttCore.on_subscribe, [self, None, mid, (srcQos,)]).start()
+        return (0, mid)
+
+    def unsubscribe(self, srcTopic):
+        mid = self._nextMid()
+        threading.Timer(self._roundTripSecond, self._mqttCore.on_unsubscribe, [self, None, mid]).start()
+        return (0, mid)
+
+
+def _newHub(srcRoundTripSecond):
+    readFileDescriptor, writeFileDescriptor = os.pipe()
+    hub = runtimeHub("subscribePipelineBenchmark", "./", streamTransport(readFileDescriptor))
+    hub.getCommandRegistry().findCommand(["i", "subscribePipelineBenchmark", "1", "4", "0"])
+    hub._mqttCoreHub.setMQTTOperationTimeoutSecond(5)
+    hub._mqttCoreHub._pahoClient = _simulatedBrokerClient(hub._mqttCoreHub, srcRoundTripSecond)
+    return hub
+
+
+def _expect(srcReply, srcPrefix):
+    if srcReply is None or not srcReply.startswith(srcPrefix):
+        raise RuntimeError("Unexpected reply: " + str(srcReply) + ", expecting: " + srcPrefix)
+
+
+def _sequentialRound(srcNumberOfSubscriptions, srcRoundTripSecond):
+    hub = _newHub(srcRoundTripSecond)
+    server = hub.getSerialCommunicationServer()
+    startTime = time.time()
+    for i in range(0, srcNumberOfSubscriptions):
+        hub._executeCommand(hub._findCommand(["s", "topic/" + str(i), "1", str(i)]))
+        _expect(server.takeInternalProtocol(), "S T")
+    return time.time() - startTime
+
+
+def _batchRound(srcNumberOfSubscriptions, srcRoundTripSecond):
+    hub = _newHub(srcRoundTripSecond)
+    server = hub.getSerialCommunicationServer()
+    batchMessage = ["b", str(srcNumberOfSubscriptions)]
+    for i in range(0, srcNumberOfSubscriptions):
+        batchMessage += ["3", "s", "topic/" + str(i), "1", str(i)]
+    startTime = time.time()
+    batchCommand = hub._findCommand(batchMessage)
+    batchCommand.execute()
+    hub._executeBatch(batchCommand)
+    reply = server.takeInternalProtocol()
+    elapsedTime = time.time() - startTime
+    _expect(reply, "B " + str(srcNumberOfSubscriptions) + " ")
+    if reply.count("S T") != srcNumberOfSubscriptions:
+        raise RuntimeError("Unexpected reply: " + reply)
+    return elapsedTime
+
+
+def _asyncRound(srcNumberOfSubscriptions, srcRoundTripSecond):
+    hub = _newHub(srcRoundTripSecond)
+    server = hub.getSerialCommunicationServer()
+    hub._executeCommand(hub._findCommand(["am", "1", "0"]))
+    server.takeInternalProtocol()
+    startTime = time.time()
+    for i in range(0, srcNumberOfSubscriptions):
+        hub._executeCommand(hub._findCommand(["s", "topic/" + str(i), "1", str(i + 1)]))
+        _expect(server.takeInternalProtocol(), "S A ")
+    ticketExecutor = hub._ticketExecutorHub
+    while ticketExecutor.getPendingCount() > 0:
+        time.sleep(0.001)
+    return time.time() - startTime
+
+
+if __name__ == "__main__":
+    numberOfSubscriptions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    roundTripSecond = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.1
+    print("Subscriptions: " + str(numberOfSubscriptions) + ", round trip: " + str(roundTripSecond * 1000) + " ms")
+    print("%-12s %14s" % ("mode", "total (ms)"))
+    for name, runRound in [("sequential", _sequentialRound), ("batch", _batchRound), ("async", _asyncRound)]:
+        print("%-12s %14.1f" % (name, runRound(numberOfSubscriptions, roundTripSecond) * 1000))
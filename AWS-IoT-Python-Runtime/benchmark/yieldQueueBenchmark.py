@@ -0,0 +1,148 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Memory and CPU comparison of the yield queue: chunks formatted when the message arrives (previous runtime)
+# vs. (sketchSlotNumber, payload) records chunked at write time (serialCommunicationServer).
+# Usage: python yieldQueueBenchmark.py [numberOfMessages] [payloadSize] [rounds]
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../lib/comm/")
+import os
+import time
+import struct
+import Queue
+import cStringIO
+from util.logManager import logManager
+from comm.serialCommunicationServer import serialCommunicationServer
+from comm.streamTransport import streamTransport
+
+_POINTER_SIZE = struct.calcsize("P")  # One deque entry
+
+
+# Reference implementation of the eager path, as in the previous runtime:
+# runtimeHub._formatPayloadForYield at callback time and a writeToExternalYield that re-slices the retained message
+class _eagerYieldQueue:
+
+    def __init__(self, srcLogManager, srcChunkSize):
+        self._log = srcLogManager
+        self._chunkSize = srcChunkSize
+        self._yieldMessageQueue = Queue.Queue(0)
+        self._currentElementOut = ""
+        self._lockedQueueSize = 0
+        self._txBuf = ""
+
+    def formatPayloadForYield(self, srcPayload, srcSketchSlotNumber):
+        hasMore = 1
+        metaData = "Y " + str(srcSketchSlotNumber) + " " + str(hasMore) + " "
+        messageChunkSize = self._chunkSize - len(metaData)
+        chunks = [metaData + srcPayload[i:i+messageChunkSize] for i in range(0, len(srcPayload), messageChunkSize)]
+        chunks[len(chunks)-1] = "Y " + str(srcSketchSlotNumber) + " 0 " + chunks[len(chunks)-1][len(metaData):]
+        return "".join(chunks)
+
+    def writeToInternalYield(self, srcContent):
+        self._yieldMessageQueue.put(srcContent)
+        self._log.writeLog("Updated serialCommunicationServer internal yieldMessageQueue by inserting a new message. Size: " + str(self._yieldMessageQueue.qsize()))
+
+    def writeToExternalYield(self):
+        if self._lockedQueueSize > 0 or self._currentElementOut != "":
+            if self._currentElementOut == "":
+                self._currentElementOut = self._yieldMessageQueue.get()
+                self._lockedQueueSize -= 1
+                self._log.writeLog("Start sending a new message to remote client: " + self._currentElementOut)
+            self._txBuf = self._currentElementOut[0:self._chunkSize]
+            print(self._txBuf)
+            self._log.writeLog("Send through serial to remote client. Chunk: " + self._txBuf + " Size: " + str(len(self._txBuf)))
+            self._currentElementOut = self._currentElementOut[self._chunkSize:]
+        else:
+            print("Y F: No messages.")
+
+
+def _eagerRound(srcLogManager, srcPayloadList, srcChunkSize):
+    eagerQueue = _eagerYieldQueue(srcLogManager, srcChunkSize)
+    startTime = time.time()
+    for i in range(0, len(srcPayloadList)):
+        eagerQueue.writeToInternalYield(eagerQueue.formatPayloadForYield(srcPayloadList[i], i % 10))
+    enqueueTime = time.time() - startTime
+    queuedBytes = sum([sys.getsizeof(element) + _POINTER_SIZE for element in eagerQueue._yieldMessageQueue.queue])
+    startTime = time.time()
+    eagerQueue._lockedQueueSize = eagerQueue._yieldMessageQueue.qsize()
+    while eagerQueue._lockedQueueSize > 0 or eagerQueue._currentElementOut != "":
+        eagerQueue.writeToExternalYield()
+    drainTime = time.time() - startTime
+    return enqueueTime, drainTime, queuedBytes
+
+
+def _lazyRound(srcServer, srcPayloadList):
+    startTime = time.time()
+    for i in range(0, len(srcPayloadList)):
+        srcServer.writeToInternalYield(i % 10, srcPayloadList[i])
+    enqueueTime = time.time() - startTime
+    # A lane keeps a payload and a sketch slot number (small cached int) per record
+    queuedBytes = sum([sys.getsizeof(element[1]) + 2 * _POINTER_SIZE for element in srcServer.getYieldScheduler().getQueuedRecords()])
+    startTime = time.time()
+    srcServer.updateLockedQueueSize()
+    while srcServer._hasYieldChunks():
+        srcServer.writeToExternalYield()
+    drainTime = time.time() - startTime
+    return enqueueTime, drainTime, queuedBytes
+
+
+def runBenchmark(srcNumberOfMessages, srcPayloadSize, srcRounds):
+    log = logManager("yieldQueueBenchmark", "./")
+    log.disable()
+    readFileDescriptor, writeFileDescriptor = os.pipe()
+    server = serialCommunicationServer(log, streamTransport(readFileDescriptor))
+    payloadList = [("%08d" % i) + "x" * (srcPayloadSize - 8) for i in range(0, srcNumberOfMessages)]
+    totals = dict()
+    for name in ["eager", "lazy"]:
+        totals[name] = [0.0, 0.0, 0, 0]
+    realStdout = sys.stdout
+    try:
+        # Alternate between the two queues to even out noise
+        for i in range(0, srcRounds):
+            for name in ["eager", "lazy"]:
+                sys.stdout = cStringIO.StringIO()
+                if name == "eager":
+                    enqueueTime, drainTime, queuedBytes = _eagerRound(log, payloadList, server.getChunkSize())
+                else:
+                    enqueueTime, drainTime, queuedBytes = _lazyRound(server, payloadList)
+                totals[name][0] += enqueueTime
+                totals[name][1] += drainTime
+                totals[name][2] = queuedBytes
+                totals[name][3] = sys.stdout.tell()
+    finally:
+        sys.stdout = realStdout
+        os.close(readFileDescriptor)
+        os.close(writeFileDescriptor)
+    results = dict()
+    for name in ["eager", "lazy"]:
+        enqueueTotal, drainTotal, queuedBytes, bytesOut = totals[name]
+        results[name] = (enqueueTotal / srcRounds, drainTotal / srcRounds, queuedBytes, bytesOut)
+    return results
+
+
+if __name__ == "__main__":
+    numberOfMessages = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    payloadSize = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    print("Queued messages: " + str(numberOfMessages) + ", payload size: " + str(payloadSize) + " bytes, rounds: " + str(rounds))
+    print("%-6s %14s %14s %16s %12s" % ("queue", "enqueue (ms)", "drain (ms)", "queued bytes", "bytes out"))
+    results = runBenchmark(numberOfMessages, payloadSize, rounds)
+    for name in ["eager", "lazy"]:
+        enqueueTime, drainTime, queuedBytes, bytesOut = results[name]
+        print("%-6s %14.2f %14.2f %16d %12d" % (name, enqueueTime * 1000, drainTime * 1000, queuedBytes, bytesOut))
@@ -0,0 +1,94 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# This class implements the optional binary framing mode of the serial bridge.
+# Request (remote client -> runtime):
+#     <opcode: 1 byte> <numberOfParameters: 1 byte> {<length: 2 bytes, big-endian> <parameter bytes>} * numberOfParameters
+# Reply (runtime -> remote client):
+#     <length: 2 bytes, big-endian> <reply bytes>
+# Opcodes always have the high bit set so they never collide with the ASCII line protocol.
+# Any other byte outside of a frame is skipped, except for '~', which is taken as an exit request.
+# This keeps the "1\n~\n" reset sequence sent by the sketch on boot working in binary mode.
+
+import struct
+
+
+class binaryFrame:
+
+    _EXIT_BYTE = "~"
+    _MAXIMUM_PARAMETER_LENGTH = 0xFFFF
+    _MAXIMUM_NUMBER_OF_PARAMETERS = 0xFF
+
+    def __init__(self):
+        # One-byte opcodes in place of the protocol command names, declared by the commands
+        self._opcodeToProtocolName = dict()
+        self._protocolNameToOpcode = dict()
+
+    def registerOpcode(self, srcOpcode, srcProtocolName):
+        if srcOpcode is None or srcProtocolName is None:
+            raise TypeError("None type inputs detected.")
+        if srcOpcode < 0x80 or srcOpcode > 0xFF:
+            raise ValueError("Opcode must be within 0x80 and 0xFF.")
+        self._opcodeToProtocolName[srcOpcode] = srcProtocolName
+        self._protocolNameToOpcode[srcProtocolName] = srcOpcode
+
+    def getProtocolName(self, srcOpcode):
+        return self._opcodeToProtocolName.get(srcOpcode)
+
+    # Read one request frame using srcRead(numberOfBytes), which should return exactly numberOfBytes bytes
+    # Return the request in the same form as the line protocol: [protocolName, parameter1, parameter2, ...]
+    def decodeRequest(self, srcRead):
+        protocolName = None
+        while protocolName is None:
+            currentByte = srcRead(1)
+            if currentByte == self._EXIT_BYTE:
+                return [self._EXIT_BYTE]
+            protocolName = self._opcodeToProtocolName.get(ord(currentByte))  # Skip stray bytes
+        numberOfParameters = ord(srcRead(1))
+        ret = [protocolName]
+        if numberOfParameters > 0:
+            parameterLength = struct.unpack(">H", srcRead(2))[0]
+            # Read each parameter together with the length prefix of the next one to save a read per parameter
+            for i in range(1, numberOfParameters):
+                currentChunk = srcRead(parameterLength + 2)
+                ret.append(currentChunk[:-2])
+                parameterLength = struct.unpack(">H", currentChunk[-2:])[0]
+            if parameterLength > 0:
+                ret.append(srcRead(parameterLength))
+            else:
+                ret.append("")
+        return ret
+
+    def encodeRequest(self, srcProtocolName, srcParameterList):
+        opcode = self._protocolNameToOpcode.get(srcProtocolName)
+        if opcode is None:
+            raise ValueError("No opcode for protocol command: " + str(srcProtocolName))
+        if len(srcParameterList) > self._MAXIMUM_NUMBER_OF_PARAMETERS:
+            raise ValueError("Too many parameters for one frame.")
+        fragments = [struct.pack(">BB", opcode, len(srcParameterList))]
+        for parameter in srcParameterList:
+            parameter = str(parameter)
+            if len(parameter) > self._MAXIMUM_PARAMETER_LENGTH:
+                raise ValueError("Parameter too long for one frame.")
+            fragments.append(struct.pack(">H", len(parameter)))
+            fragments.append(parameter)
+        return "".join(fragments)
+
+    def encodeReplyLength(self, srcLength):
+        if srcLength > self._MAXIMUM_PARAMETER_LENGTH:
+            raise ValueError("Reply too long for one frame.")
+        return struct.pack(">H", srcLength)
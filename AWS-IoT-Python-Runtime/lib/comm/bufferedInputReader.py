@@ -0,0 +1,110 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# This class implements a buffered reader on a file descriptor (stdin for the serial bridge) driven by poll/select.
+# Reads never block past the configured deadline, which can be any number of seconds, including fractions.
+# While waiting for data, an optional idle callback is invoked every idle interval so that the caller can
+# interleave housekeeping with serial servicing. No signals are involved.
+
+import os
+import math
+import time
+import select
+from AWSIoTExceptions import acceptTimeoutException
+
+
+class bufferedInputReader:
+
+    _READ_SIZE = 4096
+
+    def __init__(self, srcFileDescriptor):
+        if srcFileDescriptor is None:
+            raise TypeError("None type inputs detected.")
+        self._fileDescriptor = srcFileDescriptor
+        self._buffer = ""
+        self._offset = 0  # Start of the unconsumed data in _buffer
+        self._deadline = None  # Absolute time in seconds, None means never
+        self._idleCallback = None
+        self._idleIntervalSecond = None
+        # Prefer poll, fall back to select on platforms without it
+        self._poller = None
+        if hasattr(select, "poll"):
+            self._poller = select.poll()
+            self._poller.register(self._fileDescriptor, select.POLLIN | select.POLLPRI)
+
+    def setDeadline(self, srcDeadline):
+        self._deadline = srcDeadline
+
+    def setIdleCallback(self, srcIdleCallback, srcIdleIntervalSecond):
+        if srcIdleCallback is not None and srcIdleIntervalSecond <= 0:
+            raise ValueError("Idle interval must be positive.")
+        self._idleCallback = srcIdleCallback
+        self._idleIntervalSecond = srcIdleIntervalSecond
+
+    def _isReadable(self, srcWaitTimeSecond):
+        if self._poller is not None:
+            if srcWaitTimeSecond is None:
+                return len(self._poller.poll()) > 0
+            else:
+                # Round up, a wait under 1 ms must not become a busy poll(0)
+                return len(self._poller.poll(max(1, int(math.ceil(srcWaitTimeSecond * 1000))))) > 0
+        else:
+            readableList = select.select([self._fileDescriptor], [], [], srcWaitTimeSecond)[0]
+            return len(readableList) > 0
+
+    def _waitForData(self):
+        # Raise acceptTimeoutException once the deadline has passed
+        while True:
+            waitTimeSecond = None
+            if self._deadline is not None:
+                waitTimeSecond = self._deadline - time.time()
+                if waitTimeSecond <= 0:
+                    raise acceptTimeoutException()
+            if self._idleCallback is not None and (waitTimeSecond is None or waitTimeSecond > self._idleIntervalSecond):
+                waitTimeSecond = self._idleIntervalSecond
+            if self._isReadable(waitTimeSecond):
+                return
+            if self._idleCallback is not None:
+                self._idleCallback()
+
+    def _fill(self):
+        self._waitForData()
+        newData = os.read(self._fileDescriptor, self._READ_SIZE)
+        if newData == "":
+            raise EOFError("Remote client closed the tunnel.")
+        # Drop the consumed part only when new data comes in
+        self._buffer = self._buffer[self._offset:] + newData
+        self._offset = 0
+
+    # Return the next line, without the line feed
+    def readLine(self):
+        lineEnd = self._buffer.find("\n", self._offset)
+        while lineEnd < 0:
+            searchStart = len(self._buffer) - self._offset
+            self._fill()
+            lineEnd = self._buffer.find("\n", searchStart)
+        ret = self._buffer[self._offset:lineEnd]
+        self._offset = lineEnd + 1
+        return ret
+
+    # Return exactly srcLength bytes
+    def read(self, srcLength):
+        while len(self._buffer) - self._offset < srcLength:
+            self._fill()
+        ret = self._buffer[self._offset:self._offset + srcLength]
+        self._offset += srcLength
+        return ret
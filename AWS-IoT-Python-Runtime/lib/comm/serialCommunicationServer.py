@@ -18,50 +18,145 @@
 import sys
 sys.path.append("../lib/util/")
 sys.path.append("../lib/exception/")
+import re
+import time
+import jsonDeltaEncoder
 import communicationServer
+import binaryFrame
+import bufferedInputReader
+import yieldScheduler
+import streamTransport
 import AWSIoTExceptions
 import Queue
-import signal
+import termios
+import tty
 
 
 class serialCommunicationServer(communicationServer.communicationServer):
     _protocolMessageQueue = None
     _yieldMessageQueue = None
+    _yieldDeltaEncoder = None
     _jsonBuf = None
     _txBuf = None
     _log = None
-    _acceptTimeout = 0  # Never timeout
-    _chunkSize = 50  # Biggest chunk of data that can be sent over serial
+    _acceptTimeout = 0  # Never timeout, in seconds, fractions allowed
+    _chunkSize = 50  # Biggest chunk of data that can be sent over serial, for yield
+    _jsonChunkSize = 50  # Biggest chunk of JSON data that can be sent over serial
+    _maximumReplySize = 0  # Biggest protocol reply the remote client can take, 0 means no limit
+    _MINIMUM_CHUNK_SIZE = 24  # Room for a yield chunk header and some payload, and for a "Reply too large." reply
     _returnList = []
-    _currentElementOut = ""  # Retained message that needs to be sent out in chunks
-    _lockedQueueSize = 0  # Number of messages to be transmitted in this yield
+    _currentElementOut = None  # Retained (sketchSlotNumber, payload) record that needs to be sent out in chunks
+    _currentElementSource = None  # Record the retained one was taken from, before delta encoding
+    _currentElementCursor = 0  # Offset of the first payload byte not formatted into chunks yet
+    _currentElementHeader = ""  # "Y <sketchSlotNumber> " for the retained message
+    _currentElementBodySize = 0  # Number of payload bytes in each chunk of the retained message
+    _currentElementChunks = None  # Formatted chunks of the retained message still to be sent, last one first
+    _EAGER_CHUNK_LIMIT = 8  # Chunks formatted at a time: small messages in one go, large ones a window at a time
+    _binaryFrameHandler = None
+    _binaryMode = False  # Line protocol by default, binary framing upon request
+    _pendingBinaryMode = None  # Mode switch to apply once the current reply is out
+    _opcodeSource = None  # Returns {opcode: protocolName} for binary frames
+    _savedTerminalAttributes = None
+    _transport = None
+    _inputFileDescriptor = None
+    _inputReader = None
+    _housekeepingTaskList = None
+    _housekeepingInterval = 0.1  # Run housekeeping tasks every 100 ms while waiting for the remote client
+    _YIELD_BURST_TERMINATOR_RESERVE = len("Y E 0 4294967295")  # Room for the burst terminator and a drop counter
 
-    def __init__(self, srcLogManager):
+    def __init__(self, srcLogManager, srcTransport=None):
         self._log = srcLogManager
         self._protocolMessageQueue = Queue.Queue(0)
-        self._yieldMessageQueue = Queue.Queue(0)
+        self._yieldMessageQueue = yieldScheduler.yieldScheduler()
+        self._yieldDeltaEncoder = jsonDeltaEncoder.jsonDeltaEncoder()
         self._jsonBuf = ""
         self._txBuf = ""
-        # Register timeout signal handler
-        signal.signal(signal.SIGALRM, self._timeoutHandler)
-        signal.alarm(0)  # disable SIGALRM
-        self._log.writeLog("Register timeout signal handler.")
-        self._log.writeLog("serialCommunicationServer init.")
+        self._binaryFrameHandler = binaryFrame.binaryFrame()
+        self._housekeepingTaskList = []
+        # Poll-driven reader on the transport, stdin/stdout by default, no signals
+        if srcTransport is None:
+            srcTransport = streamTransport.streamTransport()
+        self._transport = srcTransport
+        self._inputFileDescriptor = srcTransport.getInputFileDescriptor()
+        self._inputReader = bufferedInputReader.bufferedInputReader(self._inputFileDescriptor)
+        self._log.writeLog("serialCommunicationServer init on transport: " + srcTransport.getName())
 
-    def _timeoutHandler(self, signal, frame):
-        self._log.writeLog("Raise a custom exception for accept timeout.")
-        raise AWSIoTExceptions.acceptTimeoutException()
+    def _runHousekeeping(self):
+        for task in self._housekeepingTaskList:
+            try:
+                task()
+            except Exception as e:
+                self._log.writeLog("Exception in housekeeping task: " + str(type(e)) + str(e))
 
     def _basicInput(self):
-        return raw_input()
+        return self._inputReader.readLine()
 
     def _basicOutput(self, srcContent):
-        print(srcContent)
+        self._writeReply((srcContent,), True)
+
+    def _flushOutput(self):
+        self._transport.getOutputFile().flush()
+
+    def _writeReply(self, srcParts, srcIsFlushing=False):
+        # Write ONE reply made of several parts without joining them first
+        outputFile = self._transport.getOutputFile()
+        if self._binaryMode:
+            replyLength = 0
+            for part in srcParts:
+                replyLength += len(part)
+            outputFile.write(self._binaryFrameHandler.encodeReplyLength(replyLength))
+            for part in srcParts:
+                outputFile.write(part)
+        else:
+            for part in srcParts:
+                outputFile.write(part)
+            outputFile.write("\n")
+        if srcIsFlushing:
+            outputFile.flush()
+
+    def _wireSize(self, srcLength):
+        # Number of bytes a reply of srcLength bytes takes on the serial line, including framing
+        if self._binaryMode:
+            return srcLength + 2  # Length prefix
+        else:
+            return srcLength + 1  # Line feed
+
+    def _basicRead(self, srcLength):
+        # Read exactly srcLength bytes from the remote client
+        return self._inputReader.read(srcLength)
+
+    def _applyBinaryMode(self, srcBinaryMode):
+        if srcBinaryMode and self._opcodeSource is not None:
+            for opcode, protocolName in self._opcodeSource().items():
+                self._binaryFrameHandler.registerOpcode(opcode, protocolName)
+        # Binary frames must not go through the line discipline (echo, CR/LF translation, control characters)
+        if self._transport.isTerminal():
+            if srcBinaryMode and self._savedTerminalAttributes is None:
+                self._savedTerminalAttributes = termios.tcgetattr(self._inputFileDescriptor)
+                tty.setraw(self._inputFileDescriptor)
+            elif not srcBinaryMode and self._savedTerminalAttributes is not None:
+                termios.tcsetattr(self._inputFileDescriptor, termios.TCSADRAIN, self._savedTerminalAttributes)
+                self._savedTerminalAttributes = None
+        self._binaryMode = srcBinaryMode
+        self._log.writeLog("serialCommunicationServer binary mode: " + str(self._binaryMode))
 
     def setAcceptTimeout(self, srcTimeout):
         self._acceptTimeout = srcTimeout
         self._log.writeLog("serialCommunicationServer set accept timeout to " + str(self._acceptTimeout))
 
+    def setHousekeepingInterval(self, srcHousekeepingInterval):
+        if srcHousekeepingInterval <= 0:
+            raise ValueError("Housekeeping interval must be positive.")
+        self._housekeepingInterval = srcHousekeepingInterval
+        if self._housekeepingTaskList:
+            self._inputReader.setIdleCallback(self._runHousekeeping, self._housekeepingInterval)
+
+    def addHousekeepingTask(self, srcTask):
+        # srcTask will be called with no arguments every housekeeping interval while accept is waiting
+        self._housekeepingTaskList.append(srcTask)
+        self._inputReader.setIdleCallback(self._runHousekeeping, self._housekeepingInterval)
+        self._log.writeLog("serialCommunicationServer added a housekeeping task. Total: " + str(len(self._housekeepingTaskList)))
+
     def getChunkSize(self):
         return self._chunkSize
 
@@ -69,35 +164,186 @@ class serialCommunicationServer(communicationServer.communicationServer):
         self._chunkSize = srcChunkSize
         self._log.writeLog("serialCommunicationServer set chunk size to " + str(self._chunkSize))
 
+    def getJSONChunkSize(self):
+        return self._jsonChunkSize
+
+    def setJSONChunkSize(self, srcJSONChunkSize):
+        self._jsonChunkSize = srcJSONChunkSize
+        self._log.writeLog("serialCommunicationServer set JSON chunk size to " + str(self._jsonChunkSize))
+
+    def getMaximumReplySize(self):
+        return self._maximumReplySize
+
+    def negotiateChunkSize(self, srcSketchBufferSize, srcChunkSize, srcJSONChunkSize):
+        # Fit the chunk sizes into the buffer declared by the remote client, one byte is kept for the string terminator
+        # 0 chunk size picks the biggest one that fits
+        # Protocol replies are capped to the same buffer from now on: a longer one is replaced by <NAME>F: Reply too large.
+        if not isinstance(srcSketchBufferSize, int) or not isinstance(srcChunkSize, int) or not isinstance(srcJSONChunkSize, int):
+            raise TypeError("SketchBufferSize/ChunkSize/JSONChunkSize must be integer.")
+        largestChunkSize = srcSketchBufferSize - 1
+        if largestChunkSize < self._MINIMUM_CHUNK_SIZE:
+            raise ValueError("SketchBufferSize must be greater than " + str(self._MINIMUM_CHUNK_SIZE) + ".")
+        if srcChunkSize == 0:
+            srcChunkSize = largestChunkSize
+        if srcJSONChunkSize == 0:
+            srcJSONChunkSize = largestChunkSize
+        for chunkSize in [srcChunkSize, srcJSONChunkSize]:
+            if chunkSize < self._MINIMUM_CHUNK_SIZE or chunkSize > largestChunkSize:
+                raise ValueError("ChunkSize/JSONChunkSize must be within " + str(self._MINIMUM_CHUNK_SIZE) + " and " + str(largestChunkSize) + ".")
+        self.setChunkSize(srcChunkSize)
+        self.setJSONChunkSize(srcJSONChunkSize)
+        self._maximumReplySize = largestChunkSize
+
+    def getBinaryFrameHandler(self):
+        return self._binaryFrameHandler
+
+    def isBinaryMode(self):
+        return self._binaryMode
+
+    def setOpcodeSource(self, srcOpcodeSource):
+        # Opcodes are taken from srcOpcodeSource() each time binary mode is switched on
+        self._opcodeSource = srcOpcodeSource
+
+    def setBinaryMode(self, srcBinaryMode):
+        # The acknowledgement goes out in the mode it was requested in, the switch happens right after it
+        self._pendingBinaryMode = srcBinaryMode
+        self._log.writeLog("serialCommunicationServer binary mode switch pending: " + str(srcBinaryMode))
+
+    def attachTransport(self, srcTransport):
+        # Serve a new remote client (a reset sketch reattaching), queued yield messages are kept for it
+        # Anything tied to the previous remote client goes: line protocol again, no reply cap, no half-sent reply
+        self.restoreTerminal()
+        self._binaryMode = False
+        self._pendingBinaryMode = None
+        self._maximumReplySize = 0
+        while self.takeInternalProtocol() is not None:
+            pass
+        self._jsonBuf = ""
+        self._yieldDeltaEncoder.resetDocuments()  # The new remote client has none of the previous documents
+        if self._currentElementOut is not None:
+            self._restartYieldElement()
+        self._transport = srcTransport
+        self._inputFileDescriptor = srcTransport.getInputFileDescriptor()
+        self._inputReader = bufferedInputReader.bufferedInputReader(self._inputFileDescriptor)
+        if self._housekeepingTaskList:
+            self._inputReader.setIdleCallback(self._runHousekeeping, self._housekeepingInterval)
+        self._log.writeLog("serialCommunicationServer attached to transport: " + srcTransport.getName())
+
+    def restoreTerminal(self):
+        if self._savedTerminalAttributes is not None:
+            self._applyBinaryMode(False)
+
     def updateLockedQueueSize(self):
-        self._lockedQueueSize = self._yieldMessageQueue.qsize()
+        self._yieldMessageQueue.lockSize()
 
     def getLockedQueueSize(self):
-        return self._lockedQueueSize
+        # Number of messages to be transmitted in this yield
+        return self._yieldMessageQueue.getLockedSize()
+
+    def _hasYieldChunks(self):
+        return self._yieldMessageQueue.getLockedSize() > 0 or self._currentElementOut is not None
 
-    #def endOfThisYield(self):
-    #    return self._lockedQueueSize == 0 and self._currentElementOut == ""
+    def _retainNextYieldElement(self):
+        # Pick ONE new message from the locked part of the messageQueue if there is no retained one, highest priority first
+        while self._currentElementOut is None:
+            record = self._yieldMessageQueue.getLocked()
+            if record is None:
+                return  # Nothing locked, or locked messages were dropped in the meantime
+            self._currentElementSource = record
+            if self._yieldDeltaEncoder.isSlotEncoding(record[0]):
+                # Only the fields that changed since the last message delivered to this sketch slot
+                delta = self._yieldDeltaEncoder.encode(record[0], record[1])
+                if delta is None:
+                    self._log.writeLog("Skipped an unchanged document for sketch slot: " + str(record[0]))
+                    continue
+                record = (record[0], delta)
+            self._currentElementOut = record
+            self._prepareYieldChunks()
+            self._log.writeLog("Start sending a new message to remote client for sketch slot: " + str(record[0]))
+
+    def _restartYieldElement(self):
+        # A partly sent yield message goes out again from the start, in chunks of the current chunk size
+        # Its delta is encoded again as a full document: the remote client may not have what the partly sent one was based on
+        sketchSlotNumber, payload = self._currentElementSource
+        if self._yieldDeltaEncoder.isSlotEncoding(sketchSlotNumber):
+            self._yieldDeltaEncoder.resetSlotDocument(sketchSlotNumber)
+            self._currentElementOut = (sketchSlotNumber, self._yieldDeltaEncoder.encode(sketchSlotNumber, payload))
+        self._prepareYieldChunks()
+
+    def _prepareYieldChunks(self):
+        # Chunk: Y <sketchSlotNumber> <hasMore> <payload slice>
+        self._currentElementHeader = "Y " + str(self._currentElementOut[0]) + " "
+        self._currentElementBodySize = max(1, self._chunkSize - len(self._currentElementHeader) - 2)
+        payload = self._currentElementOut[1]
+        if len(payload) <= self._currentElementBodySize:
+            # Fits in one chunk, the most common case
+            self._currentElementChunks = [self._currentElementHeader + "0 " + payload]
+            self._currentElementCursor = len(payload)
+        else:
+            self._currentElementCursor = 0
+            self._formatYieldChunks()
+
+    def _formatYieldChunks(self):
+        # Format the next _EAGER_CHUNK_LIMIT chunks of the retained message, last one first so that they are popped in order
+        # A small message is formatted in one go, a large one a few chunks at a time so that its remainder is never copied
+        payload = self._currentElementOut[1]
+        bodySize = self._currentElementBodySize
+        windowStart = self._currentElementCursor
+        windowEnd = min(windowStart + bodySize * self._EAGER_CHUNK_LIMIT, len(payload))
+        if windowEnd == len(payload):
+            lastChunkStart = max(windowStart, windowStart + (windowEnd - windowStart - 1) // bodySize * bodySize)
+            chunks = [self._currentElementHeader + "0 " + payload[lastChunkStart:]]
+        else:
+            lastChunkStart = windowEnd
+            chunks = []
+        moreHeader = self._currentElementHeader + "1 "
+        chunks.extend([moreHeader + payload[i:i + bodySize] for i in range(lastChunkStart - bodySize, windowStart - 1, -bodySize)])
+        self._currentElementChunks = chunks
+        self._currentElementCursor = windowEnd
+
+    def _nextYieldChunkSize(self):
+        return len(self._currentElementChunks[-1])
+
+    def _takeNextYieldChunk(self):
+        # Return the next chunk of the retained message, format the next few ones if needed
+        chunk = self._currentElementChunks.pop()
+        if not self._currentElementChunks:
+            if self._currentElementCursor < len(self._currentElementOut[1]):
+                self._formatYieldChunks()
+            else:
+                self._currentElementOut = None  # Done with this message
+                self._currentElementSource = None
+                self._currentElementChunks = None
+        return chunk
 
     def accept(self):
         # Messages are passed from remote client to server line by line
         # A number representing the number of lines to receive will be passed first
         # Then serialCommunicationServer should loop the exact time to receive the following lines
-        # All these reads add up tp ONE timeout: acceptTimeout. Once exceeded, this timeout will trigger a callback raising an exception
-        # Throw acceptTimeoutException, ValueError
+        # All these reads add up tp ONE timeout: acceptTimeout. Once exceeded, the input reader raises an exception
+        # Throw acceptTimeoutException, ValueError, EOFError
         # Store the incoming parameters into an internal data structure
         self._returnList = []
         self._log.writeLog("Clear internal list. Size: " + str(len(self._returnList)))
-        signal.alarm(self._acceptTimeout)  # Enable SIGALRM
+        if self._acceptTimeout > 0:
+            self._inputReader.setDeadline(time.time() + self._acceptTimeout)
+        else:
+            self._inputReader.setDeadline(None)
         self._log.writeLog("Accept-timer starts, with acceptTimeout: " + str(self._acceptTimeout) + " second(s).")
-        numLines = int(self._basicInput())  # Get number of lines to receive
-        self._log.writeLog(str(numLines) + " lines to be received. Loop begins.")
-        loopCount = 1
-        while(loopCount <= numLines):
-            currElementIn = self._basicInput()
-            self._returnList.append(currElementIn)
-            self._log.writeLog("Received: " + str(loopCount) + "/" + str(numLines) + " Message is: " + currElementIn)
-            loopCount += 1
-        signal.alarm(0)  # Finish reading from remote client, disable SIGALRM
+        if self._binaryMode:
+            # One frame carries the opcode and all length-prefixed parameters
+            self._returnList = self._binaryFrameHandler.decodeRequest(self._basicRead)
+            self._log.writeLog("Received a binary frame for: " + self._returnList[0] + " with " + str(len(self._returnList) - 1) + " parameter(s).")
+        else:
+            numLines = int(self._basicInput())  # Get number of lines to receive
+            self._log.writeLog(str(numLines) + " lines to be received. Loop begins.")
+            loopCount = 1
+            while(loopCount <= numLines):
+                currElementIn = self._basicInput()
+                self._returnList.append(currElementIn)
+                self._log.writeLog("Received: " + str(loopCount) + "/" + str(numLines) + " Message is: " + currElementIn)
+                loopCount += 1
+        self._inputReader.setDeadline(None)  # Finish reading from remote client
         self._log.writeLog("Finish reading from remote client. Accept-timer ends.")
         return self._returnList
 
@@ -105,9 +351,40 @@ class serialCommunicationServer(communicationServer.communicationServer):
         self._protocolMessageQueue.put(srcContent)
         self._log.writeLog("Updated serialCommunicationServer internal protocolMessageQueue by inserting a new message. Size: " + str(self._protocolMessageQueue.qsize()))
 
-    def writeToInternalYield(self, srcContent):
-        self._yieldMessageQueue.put(srcContent)
-        self._log.writeLog("Updated serialCommunicationServer internal yieldMessageQueue by inserting a new message. Size: " + str(self._yieldMessageQueue.qsize()))
+    def takeInternalProtocol(self):
+        # Take the queued protocol message back instead of sending it, None if there is none
+        try:
+            return self._protocolMessageQueue.get_nowait()
+        except Queue.Empty:
+            return None
+
+    def getYieldScheduler(self):
+        return self._yieldMessageQueue
+
+    def setYieldQueueing(self, srcMaximumSize, srcMaximumBytes, srcDropBehavior, srcSlotQuota):
+        self._yieldMessageQueue.setQueueing(srcMaximumSize, srcMaximumBytes, srcDropBehavior, srcSlotQuota)
+
+    def setYieldCoalescing(self, srcSketchSlotNumber, srcCoalescing):
+        # Latest-value-wins for this sketch slot: a newer message replaces the pending one
+        self._yieldMessageQueue.setSlotCoalescing(srcSketchSlotNumber, srcCoalescing)
+
+    def isYieldCoalescing(self, srcSketchSlotNumber):
+        return self._yieldMessageQueue.isSlotCoalescing(srcSketchSlotNumber)
+
+    def setYieldDeltaEncoding(self, srcSketchSlotNumber, srcDeltaEncoding):
+        # JSON documents for this sketch slot go out as path=value records of the changed fields
+        self._yieldDeltaEncoder.setSlotEncoding(srcSketchSlotNumber, srcDeltaEncoding)
+
+    def isYieldDeltaEncoding(self, srcSketchSlotNumber):
+        return self._yieldDeltaEncoder.isSlotEncoding(srcSketchSlotNumber)
+
+    def writeToInternalYield(self, srcSketchSlotNumber, srcPayload, srcMessageClass=yieldScheduler.yieldScheduler.CLASS_SUBSCRIPTION):
+        # Only the raw payload is queued, chunks are generated when they are written out
+        # srcMessageClass picks the priority lane, unless the sketch slot has a priority of its own
+        if self._yieldMessageQueue.put((srcSketchSlotNumber, srcPayload), srcMessageClass):
+            self._log.writeLog("Updated serialCommunicationServer internal yieldMessageQueue by inserting a new message. Size: " + str(self._yieldMessageQueue.qsize()))
+        else:
+            self._log.writeLog("Dropped a new message for sketch slot: " + str(srcSketchSlotNumber) + ". Yield queue is full.")
 
     def writeToInternalJSON(self, srcContent):
         self._jsonBuf = srcContent
@@ -116,37 +393,76 @@ class serialCommunicationServer(communicationServer.communicationServer):
     def writeToExternalYield(self):
         # Write ONE chunk to the remote client
         # If no retained chunks, pick ONE new message from the given messageQueue and start again
-        # Messages in the internal messageQueue should be well-formated for yield messages, serialCommunicationServer will do nothing to format it
-        if self._lockedQueueSize > 0 or self._currentElementOut != "":
-            if self._currentElementOut == "":  # No more chunks left for current retained?
-                self._currentElementOut = self._yieldMessageQueue.get()
-                self._lockedQueueSize -= 1
-                self._log.writeLog("Start sending a new message to remote client: " + self._currentElementOut)
-            self._txBuf = self._currentElementOut[0:self._chunkSize]
-            self._basicOutput(self._txBuf)
-            self._log.writeLog("Send through serial to remote client. Chunk: " + self._txBuf + " Size: " + str(len(self._txBuf)))
-            self._currentElementOut = self._currentElementOut[self._chunkSize:]
+        # Chunk headers are generated here, from the (sketchSlotNumber, payload) records in the messageQueue
+        # Dropped messages are reported when there is nothing left to yield: Y F: No messages. Dropped: <number>
+        self._retainNextYieldElement()  # No more chunks left for current retained?
+        if self._currentElementOut is not None:
+            chunk = self._takeNextYieldChunk()
+            if self._binaryMode:
+                self._writeReply((chunk,), True)
+            else:
+                outputFile = self._transport.getOutputFile()
+                outputFile.write(chunk + "\n")  # Chunks are short, one write per line
+                outputFile.flush()
+            self._log.writeLog("Send through serial to remote client. Yield chunk.")
         else:
-            self._basicOutput("Y F: No messages.")
+            numberOfDropped = self._yieldMessageQueue.takeDropReport()
+            if numberOfDropped > 0:
+                self._basicOutput("Y F: No messages. Dropped: " + str(numberOfDropped))
+            else:
+                self._basicOutput("Y F: No messages.")
             self._log.writeLog("No more messages for yield. Exiting writeToExternalYield.")
 
+    def getMinimumYieldBurstBufferSize(self):
+        # One full chunk plus the terminator
+        return self._wireSize(self._chunkSize) + self._wireSize(self._YIELD_BURST_TERMINATOR_RESERVE)
+
+    def writeToExternalYieldBurst(self, srcBufferSize):
+        # Write as many whole chunks as fit into srcBufferSize bytes on the remote side, in ONE reply
+        # Chunks are taken from the retained message first, then from the locked part of the messageQueue, same as writeToExternalYield
+        # The reply always ends with a terminator: "Y E <1 if there are locked chunks left, otherwise 0> <number of dropped messages since last report>"
+        numberOfChunks = 0
+        numberOfDropped = self._yieldMessageQueue.takeDropReport()
+        remainingBufferSize = srcBufferSize - self._wireSize(len("Y E 0 " + str(numberOfDropped)))
+        while self._hasYieldChunks():
+            self._retainNextYieldElement()
+            if self._currentElementOut is None:
+                break
+            currentChunkWireSize = self._wireSize(self._nextYieldChunkSize())
+            if currentChunkWireSize > remainingBufferSize:
+                break  # Retained for the next yield
+            self._writeReply((self._takeNextYieldChunk(),))
+            remainingBufferSize -= currentChunkWireSize
+            numberOfChunks += 1
+        hasMore = self._hasYieldChunks()
+        self._writeReply(("Y E " + str(int(hasMore)) + " " + str(numberOfDropped),))
+        self._flushOutput()
+        self._log.writeLog("Send a burst of " + str(numberOfChunks) + " chunk(s) through serial to remote client. More to come: " + str(hasMore))
+
     def writeToExternalProtocol(self):
         # Wrapper for protocol serial communitation
         if not self._protocolMessageQueue.empty():
             thisProtocolMessage = self._protocolMessageQueue.get()
+            if self._maximumReplySize > 0 and len(thisProtocolMessage) > self._maximumReplySize:
+                # Never overflow the remote buffer, never hand out a reply cut short either
+                self._log.writeLog("Reply too large for the remote client: " + thisProtocolMessage + " Size: " + str(len(thisProtocolMessage)))
+                thisProtocolMessage = (re.match("[A-Z_]*", thisProtocolMessage).group(0) or "X") + "F: Reply too large."
             self._basicOutput(thisProtocolMessage)
             self._log.writeLog("Send through serial to remote client: " + thisProtocolMessage + " Size: " + str(len(thisProtocolMessage)))
         else:
             self._log.writeLog("No protocol messages available. Exiting writeToExternalProtocol.")
+        if self._pendingBinaryMode is not None:
+            self._applyBinaryMode(self._pendingBinaryMode)
+            self._pendingBinaryMode = None
 
     def writeToExternalJSON(self):
         # Wrapper for JSON serial communication
         # Only ONE JSON payload will be tracked, this method will be called in a loop util there is not more chunks for THIS payload
         if self._jsonBuf != "":
-            self._txBuf = self._jsonBuf[0:self._chunkSize]
+            self._txBuf = self._jsonBuf[0:self._jsonChunkSize]
             self._basicOutput(self._txBuf)
             self._log.writeLog("JSON: Send through serial to remote client. Chunk: " + self._txBuf + " Size: " + str(len(self._txBuf)))
-            self._jsonBuf = self._jsonBuf[self._chunkSize:]
+            self._jsonBuf = self._jsonBuf[self._jsonChunkSize:]
         else:
             self._basicOutput("J0F: No JSON chunks.")
             self._log.writeLog("No more chunks for this JSON payload. Exiting writeToExternalJSON.")
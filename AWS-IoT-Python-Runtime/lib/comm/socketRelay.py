@@ -0,0 +1,83 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# This class pipes a local stream pair (stdin/stdout of the Bridge process) to a runtime daemon on a UNIX domain socket.
+# Bytes go through as they are, both ways, so the sketch talks to the daemon exactly as it would to run.py.
+# It only needs the standard library, so the process the sketch launches starts in no time.
+# The relay ends when either side closes.
+
+import os
+import time
+import errno
+import select
+import socket
+
+
+class socketRelay:
+
+    _READ_SIZE = 4096
+    _CONNECT_RETRY_INTERVAL = 0.05
+
+    def __init__(self, srcAddress, srcInputFileDescriptor=0, srcOutputFileDescriptor=1):
+        if srcAddress is None:
+            raise TypeError("None type inputs detected.")
+        self._address = srcAddress
+        self._inputFileDescriptor = srcInputFileDescriptor
+        self._outputFileDescriptor = srcOutputFileDescriptor
+        self._socket = None
+
+    def connect(self, srcTimeoutSecond=0):
+        # Retry until the daemon listens or srcTimeoutSecond has passed, raise socket.error if it never does
+        deadline = time.time() + srcTimeoutSecond
+        while True:
+            currentSocket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                currentSocket.connect(self._address)
+                self._socket = currentSocket
+                return
+            except socket.error as e:
+                currentSocket.close()
+                if e.errno not in [errno.ENOENT, errno.ECONNREFUSED] or time.time() >= deadline:
+                    raise
+            time.sleep(self._CONNECT_RETRY_INTERVAL)
+
+    def _writeAll(self, srcFileDescriptor, srcContent):
+        while len(srcContent) > 0:
+            srcContent = srcContent[os.write(srcFileDescriptor, srcContent):]
+
+    def run(self):
+        socketFileDescriptor = self._socket.fileno()
+        try:
+            while True:
+                readableList = select.select([self._inputFileDescriptor, socketFileDescriptor], [], [])[0]
+                if self._inputFileDescriptor in readableList:
+                    content = os.read(self._inputFileDescriptor, self._READ_SIZE)
+                    if len(content) == 0:
+                        break  # Sketch side closed
+                    self._socket.sendall(content)
+                if socketFileDescriptor in readableList:
+                    content = self._socket.recv(self._READ_SIZE)
+                    if len(content) == 0:
+                        break  # Daemon side closed
+                    self._writeAll(self._outputFileDescriptor, content)
+        finally:
+            self.close()
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
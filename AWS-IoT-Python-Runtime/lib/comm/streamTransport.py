@@ -0,0 +1,143 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Transports carry the serial bridge protocol between a remote client and serialCommunicationServer.
+# A transport is a readable file descriptor (driven by bufferedInputReader) plus a writable file object for replies.
+# streamTransport: stdin/stdout, the Bridge library on the Yun. Also wraps any given file descriptor.
+# ttyTransport: A tty device, e.g. a USB serial adapter.
+# ptyTransport: A new pseudo terminal, clients open the slave side by its name.
+# socketTransport: A connected UNIX domain or TCP socket, accepted by socketListener.
+
+import os
+import sys
+
+
+class streamTransport:
+    def __init__(self, srcInputFileDescriptor=None, srcOutputFile=None):
+        # No input file descriptor means stdin, no output file means whatever sys.stdout is at the time of writing
+        if srcInputFileDescriptor is None:
+            srcInputFileDescriptor = sys.stdin.fileno()
+        self._inputFileDescriptor = srcInputFileDescriptor
+        self._outputFile = srcOutputFile
+
+    def getInputFileDescriptor(self):
+        return self._inputFileDescriptor
+
+    def getOutputFile(self):
+        if self._outputFile is None:
+            return sys.stdout
+        return self._outputFile
+
+    def isTerminal(self):
+        return os.isatty(self._inputFileDescriptor)
+
+    def getName(self):
+        return "stdio"
+
+    def close(self):
+        pass  # stdin/stdout belong to the process
+
+
+class ttyTransport(streamTransport):
+    def __init__(self, srcDevicePath):
+        if srcDevicePath is None:
+            raise TypeError("None type inputs detected.")
+        self._devicePath = srcDevicePath
+        fileDescriptor = os.open(srcDevicePath, os.O_RDWR | os.O_NOCTTY)
+        streamTransport.__init__(self, fileDescriptor, os.fdopen(os.dup(fileDescriptor), "wb"))
+
+    def getName(self):
+        return "tty:" + self._devicePath
+
+    def close(self):
+        self._outputFile.close()
+        os.close(self._inputFileDescriptor)
+
+
+class ptyTransport(ttyTransport):
+    def __init__(self):
+        # The runtime keeps the master side, the slave side stays open so that clients can come and go
+        masterFileDescriptor, self._slaveFileDescriptor = os.openpty()
+        self._devicePath = os.ttyname(self._slaveFileDescriptor)
+        streamTransport.__init__(self, masterFileDescriptor, os.fdopen(os.dup(masterFileDescriptor), "wb"))
+
+    def getSlaveName(self):
+        return self._devicePath
+
+    def getName(self):
+        return "pty:" + self._devicePath
+
+    def close(self):
+        ttyTransport.close(self)
+        os.close(self._slaveFileDescriptor)
+
+
+class socketTransport(streamTransport):
+    def __init__(self, srcSocket, srcPeerName):
+        if srcSocket is None:
+            raise TypeError("None type inputs detected.")
+        self._socket = srcSocket
+        self._peerName = str(srcPeerName)
+        streamTransport.__init__(self, srcSocket.fileno(), os.fdopen(os.dup(srcSocket.fileno()), "wb"))
+
+    def isTerminal(self):
+        return False
+
+    def getName(self):
+        return "socket:" + self._peerName
+
+    def close(self):
+        try:
+            self._outputFile.close()
+        except IOError:
+            pass  # Remote client already gone
+        self._socket.close()
+
+
+class socketListener:
+    # srcAddress: a path for a UNIX domain socket, (host, port) for a TCP socket
+    def __init__(self, srcAddress, srcBacklog=5):
+        if srcAddress is None:
+            raise TypeError("None type inputs detected.")
+        import socket  # Only the socket transports need it, the serial port path starts without it
+        self._address = srcAddress
+        if isinstance(srcAddress, str):
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            if os.path.exists(srcAddress):
+                os.unlink(srcAddress)  # Left over from a previous run
+        else:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(srcAddress)
+        self._socket.listen(srcBacklog)
+
+    def getAddress(self):
+        # The actual address, with the assigned port if port 0 was requested
+        return self._socket.getsockname()
+
+    def acceptTransport(self):
+        # Block until a new remote client connects
+        import socket
+        clientSocket, peerName = self._socket.accept()
+        if clientSocket.family == socket.AF_INET:
+            clientSocket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # Replies are small and latency bound
+        return socketTransport(clientSocket, peerName or self._address)
+
+    def close(self):
+        self._socket.close()
+        if isinstance(self._address, str) and os.path.exists(self._address):
+            os.unlink(self._address)
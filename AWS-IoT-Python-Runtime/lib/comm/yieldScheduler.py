@@ -0,0 +1,325 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# This class implements the yield queue as a set of FIFO lanes served in priority order.
+# Each message goes into a lane picked by its sketch slot, if that slot has its own priority, or by its message class.
+# Lower priority numbers are served first. Messages within one lane keep their arrival order.
+# Locking (commandLockSize) takes a snapshot of every lane, only those messages are handed out until the next lock.
+# Messages arriving after the lock wait for the next yield, whatever their priority.
+# The queue can be bounded by number of messages and by total payload bytes, 0 means no limit:
+# DROP_OLDEST: Drop the head of the lowest priority lane until the new message fits.
+# DROP_NEWEST: Drop the new incoming message when it does not fit.
+# DROP_SLOT_QUOTA: A sketch slot holding slotQuota messages drops its own oldest one for the new one.
+#                  When the queue is still full, the slot with the most queued messages drops its oldest one.
+# A message larger than the byte limit on its own is dropped as it comes.
+# Every dropped message is counted for its sketch slot.
+# A coalescing sketch slot keeps at most one pending subscription/delta message: a newer one replaces its payload,
+# keeping its place in the queue. Messages already handed out for yield are not affected.
+# A newer payload that would exceed the byte limit in place is dropped under DROP_NEWEST, otherwise it replaces the
+# pending one by going to the back of its lane through the drop policy.
+
+import threading
+from collections import deque
+
+
+class yieldScheduler:
+
+    CLASS_SHADOW_RESPONSE = "shadow"  # Shadow get/update/delete accepted/rejected
+    CLASS_TIMEOUT = "timeout"  # Shadow request timeout
+    CLASS_DELTA = "delta"  # Shadow delta
+    CLASS_SUBSCRIPTION = "sub"  # Plain MQTT subscription
+    CLASS_TICKET = "ticket"  # Completion of an async command
+
+    _DROPBEHAVIOR_OLDEST = 0
+    _DROPBEHAVIOR_NEWEST = 1
+    _DROPBEHAVIOR_SLOT_QUOTA = 2
+
+    _MAXIMUM_PRIORITY = 9
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._classPriority = dict()
+        self._classPriority[self.CLASS_SHADOW_RESPONSE] = 0
+        self._classPriority[self.CLASS_TIMEOUT] = 1
+        self._classPriority[self.CLASS_DELTA] = 2
+        self._classPriority[self.CLASS_SUBSCRIPTION] = 3
+        self._classPriority[self.CLASS_TICKET] = 0
+        self._slotPriority = dict()
+        # A lane is two deques of the same length, so that no (sketchSlotNumber, payload) tuple is kept per queued record
+        self._lanes = dict()  # priority -> deque of payloads, a replaceable coalescing payload is wrapped in a list: [payload]
+        self._laneSlots = dict()  # priority -> deque of sketchSlotNumbers
+        self._lockedLaneSizes = dict()  # priority -> number of locked records left in this lane
+        self._priorityOrder = []  # Sorted priorities of existing lanes
+        self._size = 0
+        self._lockedSize = 0
+        self._bytes = 0
+        self._slotSizes = dict()  # sketchSlotNumber -> number of queued records
+        # Limits, 0 means no limit
+        self._maximumSize = 0
+        self._maximumBytes = 0
+        self._dropBehavior = self._DROPBEHAVIOR_OLDEST
+        self._slotQuota = 0
+        # Drop statistics
+        self._dropCounts = dict()  # sketchSlotNumber -> number of dropped records
+        self._droppedSinceReport = 0
+        # Coalescing
+        self._coalescingSlots = set()
+        self._pendingCoalesced = dict()  # sketchSlotNumber -> queued [payload] that can still be replaced
+        self._coalescedCount = 0
+
+    def _validatePriority(self, srcPriority):
+        if not isinstance(srcPriority, int):
+            raise TypeError("Priority must be an integer.")
+        if srcPriority < 0 or srcPriority > self._MAXIMUM_PRIORITY:
+            raise ValueError("Priority must be within 0 and " + str(self._MAXIMUM_PRIORITY) + ".")
+
+    def setClassPriority(self, srcMessageClass, srcPriority):
+        if srcMessageClass not in self._classPriority:
+            raise ValueError("Unsupported message class: " + str(srcMessageClass))
+        self._validatePriority(srcPriority)
+        self._lock.acquire()
+        self._classPriority[srcMessageClass] = srcPriority
+        self._lock.release()
+
+    def setSlotPriority(self, srcSketchSlotNumber, srcPriority):
+        self._validatePriority(srcPriority)
+        self._lock.acquire()
+        self._slotPriority[srcSketchSlotNumber] = srcPriority
+        self._lock.release()
+
+    def clearSlotPriority(self, srcSketchSlotNumber):
+        self._lock.acquire()
+        self._slotPriority.pop(srcSketchSlotNumber, None)
+        self._lock.release()
+
+    def getPriority(self, srcSketchSlotNumber, srcMessageClass):
+        ret = self._slotPriority.get(srcSketchSlotNumber)
+        if ret is None:
+            ret = self._classPriority.get(srcMessageClass, self._classPriority[self.CLASS_SUBSCRIPTION])
+        return ret
+
+    def setQueueing(self, srcMaximumSize, srcMaximumBytes, srcDropBehavior=_DROPBEHAVIOR_OLDEST, srcSlotQuota=0):
+        if not isinstance(srcMaximumSize, int) or not isinstance(srcMaximumBytes, int) or not isinstance(srcDropBehavior, int) or not isinstance(srcSlotQuota, int):
+            raise TypeError("MaximumSize/MaximumBytes/DropBehavior/SlotQuota must be integer.")
+        if srcMaximumSize < 0 or srcMaximumBytes < 0 or srcSlotQuota < 0:
+            raise ValueError("MaximumSize/MaximumBytes/SlotQuota must be greater than or equal to zero.")
+        if srcDropBehavior not in [self._DROPBEHAVIOR_OLDEST, self._DROPBEHAVIOR_NEWEST, self._DROPBEHAVIOR_SLOT_QUOTA]:
+            raise ValueError("Drop behavior not supported, must be 0-drop_oldest, 1-drop_newest or 2-slot_quota.")
+        self._lock.acquire()
+        self._maximumSize = srcMaximumSize
+        self._maximumBytes = srcMaximumBytes
+        self._dropBehavior = srcDropBehavior
+        self._slotQuota = srcSlotQuota
+        self._lock.release()
+
+    def setSlotCoalescing(self, srcSketchSlotNumber, srcCoalescing):
+        self._lock.acquire()
+        if srcCoalescing:
+            self._coalescingSlots.add(srcSketchSlotNumber)
+        else:
+            self._coalescingSlots.discard(srcSketchSlotNumber)
+            self._pendingCoalesced.pop(srcSketchSlotNumber, None)
+        self._lock.release()
+
+    def isSlotCoalescing(self, srcSketchSlotNumber):
+        return srcSketchSlotNumber in self._coalescingSlots
+
+    def getCoalescedCount(self):
+        # Number of messages replaced by a newer one since start
+        return self._coalescedCount
+
+    def _getLane(self, srcPriority):
+        lane = self._lanes.get(srcPriority)
+        if lane is None:
+            lane = deque()
+            self._lanes[srcPriority] = lane
+            self._laneSlots[srcPriority] = deque()
+            self._lockedLaneSizes[srcPriority] = 0
+            self._priorityOrder = sorted(self._lanes.keys())
+        return lane
+
+    def _needDropMessages(self, srcPayloadSize):
+        isCountFull = self._maximumSize > 0 and self._size >= self._maximumSize
+        isBytesFull = self._maximumBytes > 0 and self._bytes + srcPayloadSize > self._maximumBytes
+        return isCountFull or isBytesFull
+
+    def _countDrop(self, srcSketchSlotNumber):
+        self._dropCounts[srcSketchSlotNumber] = self._dropCounts.get(srcSketchSlotNumber, 0) + 1
+        self._droppedSinceReport += 1
+
+    def _removeRecord(self, srcPriority, srcIndex):
+        # Remove the record at srcIndex in the lane, keep the locked part of the lane consistent
+        lane = self._lanes[srcPriority]
+        laneSlots = self._laneSlots[srcPriority]
+        payload = lane[srcIndex]
+        sketchSlotNumber = laneSlots[srcIndex]
+        del lane[srcIndex]
+        del laneSlots[srcIndex]
+        if type(payload) is list:
+            if self._pendingCoalesced.get(sketchSlotNumber) is payload:
+                del self._pendingCoalesced[sketchSlotNumber]
+            payload = payload[0]
+        if srcIndex < self._lockedLaneSizes[srcPriority]:
+            self._lockedLaneSizes[srcPriority] -= 1
+            self._lockedSize -= 1
+        self._size -= 1
+        self._bytes -= len(payload)
+        remainingSlotSize = self._slotSizes[sketchSlotNumber] - 1
+        if remainingSlotSize > 0:
+            self._slotSizes[sketchSlotNumber] = remainingSlotSize
+        else:
+            del self._slotSizes[sketchSlotNumber]
+        return (sketchSlotNumber, payload)
+
+    def _dropOldest(self):
+        for priority in reversed(self._priorityOrder):
+            if len(self._lanes[priority]) > 0:
+                self._countDrop(self._removeRecord(priority, 0)[0])
+                break
+
+    def _dropOldestOfSlot(self, srcSketchSlotNumber):
+        # Records of one slot can sit in different lanes, start from the lowest priority one
+        for priority in reversed(self._priorityOrder):
+            index = 0
+            for sketchSlotNumber in self._laneSlots[priority]:
+                if sketchSlotNumber == srcSketchSlotNumber:
+                    self._countDrop(self._removeRecord(priority, index)[0])
+                    return
+                index += 1
+
+    def _removePendingCoalesced(self, srcSketchSlotNumber):
+        pendingRecord = self._pendingCoalesced[srcSketchSlotNumber]
+        for priority in self._priorityOrder:
+            index = 0
+            for payload in self._lanes[priority]:
+                if payload is pendingRecord:
+                    self._removeRecord(priority, index)
+                    return
+                index += 1
+
+    # srcRecord: (sketchSlotNumber, payload)
+    # Return True if the record is queued or coalesced into a pending one
+    # Return False if it is dropped
+    def put(self, srcRecord, srcMessageClass=CLASS_SUBSCRIPTION):
+        ret = True
+        sketchSlotNumber = srcRecord[0]
+        payloadSize = len(srcRecord[1])
+        isCoalescing = sketchSlotNumber in self._coalescingSlots and srcMessageClass in [self.CLASS_SUBSCRIPTION, self.CLASS_DELTA]
+        self._lock.acquire()
+        try:
+            pendingRecord = self._pendingCoalesced.get(sketchSlotNumber) if isCoalescing else None
+            if pendingRecord is not None:
+                growth = payloadSize - len(pendingRecord[0])
+                if self._maximumBytes == 0 or self._bytes + growth <= self._maximumBytes:
+                    self._bytes += growth
+                    pendingRecord[0] = srcRecord[1]
+                    self._coalescedCount += 1
+                    return ret
+                if self._dropBehavior == self._DROPBEHAVIOR_NEWEST or payloadSize > self._maximumBytes:
+                    # The pending payload stays
+                    self._countDrop(sketchSlotNumber)
+                    return False
+                # The newer payload does not fit in place, it is queued like a new message and goes through the drop policy
+                self._removePendingCoalesced(sketchSlotNumber)
+                self._coalescedCount += 1
+            if self._maximumBytes > 0 and payloadSize > self._maximumBytes:
+                # Would never fit, drop it without emptying the queue first
+                self._countDrop(sketchSlotNumber)
+                return False
+            if self._dropBehavior == self._DROPBEHAVIOR_SLOT_QUOTA and self._slotQuota > 0:
+                while self._slotSizes.get(sketchSlotNumber, 0) >= self._slotQuota:
+                    self._dropOldestOfSlot(sketchSlotNumber)
+            while self._size > 0 and self._dropBehavior != self._DROPBEHAVIOR_NEWEST and self._needDropMessages(payloadSize):
+                if self._dropBehavior == self._DROPBEHAVIOR_OLDEST:
+                    self._dropOldest()
+                else:
+                    self._dropOldestOfSlot(max(self._slotSizes, key=self._slotSizes.get))
+            if self._needDropMessages(payloadSize):
+                # Still does not fit, drop the new one
+                self._countDrop(sketchSlotNumber)
+                ret = False
+            else:
+                payload = srcRecord[1]
+                if isCoalescing:
+                    payload = [payload]  # Mutable, so that newer payloads can replace this one
+                    self._pendingCoalesced[sketchSlotNumber] = payload
+                priority = self.getPriority(sketchSlotNumber, srcMessageClass)
+                self._getLane(priority).append(payload)
+                self._laneSlots[priority].append(sketchSlotNumber)
+                self._size += 1
+                self._bytes += payloadSize
+                self._slotSizes[sketchSlotNumber] = self._slotSizes.get(sketchSlotNumber, 0) + 1
+        finally:
+            self._lock.release()
+        return ret
+
+    def qsize(self):
+        return self._size
+
+    def getBytes(self):
+        return self._bytes
+
+    def lockSize(self):
+        # Snapshot all lanes, return the total number of locked records
+        self._lock.acquire()
+        for priority in self._priorityOrder:
+            self._lockedLaneSizes[priority] = len(self._lanes[priority])
+        self._lockedSize = self._size
+        self._lock.release()
+        return self._lockedSize
+
+    def getLockedSize(self):
+        # Locked records can also leave the queue by being dropped
+        return self._lockedSize
+
+    def getLocked(self):
+        # Return the locked record with the highest priority, None if nothing is locked
+        ret = None
+        self._lock.acquire()
+        for priority in self._priorityOrder:
+            if self._lockedLaneSizes[priority] > 0:
+                ret = self._removeRecord(priority, 0)
+                break
+        self._lock.release()
+        return ret
+
+    def getDropCounts(self):
+        # sketchSlotNumber -> number of dropped records since start
+        self._lock.acquire()
+        ret = dict(self._dropCounts)
+        self._lock.release()
+        return ret
+
+    def takeDropReport(self):
+        # Number of dropped records since the last report
+        self._lock.acquire()
+        ret = self._droppedSinceReport
+        self._droppedSinceReport = 0
+        self._lock.release()
+        return ret
+
+    def getQueuedRecords(self):
+        # All queued records in the order they would be served if everything was locked
+        self._lock.acquire()
+        ret = []
+        for priority in self._priorityOrder:
+            for sketchSlotNumber, payload in zip(self._laneSlots[priority], self._lanes[priority]):
+                if type(payload) is list:
+                    payload = payload[0]
+                ret.append((sketchSlotNumber, payload))
+        self._lock.release()
+        return ret
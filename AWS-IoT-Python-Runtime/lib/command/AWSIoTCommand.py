@@ -17,10 +17,15 @@
 
 
 class AWSIoTCommand:
+    # Declared by each command class, collected by the commandRegistry
     _commandProtocolName = None
+    _parameterCounts = None  # Numbers of parameters a well-formed request can have, None if the command checks them itself
+    _opcode = None  # Opcode in binary framing mode, None if there is none
+    _isReusable = False  # Keeps no per-request state, can be handed the parameters of the next request
     _parameterList = None
     _serialCommServerHandler = None
     _desiredNumberOfParameters = 0
+    _isWellFormed = None  # Number of parameters already checked by the commandRegistry, None if not checked
     _initSuccess = True
 
     def __init__(self, srcCommandProtocolName="x"):
@@ -30,12 +35,30 @@ class AWSIoTCommand:
     def _validateCommand(self):
         if self._parameterList is None:
             return False
+        elif self._isWellFormed is not None:
+            return self._isWellFormed
         else:
-            return len(self._parameterList) == self._desiredNumberOfParameters
+            return self._checkParameterCount()
+
+    def _checkParameterCount(self):
+        return len(self._parameterList) == self._desiredNumberOfParameters
+
+    def setWellFormed(self, srcIsWellFormed):
+        self._isWellFormed = srcIsWellFormed
 
     def getCommandProtocolName(self):
         return self._commandProtocolName
 
+    def setParameterList(self, srcParameterList):
+        # Reuse this command for a new request
+        self._parameterList = srcParameterList
+
+    def getParameterList(self):
+        return self._parameterList
+
+    def setSerialCommServerHandler(self, srcSerialCommuteServer):
+        self._serialCommServerHandler = srcSerialCommuteServer
+
     def setInitSuccess(self, src):
         self._initSuccess = src
 
@@ -0,0 +1,88 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+import sys
+sys.path.append("../lib/exception/")
+import AWSIoTCommand
+
+
+class commandBatch(AWSIoTCommand.AWSIoTCommand):
+    # Target API: None, sub-commands are executed by runtimeHub, in order
+    # Parameter list: <numberOfSubCommands> followed by, for each sub-command: <numberOfParameters> <protocolName> <parameters...>
+    # Reply: B <numberOfSubCommands> <length>:<reply><length>:<reply>...
+    # Each sub-command keeps its own reply code, e.g. "P T" or "S3F: ..."
+    _commandProtocolName = "b"
+    _parameterCounts = None
+    _opcode = 0x97
+    _isReusable = False
+
+    _subCommandList = None
+
+    def __init__(self, srcParameterList, srcSerialCommuteServer):
+        self._parameterList = srcParameterList
+        self._serialCommServerHandler = srcSerialCommuteServer
+        self._desiredNumberOfParameters = 1  # At least
+        self._subCommandList = None
+
+    def _checkParameterCount(self):
+        return len(self._parameterList) >= self._desiredNumberOfParameters
+
+    def _validateCommand(self):
+        return self._serialCommServerHandler is not None and AWSIoTCommand.AWSIoTCommand._validateCommand(self)
+
+    def _parseSubCommands(self):
+        # Return the list of sub-command protocol messages, or None if the envelope does not add up
+        ret = []
+        numberOfSubCommands = int(self._parameterList[0])
+        currentIndex = 1
+        while len(ret) < numberOfSubCommands:
+            if currentIndex >= len(self._parameterList):
+                return None
+            numberOfParameters = int(self._parameterList[currentIndex])
+            subCommandEnd = currentIndex + 2 + numberOfParameters
+            if numberOfParameters < 0 or subCommandEnd > len(self._parameterList):
+                return None
+            ret.append(self._parameterList[currentIndex + 1:subCommandEnd])
+            currentIndex = subCommandEnd
+        if currentIndex != len(self._parameterList):
+            return None
+        return ret
+
+    def getSubCommandList(self):
+        return self._subCommandList
+
+    def formatReply(self, srcReplyList):
+        ret = "B " + str(len(srcReplyList))
+        if len(srcReplyList) > 0:
+            ret += " " + "".join([str(len(reply)) + ":" + reply for reply in srcReplyList])
+        return ret
+
+    def execute(self):
+        # No returnMessage on success, the combined reply is made by runtimeHub once all sub-commands are executed
+        returnMessage = None
+        if not self._validateCommand():
+            returnMessage = "B1F: " + "Invalid information."
+        else:
+            try:
+                self._subCommandList = self._parseSubCommands()
+                if self._subCommandList is None:
+                    returnMessage = "B1F: " + "Invalid information."
+            except ValueError as e:
+                returnMessage = "B1F: " + "Invalid information."
+            except Exception as e:
+                returnMessage = "BFF: " + "Unknown error."
+        if returnMessage is not None:
+            self._serialCommServerHandler.writeToInternalProtocol(returnMessage)
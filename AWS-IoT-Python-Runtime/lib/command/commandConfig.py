@@ -20,10 +20,13 @@ import AWSIoTCommand
 
 class commandConfig(AWSIoTCommand.AWSIoTCommand):
     # Target API: mqttCore.config(srcHost, srcPort, srcCAFile, srcKey, srcCert)
+    _commandProtocolName = "g"
+    _parameterCounts = [5]
+    _opcode = 0x81
+    _isReusable = True
     _mqttCoreHandler = None
 
     def __init__(self, srcParameterList, srcSerialCommuteServer, srcMQTTCore):
-        self._commandProtocolName = "g"
         self._parameterList = srcParameterList
         self._serialCommServerHandler = srcSerialCommuteServer
         self._mqttCoreHandler = srcMQTTCore
@@ -25,10 +25,13 @@ from AWSIoTExceptions import connectTimeoutException
 
 class commandConnect(AWSIoTCommand.AWSIoTCommand):
     # Target API: mqttCore.connect(keepAliveInterval)
+    _commandProtocolName = "c"
+    _parameterCounts = [1]
+    _opcode = 0x82
+    _isReusable = False
     _mqttCoreHandler = None
 
     def __init__(self, srcParameterList, srcSerialCommuteServer, srcMQTTCore):
-        self._commandProtocolName = "c"
         self._parameterList = srcParameterList
         self._serialCommServerHandler = srcSerialCommuteServer
         self._mqttCoreHandler = srcMQTTCore
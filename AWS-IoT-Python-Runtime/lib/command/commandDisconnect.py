@@ -24,10 +24,13 @@ from AWSIoTExceptions import disconnectTimeoutException
 
 class commandDisconnect(AWSIoTCommand.AWSIoTCommand):
     # Target API: mqttCore.disconnect()
+    _commandProtocolName = "d"
+    _parameterCounts = [0]
+    _opcode = 0x83
+    _isReusable = False
     _mqttCoreHandler = None
 
     def __init__(self, srcParameterList, srcSerialCommuteServer, srcMQTTCore):
-        self._commandProtocolName = "d"
         self._parameterList = srcParameterList
         self._serialCommServerHandler = srcSerialCommuteServer
         self._mqttCoreHandler = srcMQTTCore
@@ -6,10 +6,13 @@ import AWSIoTCommand
 class commandJSONKeyVal(AWSIoTCommand.AWSIoTCommand):
     # Target API: getDesired/ReportedValueByKey(JSONIdentifier, key, externalJSONBuf, bufSize)
     # Parameter list: <JSONIdentifier> <key> <isFirstLoad>
+    _commandProtocolName = "j"
+    _parameterCounts = [3]
+    _opcode = 0x8F
+    _isReusable = True
     _jsonManagerHandler = None
 
     def __init__(self, srcParameterList, srcSerialCommuteServer, srcJSONManager):
-        self._commandProtocolName = "j"
         self._parameterList = srcParameterList
         self._serialCommuteServerHandler = srcSerialCommuteServer
         self._jsonManagerHandler = srcJSONManager
@@ -24,7 +27,7 @@ class commandJSONKeyVal(AWSIoTCommand.AWSIoTCommand):
         # Generate the meta data
         metaData = "J "
         # Get configured chunk size
-        configuredChunkSize = self._serialCommuteServerHandler.getChunkSize()
+        configuredChunkSize = self._serialCommuteServerHandler.getJSONChunkSize()
         # Divide the payload into smaller chunks plus  meta data
         messageChunkSize = configuredChunkSize - len(metaData)
         chunks = [metaData + srcValue[i:i + messageChunkSize] for i in range(0, len(srcValue), messageChunkSize)]
@@ -22,9 +22,12 @@ import AWSIoTCommand
 
 class commandLockSize(AWSIoTCommand.AWSIoTCommand):
     # Target API: None
+    _commandProtocolName = "z"
+    _parameterCounts = [0]
+    _opcode = 0x8D
+    _isReusable = True
 
     def __init__(self, srcParameterList, srcSerialCommuteServer):
-        self._commandProtocolName = "z"
         self._parameterList = srcParameterList
         self._serialCommServerHandler = srcSerialCommuteServer
         self._desiredNumberOfParameters = 0
@@ -25,10 +25,15 @@ from AWSIoTExceptions import publishQueueFullException
 
 class commandPublish(AWSIoTCommand.AWSIoTCommand):
     # Target API: mqttCore.publish(topic, payload, qos, retain)
+    # P T means the request was accepted: either handed to paho, or queued in the offline publish queue (offline,
+    # draining in progress or over the publish rate limit) to be sent later. Only a full queue is reported (P5F).
+    _commandProtocolName = "p"
+    _parameterCounts = [4]
+    _opcode = 0x84
+    _isReusable = True
     _mqttCoreHandler = None
 
     def __init__(self, srcParameterList, srcSerialCommuteServer, srcMQTTCore):
-        self._commandProtocolName = "p"
         self._parameterList = srcParameterList
         self._serialCommServerHandler = srcSerialCommuteServer
         self._mqttCoreHandler = srcMQTTCore
@@ -0,0 +1,141 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Table of commands keyed by protocol name, used by runtimeHub to dispatch incoming protocol messages.
+# Each command class declares what the table needs to know about it (see AWSIoTCommand):
+# _commandProtocolName: the protocol name it is registered under
+# _parameterCounts: numbers of parameters a well-formed request can have, checked here when the command is built,
+#                   the command takes this result instead of checking the number of parameters again
+# _opcode: one-byte opcode in binary framing mode
+# _isReusable: the command built for the first well-formed request is kept and handed the parameters of the next ones
+# A command module is registered by name and imported when its command is first requested, its declarations are
+# collected then. Commands without a module of their own are registered with the same declarations given explicitly.
+# Malformed requests always get a fresh command, which reports its own error as before,
+# so a reusable command only ever sees well-formed parameter lists.
+# Commands that run outside the serial loop (async tickets) or keep per-request state must not be reusable.
+
+import importlib
+
+
+class _commandEntry:
+    _factory = None
+    _commandModuleName = None  # Module still to be imported, None once its declarations are collected
+    _parameterCounts = None
+    _reusable = False
+    _opcode = None
+    _cachedCommand = None
+
+    def __init__(self, srcFactory):
+        self._factory = srcFactory
+        self._cachedCommand = None
+
+    def setDeclarations(self, srcParameterCounts, srcReusable, srcOpcode):
+        if srcParameterCounts is not None:
+            self._parameterCounts = frozenset(srcParameterCounts)
+        self._reusable = srcReusable and self._parameterCounts is not None
+        self._opcode = srcOpcode
+
+
+class commandRegistry:
+
+    def __init__(self, srcCommandPackageName="command"):
+        self._commandPackageName = srcCommandPackageName
+        self._entries = dict()
+
+    def register(self, srcProtocolName, srcFactory, srcParameterCounts=None, srcReusable=False, srcOpcode=None):
+        # For commands without a module of their own
+        # srcFactory: callable taking the parameter list, returns an AWSIoTCommand
+        if not callable(srcFactory):
+            raise TypeError("Factory must be callable.")
+        entry = _commandEntry(srcFactory)
+        entry.setDeclarations(srcParameterCounts, srcReusable, srcOpcode)
+        self._entries[srcProtocolName] = entry
+
+    def registerModule(self, srcProtocolName, srcCommandModuleName, srcFactory):
+        # srcCommandModuleName: module of the command package that defines a command class with the module name
+        # srcFactory: callable taking the command class and the parameter list, returns an AWSIoTCommand
+        if not callable(srcFactory):
+            raise TypeError("Factory must be callable.")
+        entry = _commandEntry(srcFactory)
+        entry._commandModuleName = srcCommandModuleName
+        self._entries[srcProtocolName] = entry
+
+    def unregister(self, srcProtocolName):
+        self._entries.pop(srcProtocolName, None)
+
+    def isRegistered(self, srcProtocolName):
+        return srcProtocolName in self._entries
+
+    def resetCommands(self):
+        # Drop kept commands, for when the objects they were built with are replaced
+        for entry in self._entries.itervalues():
+            entry._cachedCommand = None
+
+    def _loadEntry(self, srcProtocolName, srcEntry):
+        # Import the command module and collect the declarations of its command class
+        commandModuleName = srcEntry._commandModuleName
+        commandClass = getattr(importlib.import_module(self._commandPackageName + "." + commandModuleName), commandModuleName)
+        if commandClass._commandProtocolName != srcProtocolName:
+            raise ValueError(commandModuleName + " declares protocol name " + str(commandClass._commandProtocolName) + ", registered as " + srcProtocolName + ".")
+        factory = srcEntry._factory
+        srcEntry._factory = lambda srcParameterList: factory(commandClass, srcParameterList)
+        srcEntry.setDeclarations(commandClass._parameterCounts, commandClass._isReusable, commandClass._opcode)
+        srcEntry._commandModuleName = None
+
+    def _getEntry(self, srcProtocolMessage):
+        entry = self._entries.get(srcProtocolMessage[0]) if len(srcProtocolMessage) > 0 else None
+        if entry is not None and entry._commandModuleName is not None:
+            self._loadEntry(srcProtocolMessage[0], entry)
+        return entry
+
+    def _buildCommand(self, srcEntry, srcParameterList):
+        ret = srcEntry._factory(srcParameterList)
+        if srcEntry._parameterCounts is not None:
+            ret.setWellFormed(len(srcParameterList) in srcEntry._parameterCounts)
+        return ret
+
+    def createCommand(self, srcProtocolMessage):
+        # Always build a new command, None if the protocol name is not registered
+        entry = self._getEntry(srcProtocolMessage)
+        if entry is None:
+            return None
+        return self._buildCommand(entry, srcProtocolMessage[1:])
+
+    def findCommand(self, srcProtocolMessage):
+        # Command for this protocol message, None if the protocol name is not registered
+        entry = self._getEntry(srcProtocolMessage)
+        if entry is None:
+            return None
+        srcParameterList = srcProtocolMessage[1:]
+        if not entry._reusable or len(srcParameterList) not in entry._parameterCounts:
+            return self._buildCommand(entry, srcParameterList)
+        if entry._cachedCommand is None:
+            entry._cachedCommand = self._buildCommand(entry, srcParameterList)
+        else:
+            entry._cachedCommand.setParameterList(srcParameterList)
+        return entry._cachedCommand
+
+    def getOpcodeTable(self):
+        # opcode -> protocol name of every registered command that has one
+        # Command modules that were not needed so far are imported here
+        ret = dict()
+        for protocolName, entry in self._entries.items():
+            if entry._commandModuleName is not None:
+                self._loadEntry(protocolName, entry)
+            if entry._opcode is not None:
+                ret[entry._opcode] = protocolName
+        return ret
@@ -0,0 +1,55 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+import AWSIoTCommand
+
+
+class commandSelectSession(AWSIoTCommand.AWSIoTCommand):
+    # Target API: runtimeHub._selectSession(srcSessionID)
+    # Parameter list: <sessionID>
+    # Following commands ("i", "g", "c", "p", "s", shadow...) go to the mqttCore of this session until the next "ss"
+    # A new session id starts an empty session, "i" makes its mqttCore. Session "0" is selected at start.
+    # Reply: SS T <numberOfSessions>
+    _commandProtocolName = "ss"
+    _parameterCounts = [1]
+    _opcode = 0x9B
+    _isReusable = False
+
+    def __init__(self, srcParameterList, srcSerialCommuteServer, srcSelectSession, srcGetSessionCount):
+        self._parameterList = srcParameterList
+        self._serialCommServerHandler = srcSerialCommuteServer
+        self._selectSessionHandler = srcSelectSession
+        self._getSessionCountHandler = srcGetSessionCount
+        self._desiredNumberOfParameters = 1
+
+    def _validateCommand(self):
+        ret = self._serialCommServerHandler is not None and self._selectSessionHandler is not None
+        return ret and AWSIoTCommand.AWSIoTCommand._validateCommand(self)
+
+    def execute(self):
+        returnMessage = "SS T"
+        if not self._validateCommand():
+            returnMessage = "SS1F: " + "No setup."
+        elif len(self._parameterList[0]) == 0:
+            returnMessage = "SS2F: " + "Invalid session id."
+        else:
+            try:
+                self._selectSessionHandler(self._parameterList[0])
+                returnMessage += " " + str(self._getSessionCountHandler())
+            except Exception as e:
+                returnMessage = "SSFF: " + "Unknown error."
+        self._serialCommServerHandler.writeToInternalProtocol(returnMessage)
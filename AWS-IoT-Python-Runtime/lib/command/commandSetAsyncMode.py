@@ -0,0 +1,54 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+import AWSIoTCommand
+
+
+class commandSetAsyncMode(AWSIoTCommand.AWSIoTCommand):
+    # Target API: ticketExecutor.setAsyncMode(srcEnabled, srcCompletionSlotNumber)
+    # Parameter list: <enabled: 1/0> <completionSlotNumber: sketch slot that receives completion records>
+    # In async mode, connect/disconnect/subscribe/unsubscribe/shadow requests reply "<NAME> A <ticket>" right away
+    # and their usual reply is delivered later as a yield record "<ticket> <reply>" on the completion slot
+    _commandProtocolName = "am"
+    _parameterCounts = [2]
+    _opcode = 0x99
+    _isReusable = True
+
+    def __init__(self, srcParameterList, srcSerialCommuteServer, srcTicketExecutor):
+        self._parameterList = srcParameterList
+        self._serialCommServerHandler = srcSerialCommuteServer
+        self._ticketExecutorHandler = srcTicketExecutor
+        self._desiredNumberOfParameters = 2
+
+    def _validateCommand(self):
+        ret = self._serialCommServerHandler is not None and self._ticketExecutorHandler is not None
+        return ret and AWSIoTCommand.AWSIoTCommand._validateCommand(self)
+
+    def execute(self):
+        returnMessage = "AM T"
+        if not self._validateCommand():
+            returnMessage = "AM1F: " + "No setup."
+        else:
+            try:
+                self._ticketExecutorHandler.setAsyncMode(self._parameterList[0] == "1", int(self._parameterList[1]))
+            except TypeError as e:
+                returnMessage = "AM2F: " + str(e.message)
+            except ValueError as e:
+                returnMessage = "AM3F: " + str(e.message)
+            except Exception as e:
+                returnMessage = "AMFF: " + "Unknown error."
+        self._serialCommServerHandler.writeToInternalProtocol(returnMessage)
@@ -20,10 +20,13 @@ import AWSIoTCommand
 
 class commandSetBackoffTiming(AWSIoTCommand.AWSIoTCommand):
     # Target API: mqttCore.setBackoffTime(srcBaseReconnectTimeSecond, srcMaximumReconnectTimeSecond, srcMinimumConnectTimeSecond)
+    _commandProtocolName = "bf"
+    _parameterCounts = [3]
+    _opcode = 0x90
+    _isReusable = True
     _mqttCoreHandler = None
 
     def __init__(self, srcParameterList, srcSerialCommuteServer, srcMQTTCore):
-        self._commandProtocolName = "bf"
         self._parameterList = srcParameterList
         self._serialCommServerHandler = srcSerialCommuteServer
         self._mqttCoreHandler = srcMQTTCore
@@ -0,0 +1,49 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+import AWSIoTCommand
+
+
+class commandSetBinaryMode(AWSIoTCommand.AWSIoTCommand):
+    # Target API: serialCommunicationServer.setBinaryMode(srcBinaryMode)
+    # Parameter list: <binaryMode: 1-binary framing, 0-line protocol>
+    _commandProtocolName = "bm"
+    _parameterCounts = [1]
+    _opcode = 0x93
+    _isReusable = True
+
+    def __init__(self, srcParameterList, srcSerialCommuteServer):
+        self._parameterList = srcParameterList
+        self._serialCommServerHandler = srcSerialCommuteServer
+        self._desiredNumberOfParameters = 1
+
+    def _validateCommand(self):
+        ret = self._serialCommServerHandler is not None
+        return ret and AWSIoTCommand.AWSIoTCommand._validateCommand(self)
+
+    def execute(self):
+        returnMessage = "BM T"
+        if not self._validateCommand():
+            returnMessage = "BM1F: " + "No setup."
+        elif self._parameterList[0] not in ["0", "1"]:
+            returnMessage = "BM2F: " + "Unsupported framing mode."
+        else:
+            try:
+                self._serialCommServerHandler.setBinaryMode(self._parameterList[0] == "1")
+            except Exception as e:
+                returnMessage = "BMFF: " + "Unknown error."
+        self._serialCommServerHandler.writeToInternalProtocol(returnMessage)
@@ -0,0 +1,54 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+import AWSIoTCommand
+
+
+class commandSetChunkSize(AWSIoTCommand.AWSIoTCommand):
+    # Target API: serialCommunicationServer.negotiateChunkSize(srcSketchBufferSize, srcChunkSize, srcJSONChunkSize)
+    # Parameter list: <sketchBufferSize> <yieldChunkSize: 0-biggest that fits> <jsonChunkSize: 0-biggest that fits>
+    # Reply: CS T <yieldChunkSize> <jsonChunkSize>, the sizes in effect for the rest of the session
+    # Any later reply longer than sketchBufferSize - 1 comes as <NAME>F: Reply too large. instead
+    _commandProtocolName = "cs"
+    _parameterCounts = [3]
+    _opcode = 0x98
+    _isReusable = True
+
+    def __init__(self, srcParameterList, srcSerialCommuteServer):
+        self._parameterList = srcParameterList
+        self._serialCommServerHandler = srcSerialCommuteServer
+        self._desiredNumberOfParameters = 3
+
+    def _validateCommand(self):
+        ret = self._serialCommServerHandler is not None
+        return ret and AWSIoTCommand.AWSIoTCommand._validateCommand(self)
+
+    def execute(self):
+        returnMessage = "CS T"
+        if not self._validateCommand():
+            returnMessage = "CS1F: " + "No setup."
+        else:
+            try:
+                self._serialCommServerHandler.negotiateChunkSize(int(self._parameterList[0]), int(self._parameterList[1]), int(self._parameterList[2]))
+                returnMessage += " " + str(self._serialCommServerHandler.getChunkSize()) + " " + str(self._serialCommServerHandler.getJSONChunkSize())
+            except TypeError as e:
+                returnMessage = "CS2F: " + str(e.message)
+            except ValueError as e:
+                returnMessage = "CS3F: " + str(e.message)
+            except Exception as e:
+                returnMessage = "CSFF: " + "Unknown error."
+        self._serialCommServerHandler.writeToInternalProtocol(returnMessage)
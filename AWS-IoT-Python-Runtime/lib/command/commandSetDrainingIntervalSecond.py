@@ -20,10 +20,13 @@ import AWSIoTCommand
 
 class commandSetDrainingIntervalSecond(AWSIoTCommand.AWSIoTCommand):
     # Target API: mqttCore.setDrainingIntervalSecond(srcDrainingIntervalSecond)
+    _commandProtocolName = "di"
+    _parameterCounts = [1]
+    _opcode = 0x92
+    _isReusable = True
     _mqttCoreHandler = None
 
     def __init__(self, srcParameterList, srcSerialCommuteServer, srcMQTTCore):
-        self._commandProtocolName = "di"
         self._parameterList = srcParameterList
         self._serialCommServerHandler = srcSerialCommuteServer
         self._mqttCoreHandler = srcMQTTCore
@@ -19,16 +19,24 @@ import AWSIoTCommand
 
 
 class commandSetOfflinePublishQueueing(AWSIoTCommand.AWSIoTCommand):
-    # Target API: mqttCore.setOfflinePublishQueueing(srcQueueSize, srcDropBehavior)
+    # Target API: mqttCore.setOfflinePublishQueueing(srcQueueSize, srcDropBehavior, srcMaximumBytes)
+    # Parameter list: <queueSize> <dropBehavior: 0-drop_oldest, 1-drop_newest> [maximumBytes]
+    _commandProtocolName = "pq"
+    _parameterCounts = [2, 3]
+    _opcode = 0x91
+    _isReusable = True
     _mqttCoreHandler = None
 
     def __init__(self, srcParameterList, srcSerialCommuteServer, srcMQTTCore):
-        self._commandProtocolName = "pq"
         self._parameterList = srcParameterList
         self._serialCommServerHandler = srcSerialCommuteServer
         self._mqttCoreHandler = srcMQTTCore
         self._desiredNumberOfParameters = 2
 
+    def _checkParameterCount(self):
+        # With or without the maximum bytes
+        return len(self._parameterList) - self._desiredNumberOfParameters in [0, 1]
+
     def _validateCommand(self):
         ret = self._mqttCoreHandler is not None and self._serialCommServerHandler is not None
         return ret and AWSIoTCommand.AWSIoTCommand._validateCommand(self)
@@ -39,7 +47,10 @@ class commandSetOfflinePublishQueueing(AWSIoTCommand.AWSIoTCommand):
             returnMessage = "PQ1F: " + "No setup."
         else:
             try:
-                self._mqttCoreHandler.setOfflinePublishQueueing(int(self._parameterList[0]), int(self._parameterList[1]))
+                maximumBytes = None  # Keep the byte limit in place
+                if len(self._parameterList) > self._desiredNumberOfParameters:
+                    maximumBytes = int(self._parameterList[2])
+                self._mqttCoreHandler.setOfflinePublishQueueing(int(self._parameterList[0]), int(self._parameterList[1]), maximumBytes)
             except TypeError as e:
                 returnMessage = "PQ2F: " + str(e.message)
             except ValueError as e:
@@ -0,0 +1,50 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+import AWSIoTCommand
+
+
+class commandSetYieldEncoding(AWSIoTCommand.AWSIoTCommand):
+    # Target API: serialCommunicationServer.setYieldDeltaEncoding(srcSketchSlotNumber, srcDeltaEncoding)
+    # Parameter list: <sketchSlotNumber> <deltaEncoding: 1 for changed fields as path=value records, 0 for whole payloads>
+    # Removed fields come as a bare path, see jsonDeltaEncoder
+    _commandProtocolName = "ye"
+    _parameterCounts = [2]
+    _opcode = 0x9A
+    _isReusable = True
+
+    def __init__(self, srcParameterList, srcSerialCommuteServer):
+        self._parameterList = srcParameterList
+        self._serialCommServerHandler = srcSerialCommuteServer
+        self._desiredNumberOfParameters = 2
+
+    def _validateCommand(self):
+        ret = self._serialCommServerHandler is not None
+        return ret and AWSIoTCommand.AWSIoTCommand._validateCommand(self)
+
+    def execute(self):
+        returnMessage = "YE T"
+        if not self._validateCommand():
+            returnMessage = "YE1F: " + "No setup."
+        else:
+            try:
+                self._serialCommServerHandler.setYieldDeltaEncoding(int(self._parameterList[0]), self._parameterList[1] == "1")
+            except ValueError:
+                returnMessage = "YE2F: " + "Invalid sketch slot number."
+            except Exception as e:
+                returnMessage = "YEFF: " + "Unknown error."
+        self._serialCommServerHandler.writeToInternalProtocol(returnMessage)
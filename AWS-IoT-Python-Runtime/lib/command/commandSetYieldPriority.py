@@ -0,0 +1,58 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+import AWSIoTCommand
+
+
+class commandSetYieldPriority(AWSIoTCommand.AWSIoTCommand):
+    # Target API: yieldScheduler.setClassPriority(srcMessageClass, srcPriority)/setSlotPriority(srcSketchSlotNumber, srcPriority)
+    # Parameter list: <target: shadow/timeout/delta/sub/ticket for a message class, sketch slot number otherwise> <priority: 0-9, 0 served first, -1 clears a slot priority>
+    _commandProtocolName = "yp"
+    _parameterCounts = [2]
+    _opcode = 0x95
+    _isReusable = True
+
+    def __init__(self, srcParameterList, srcSerialCommuteServer):
+        self._parameterList = srcParameterList
+        self._serialCommServerHandler = srcSerialCommuteServer
+        self._desiredNumberOfParameters = 2
+
+    def _validateCommand(self):
+        ret = self._serialCommServerHandler is not None
+        return ret and AWSIoTCommand.AWSIoTCommand._validateCommand(self)
+
+    def execute(self):
+        returnMessage = "YP T"
+        if not self._validateCommand():
+            returnMessage = "YP1F: " + "No setup."
+        else:
+            try:
+                scheduler = self._serialCommServerHandler.getYieldScheduler()
+                target = self._parameterList[0]
+                priority = int(self._parameterList[1])
+                if target.isdigit():
+                    if priority == -1:
+                        scheduler.clearSlotPriority(int(target))
+                    else:
+                        scheduler.setSlotPriority(int(target), priority)
+                else:
+                    scheduler.setClassPriority(target, priority)
+            except ValueError:
+                returnMessage = "YP2F: " + "Invalid priority configuration."
+            except Exception as e:
+                returnMessage = "YPFF: " + "Unknown error."
+        self._serialCommServerHandler.writeToInternalProtocol(returnMessage)
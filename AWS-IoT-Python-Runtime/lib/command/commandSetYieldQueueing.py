@@ -0,0 +1,51 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+import AWSIoTCommand
+
+
+class commandSetYieldQueueing(AWSIoTCommand.AWSIoTCommand):
+    # Target API: serialCommunicationServer.setYieldQueueing(srcMaximumSize, srcMaximumBytes, srcDropBehavior, srcSlotQuota)
+    # Parameter list: <maximumSize> <maximumBytes> <dropBehavior: 0-drop_oldest, 1-drop_newest, 2-slot_quota> <slotQuota>
+    _commandProtocolName = "yq"
+    _parameterCounts = [4]
+    _opcode = 0x96
+    _isReusable = True
+
+    def __init__(self, srcParameterList, srcSerialCommuteServer):
+        self._parameterList = srcParameterList
+        self._serialCommServerHandler = srcSerialCommuteServer
+        self._desiredNumberOfParameters = 4
+
+    def _validateCommand(self):
+        ret = self._serialCommServerHandler is not None
+        return ret and AWSIoTCommand.AWSIoTCommand._validateCommand(self)
+
+    def execute(self):
+        returnMessage = "YQ T"
+        if not self._validateCommand():
+            returnMessage = "YQ1F: " + "No setup."
+        else:
+            try:
+                self._serialCommServerHandler.setYieldQueueing(int(self._parameterList[0]), int(self._parameterList[1]), int(self._parameterList[2]), int(self._parameterList[3]))
+            except TypeError as e:
+                returnMessage = "YQ2F: " + str(e.message)
+            except ValueError as e:
+                returnMessage = "YQ3F: " + str(e.message)
+            except Exception as e:
+                returnMessage = "YQFF: " + "Unknown error."
+        self._serialCommServerHandler.writeToInternalProtocol(returnMessage)
@@ -27,17 +27,20 @@ from AWSIoTExceptions import publishTimeoutException
 class commandShadowDelete(AWSIoTCommand.AWSIoTCommand):
     # Target API: deviceShadow.shadowDelete(srcCallback, srcTimeout)
     # Parameters: deviceShadowName, sketchSubscribeSlot, srcTimeout, callback
+    _commandProtocolName = "sd"
+    _parameterCounts = [3]
+    _opcode = 0x8A
+    _isReusable = False
     _shadowRegistrationTable = None
-    _shadowSubscribeRecord = None
+    _shadowTokenRegistry = None
 
-    def __init__(self, srcParameterList, srcSerialCommuteServer, srcShadowRegistrationTable, srcShadowSubscribeRecord):
-        self._commandProtocolName = "sd"
+    def __init__(self, srcParameterList, srcSerialCommuteServer, srcShadowRegistrationTable, srcShadowTokenRegistry):
         self._parameterList = srcParameterList
         self._serialCommServerHandler = srcSerialCommuteServer
         # To get the corresponding registered deviceShadow instance
         self._shadowRegistrationTable = srcShadowRegistrationTable
-        # To get update the sketch slot information
-        self._shadowSubscribeRecord = srcShadowSubscribeRecord
+        # To match the response with the sketch slot, by token
+        self._shadowTokenRegistry = srcShadowTokenRegistry
         self._desiredNumberOfParameters = 4
 
     def _validateCommand(self):
@@ -57,9 +60,8 @@ class commandShadowDelete(AWSIoTCommand.AWSIoTCommand):
                 currentDeviceShadow = self._shadowRegistrationTable.get(self._parameterList[0])  # By this time, currentDeviceShadow should never be None
                 # Real shadow delete
                 tokenForThisRequest = currentDeviceShadow.shadowDelete(self._parameterList[3], int(self._parameterList[2]))
-                # Update sketch subscribe slot number
-                self._shadowSubscribeRecord[tokenForThisRequest] = int(self._parameterList[1])
-                # A waiting will be performed in the callback to wait until the data structure is ready for device shadow name registration
+                # Record the sketch subscribe slot number for the response, which may already be in
+                self._shadowTokenRegistry.register(tokenForThisRequest, int(self._parameterList[1]))
             except TypeError as e:
                 returnMessage = "SD2F: " + str(e.message)
             # 2 subscriptions and 1 publish
@@ -24,12 +24,15 @@ from AWSIoTExceptions import subscribeTimeoutException
 
 class commandShadowRegisterDeltaCallback(AWSIoTCommand.AWSIoTCommand):
     # Target API: deviceShadow.shadowRegisterDeltaCallback(srcCallback)
-    # Parameters: deviceShadowName, sketchSubscribeSlot, callback
+    # Parameters: deviceShadowName, sketchSubscribeSlot, [coalesce: 1-newer delta replaces the pending one, 0-queue all], callback
+    _commandProtocolName = "s_rd"
+    _parameterCounts = [2, 3]
+    _opcode = 0x8B
+    _isReusable = False
     _shadowRegistrationTable = None
     _shadowSubscribeRecord = None
 
     def __init__(self, srcParameterList, srcSerialCommuteServer, srcShadowRegistrationTable, srcShadowSubscribeRecord):
-        self._commandProtocolName = "s_rd"
         self._parameterList = srcParameterList
         self._serialCommServerHandler = srcSerialCommuteServer
         # To get the corresponding registered deviceShadow instance
@@ -38,6 +41,10 @@ class commandShadowRegisterDeltaCallback(AWSIoTCommand.AWSIoTCommand):
         self._shadowSubscribeRecord = srcShadowSubscribeRecord
         self._desiredNumberOfParameters = 3
 
+    def _checkParameterCount(self):
+        # With or without the coalesce flag
+        return len(self._parameterList) - self._desiredNumberOfParameters in [0, 1]
+
     def _validateCommand(self):
         isNumberOfParameterMatched = AWSIoTCommand.AWSIoTCommand._validateCommand(self)
         isDataStructureExist = self._shadowRegistrationTable is not None and self._serialCommServerHandler is not None
@@ -54,9 +61,11 @@ class commandShadowRegisterDeltaCallback(AWSIoTCommand.AWSIoTCommand):
             try:
                 currentDeviceShadow = self._shadowRegistrationTable.get(self._parameterList[0])  # By this time, currentDeviceShadow should never be None
                 # Real shadow register delta callback
-                currentDeviceShadow.shadowRegisterDeltaCallback(self._parameterList[2])
+                currentDeviceShadow.shadowRegisterDeltaCallback(self._parameterList[-1])
                 # Update sketch subscribe slot number, using deviceShadow name
                 self._shadowSubscribeRecord[self._parameterList[0]] = int(self._parameterList[1])
+                isCoalescing = len(self._parameterList) > self._desiredNumberOfParameters and self._parameterList[2] == "1"
+                self._serialCommServerHandler.setYieldCoalescing(int(self._parameterList[1]), isCoalescing)
             except TypeError as e:
                 returnMessage = "S_RD2F: " + str(e.message)
             # One subscription
@@ -25,11 +25,14 @@ from AWSIoTExceptions import unsubscribeTimeoutException
 class commandShadowUnregisterDeltaCallback(AWSIoTCommand.AWSIoTCommand):
     # Target API: deviceShadow.shadowUnregisterDeltaCallback()
     # Parameters: deviceShadowName
+    _commandProtocolName = "s_ud"
+    _parameterCounts = [1]
+    _opcode = 0x8C
+    _isReusable = False
     _shadowRegistrationTable = None
     _shadowSubscribeRecord = None
 
     def __init__(self, srcParameterList, srcSerialCommuteServer, srcShadowRegistrationTable, srcShadowSubscribeRecord):
-        self._commandProtocolName = "s_ud"
         self._parameterList = srcParameterList
         self._serialCommServerHandler = srcSerialCommuteServer
         # To get the corresponding registered deviceShadow instance
@@ -27,17 +27,20 @@ from AWSIoTExceptions import publishTimeoutException
 class commandShadowUpdate(AWSIoTCommand.AWSIoTCommand):
     # Target API: deviceShadow.shadowUpdate(srcJSONPayload, srcCallback, srcTimeout)
     # Parameters: deviceShadowName, JSONPayload, sketchSubscribeSlot, srcTimeout, callback
+    _commandProtocolName = "su"
+    _parameterCounts = [4]
+    _opcode = 0x89
+    _isReusable = False
     _shadowRegistrationTable = None
-    _shadowSubscribeRecord = None
+    _shadowTokenRegistry = None
 
-    def __init__(self, srcParameterList, srcSerialCommuteServer, srcShadowRegistrationTable, srcShadowSubscribeRecord):
-        self._commandProtocolName = "su"
+    def __init__(self, srcParameterList, srcSerialCommuteServer, srcShadowRegistrationTable, srcShadowTokenRegistry):
         self._parameterList = srcParameterList
         self._serialCommServerHandler = srcSerialCommuteServer
         # To get the corresponding registered deviceShadow instance
         self._shadowRegistrationTable = srcShadowRegistrationTable
-        # To get update the sketch slot information
-        self._shadowSubscribeRecord = srcShadowSubscribeRecord
+        # To match the response with the sketch slot, by token
+        self._shadowTokenRegistry = srcShadowTokenRegistry
         self._desiredNumberOfParameters = 5
 
     def _validateCommand(self):
@@ -57,9 +60,8 @@ class commandShadowUpdate(AWSIoTCommand.AWSIoTCommand):
                 currentDeviceShadow = self._shadowRegistrationTable.get(self._parameterList[0])  # By this time, currentDeviceShadow should never be None
                 # Real shadow update
                 tokenForThisRequest = currentDeviceShadow.shadowUpdate(self._parameterList[1], self._parameterList[4], int(self._parameterList[3]))
-                # Update sketch subscribe slot number
-                self._shadowSubscribeRecord[tokenForThisRequest] = int(self._parameterList[2])
-                # A waiting will be performed in the callback to wait until the data structure is ready for device shadow name registration
+                # Record the sketch subscribe slot number for the response, which may already be in
+                self._shadowTokenRegistry.register(tokenForThisRequest, int(self._parameterList[2]))
             except TypeError as e:
                 returnMessage = "SU2F: " + str(e.message)
             except ValueError as e:
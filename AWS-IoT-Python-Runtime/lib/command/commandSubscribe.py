@@ -24,19 +24,26 @@ from AWSIoTExceptions import subscribeTimeoutException
 
 class commandSubscribe(AWSIoTCommand.AWSIoTCommand):
     # Target API: mqttCore.subscribe(topic, qos, callback)
-    # Parameter list: <topic> <qos> <ino_id> <mqttSubscribeUnit>
+    # Parameter list: <topic> <qos> <ino_id> [<coalesce: 1-newer message replaces the pending one, 0-queue all>] <mqttSubscribeUnit>
+    _commandProtocolName = "s"
+    _parameterCounts = [3, 4]
+    _opcode = 0x85
+    _isReusable = False
     _mqttCoreHandler = None
     _mqttSubscribeUnit = None
     _mqttSubscribeTable = None
 
     def __init__(self, srcParameterList, srcSerialCommuteServer, srcMQTTCore, srcMQTTSubscribeTable):
-        self._commandProtocolName = "s"
         self._parameterList = srcParameterList
         self._serialCommServerHandler = srcSerialCommuteServer
         self._mqttCoreHandler = srcMQTTCore
         self._mqttSubscribeTable = srcMQTTSubscribeTable
         self._desiredNumberOfParameters = 4
 
+    def _checkParameterCount(self):
+        # With or without the coalesce flag
+        return len(self._parameterList) - self._desiredNumberOfParameters in [0, 1]
+
     def _validateCommand(self):
         ret = self._mqttCoreHandler is not None and self._serialCommServerHandler is not None
         return ret and AWSIoTCommand.AWSIoTCommand._validateCommand(self)
@@ -48,12 +55,16 @@ class commandSubscribe(AWSIoTCommand.AWSIoTCommand):
         else:
             try:
                 # Init the mqttSubscribeUnit
-                self._mqttSubscribeUnit = self._parameterList[3]
+                self._mqttSubscribeUnit = self._parameterList[-1]
                 self._mqttSubscribeUnit.setTopicName(self._parameterList[0])
                 self._mqttSubscribeUnit.setSketchSlotNumber(int(self._parameterList[2]))
+                self._mqttSubscribeUnit.setQoS(int(self._parameterList[1]))
                 self._mqttSubscribeUnit.setSerialCommunicationServerHub(self._serialCommServerHandler)
                 # Real subscription
                 self._mqttCoreHandler.subscribe(self._parameterList[0], int(self._parameterList[1]), self._mqttSubscribeUnit.individualCallback)
+                # A failed subscription leaves the sketch slot as it was
+                isCoalescing = len(self._parameterList) > self._desiredNumberOfParameters and self._parameterList[3] == "1"
+                self._serialCommServerHandler.setYieldCoalescing(int(self._parameterList[2]), isCoalescing)
                 # Update mqttSubscribeTable
                 self._mqttSubscribeTable[self._parameterList[0]] = self._mqttSubscribeUnit
             except TypeError as e:
@@ -24,11 +24,14 @@ from AWSIoTExceptions import unsubscribeTimeoutException
 
 class commandUnsubscribe(AWSIoTCommand.AWSIoTCommand):
     # Target API: mqttCore.unsubscribe(topic)
+    _commandProtocolName = "u"
+    _parameterCounts = [1]
+    _opcode = 0x86
+    _isReusable = False
     _mqttCoreHandler = None
     _mqttSubscribeTable = None
 
     def __init__(self, srcParameterList, srcSerialCommuteServer, srcMQTTCore, srcMQTTSubscribeTable):
-        self._commandProtocolName = "u"
         self._parameterList = srcParameterList
         self._serialCommServerHandler = srcSerialCommuteServer
         self._mqttCoreHandler = srcMQTTCore
@@ -22,9 +22,12 @@ import AWSIoTCommand
 
 class commandYield(AWSIoTCommand.AWSIoTCommand):
     # Target API: None
+    _commandProtocolName = "y"
+    _parameterCounts = [0]
+    _opcode = 0x8E
+    _isReusable = True
 
     def __init__(self, srcParameterList, srcSerialCommuteServer):
-        self._commandProtocolName = "y"
         self._parameterList = srcParameterList
         self._serialCommServerHandler = srcSerialCommuteServer
         self._desiredNumberOfParameters = 0
@@ -0,0 +1,67 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+import sys
+sys.path.append("../lib/exception/")
+import AWSIoTCommand
+
+
+class commandYieldBurst(AWSIoTCommand.AWSIoTCommand):
+    # Target API: None
+    # Parameter list: <bufferSize: number of bytes the remote client can take in one reply>
+    _commandProtocolName = "yb"
+    _parameterCounts = [1]
+    _opcode = 0x94
+    _isReusable = True
+
+    _bufferSize = -1
+
+    def __init__(self, srcParameterList, srcSerialCommuteServer):
+        self._parameterList = srcParameterList
+        self._serialCommServerHandler = srcSerialCommuteServer
+        self._desiredNumberOfParameters = 1
+        self._bufferSize = -1
+
+    def _validateCommand(self):
+        ret = self._serialCommServerHandler is not None
+        return ret and AWSIoTCommand.AWSIoTCommand._validateCommand(self)
+
+    def setParameterList(self, srcParameterList):
+        self._parameterList = srcParameterList
+        self._bufferSize = -1
+
+    def getBufferSize(self):
+        return self._bufferSize
+
+    def execute(self):
+        # No returnMessage on success, the burst is written by serialCommunicationServer.writeToExternalYieldBurst
+        returnMessage = None
+        if not self._validateCommand():
+            returnMessage = "YB1F: " + "Invalid information."
+        else:
+            try:
+                bufferSize = int(self._parameterList[0])
+                if bufferSize < self._serialCommServerHandler.getMinimumYieldBurstBufferSize():
+                    returnMessage = "YB2F: " + "Buffer too small."
+                else:
+                    self._bufferSize = bufferSize
+            except ValueError as e:
+                returnMessage = "YB3F: " + "Invalid buffer size."
+            except Exception as e:
+                returnMessage = "YBFF: " + "Unknown error."
+        if returnMessage is not None:
+            self._serialCommServerHandler.writeToInternalProtocol(returnMessage)
@@ -23,7 +23,10 @@ import time
 import threading
 import protocol.paho.client as mqtt
 import util.offlinePublishQueue as offlinePublishQueue
+import util.persistentPublishQueue as persistentPublishQueue
+from util.tokenBucket import tokenBucket
 from threading import Lock
+from threading import Event
 from exception.AWSIoTExceptions import connectError
 from exception.AWSIoTExceptions import connectTimeoutException
 from exception.AWSIoTExceptions import disconnectError
@@ -45,11 +48,83 @@ class _publishRequest:
         self.retain = srcRetain
 
 
+# Completion of ONE operation waiting for the broker, keyed by its message id (CONNACK/DISCONNECT by a fixed key)
+class _operationCompletion:
+    def __init__(self):
+        self.event = Event()
+        self.isCompleted = False  # Set by the paho callback
+        self.result = None
+
+
+# Per-operation completion events, set by the paho callbacks and waited on by the API calls
+# The acknowledgement can come before the caller gets its mid back from paho, whichever comes first makes the entry
+# A wait that times out removes its entry at once, only its key is kept so that a late acknowledgement is dropped
+class _operationCompletionTable:
+    def __init__(self):
+        self._lock = Lock()
+        self._completions = dict()
+        self._abandonedKeys = set()
+
+    def _getCompletion(self, srcKey):
+        # Must hold the lock
+        currentCompletion = self._completions.get(srcKey)
+        if currentCompletion is None:
+            currentCompletion = _operationCompletion()
+            self._completions[srcKey] = currentCompletion
+        return currentCompletion
+
+    def complete(self, srcKey, srcResult=None):
+        self._lock.acquire()
+        if srcKey in self._abandonedKeys:
+            # Late acknowledgement for a wait that already timed out
+            self._abandonedKeys.discard(srcKey)
+        else:
+            currentCompletion = self._getCompletion(srcKey)
+            currentCompletion.result = srcResult
+            currentCompletion.isCompleted = True
+            currentCompletion.event.set()
+        self._lock.release()
+
+    def discard(self, srcKey):
+        # Forget an acknowledgement nobody is waiting for, before starting a new operation with this key
+        self._lock.acquire()
+        self._completions.pop(srcKey, None)
+        self._abandonedKeys.discard(srcKey)
+        self._lock.release()
+
+    def wait(self, srcKey, srcTimeoutSecond):
+        # Return (isCompleted, result), isCompleted is False on timeout
+        self._lock.acquire()
+        # A new operation with this key, an earlier timed out one no longer owns it
+        self._abandonedKeys.discard(srcKey)
+        currentCompletion = self._getCompletion(srcKey)
+        self._lock.release()
+        currentCompletion.event.wait(srcTimeoutSecond)
+        self._lock.acquire()
+        if self._completions.get(srcKey) is currentCompletion:
+            del self._completions[srcKey]
+        if not currentCompletion.isCompleted:
+            self._abandonedKeys.add(srcKey)
+        self._lock.release()
+        return currentCompletion.isCompleted, currentCompletion.result
+
+
 class mqttCore:
 
+    # Completion keys of the operations without a message id
+    _CONNECT_KEY = "connect"
+    _DISCONNECT_KEY = "disconnect"
+    # Resubscription
+    _MAXIMUM_TOPICS_PER_SUBSCRIBE = 8  # AWS IoT takes up to 8 topics in ONE SUBSCRIBE
+    _MAXIMUM_RESUBSCRIBE_ATTEMPTS = 3  # Topics still failing after that wait for the next reconnect
+    _SUBACK_FAILURE = 0x80  # Granted QoS of a topic the broker refused
+
     def getClientID(self):
         return self._clientID
 
+    def isConnected(self):
+        return self._connectResultCode == 0
+
     def setConnectDisconnectTimeoutSecond(self, srcConnectDisconnectTimeout):
         self._connectdisconnectTimeout = srcConnectDisconnectTimeout
         self._log.writeLog("Set maximum connect/disconnect timeout to be " + str(self._connectdisconnectTimeout) + " second.")
@@ -70,75 +145,134 @@ class mqttCore:
     def createPahoClient(self, clientID, cleanSession, userdata, protocol, useWebsocket):
         return mqtt.Client(clientID, cleanSession, userdata, protocol, useWebsocket)  # Throw exception when error happens
 
+    def _startResubscribe(self, srcTopicQoSList):
+        # ONE SUBSCRIBE for several (topic, qos), returns (rc, mid)
+        self._subscribeLock.acquire()
+        try:
+            return self._pahoClient.subscribe(srcTopicQoSList)
+        except ValueError as e:
+            self._log.writeLog("Invalid topic for resubscription: " + str(e))
+            return (None, None)
+        finally:
+            self._subscribeLock.release()
+
+    def _finishResubscribe(self, srcTopicQoSList, rc, mid):
+        # Wait for the SUBACK, returns the (topic, qos) that were not granted: all of them if there is no SUBACK
+        if rc != 0:
+            return srcTopicQoSList
+        isCompleted, grantedQoSList = self._operationCompletionTable.wait(mid, self._mqttOperationTimeout)
+        if not isCompleted or grantedQoSList is None or len(grantedQoSList) != len(srcTopicQoSList):
+            self._log.writeLog("No feedback detected for resubscribe request " + str(mid) + ".")
+            return srcTopicQoSList
+        return [srcTopicQoSList[i] for i in range(0, len(srcTopicQoSList)) if grantedQoSList[i] == self._SUBACK_FAILURE]
+
     def _doResubscribe(self):
-        if self._subscribePool:
-            self._resubscribeCount = len(self._subscribePool)
-            for key in self._subscribePool.keys():
-                qos, callback = self._subscribePool.get(key)
-                try:
-                    self.subscribe(key, qos, callback)
-                    time.sleep(self._drainingIntervalSecond)  # Subscribe requests should also be sent out using the draining interval
-                except (subscribeError, subscribeTimeoutException):
-                    pass  # Subscribe error resulted from network error, will redo subscription in the next re-connect
+        # Topics in the subscribe pool go out in as few SUBSCRIBEs as the broker takes, all of them in flight at once
+        # Only the topics that were not granted are sent again, then the offline publish queue is drained
+        pendingList = [(topic, qos) for (topic, (qos, callback)) in self._subscribePool.items()]
+        attemptCount = 0
+        while pendingList and attemptCount < self._MAXIMUM_RESUBSCRIBE_ATTEMPTS and self.isConnected():
+            if attemptCount > 0:
+                time.sleep(self._drainingIntervalSecond)  # Retries are sent using the draining interval
+            attemptCount += 1
+            chunkList = [pendingList[i:i + self._MAXIMUM_TOPICS_PER_SUBSCRIBE] for i in range(0, len(pendingList), self._MAXIMUM_TOPICS_PER_SUBSCRIBE)]
+            startedList = [(chunk,) + self._startResubscribe(chunk) for chunk in chunkList]
+            pendingList = []
+            for (chunk, rc, mid) in startedList:
+                pendingList += self._finishResubscribe(chunk, rc, mid)
+            self._log.writeLog("Resubscribe attempt " + str(attemptCount) + ": " + str(len(chunkList)) + " SUBSCRIBE(s), " + str(len(pendingList)) + " topic(s) not granted.")
+        if pendingList:
+            self._log.writeLog("Resubscription of " + str(len(pendingList)) + " topic(s) is left to the next reconnect.")
+        # Queued publish requests go out once the subscriptions are back
+        if self.isConnected() and self._claimPublishDraining():
+            self._doPublishDraining()
+
+    # Only one draining runs at a time, whoever runs it claims it first
+    def _claimPublishDraining(self):
+        # True if the caller is to run the draining, a running draining picks up whatever gets queued before it completes
+        self._offlinePublishQueueLock.acquire()
+        ret = not self._isDraining
+        self._isDraining = True
+        self._offlinePublishQueueLock.release()
+        return ret
+
+    def _startPublishDraining(self):
+        if self._claimPublishDraining():
+            offlinePublishQueueDraining = threading.Thread(target=self._doPublishDraining)
+            offlinePublishQueueDraining.start()
 
     # Performed in a seperate thread, draining the offlinePublishQueue at a given draining rate
     # Publish theses queued messages to Paho
     # Should always pop the queue since Paho has its own queueing and retry logic
     # Should exit immediately when there is an error in republishing queued message
     # Should leave it to the next round of reconnect/resubscribe/republish logic at mqttCore
+    # With a publish rate limit, the rate limiter paces the draining instead of the draining interval
     def _doPublishDraining(self):
+        drainedCount = 0
+        startTime = time.time()
         while True:
             self._offlinePublishQueueLock.acquire()
-            # This should be a complete publish requests containing topic, payload, qos, retain information
             # This is the only thread that pops the offlinePublishQueue
-            if self._offlinePublishQueue:
-                queuedPublishRequest = self._offlinePublishQueue.pop(0)
-                # Publish it (call paho API directly)
-                (rc, mid) = self._pahoClient.publish(queuedPublishRequest.topic, queuedPublishRequest.payload, queuedPublishRequest.qos, queuedPublishRequest.retain)
-                if rc != 0:
-                    self._offlinePublishQueueLock.release()
-                    break
-            else:
+            if not self._offlinePublishQueue:
                 self._drainingComplete = True
+                self._isDraining = False
                 self._offlinePublishQueueLock.release()
                 break
+            # This should be a complete publish requests containing topic, payload, qos, retain information
+            queuedPublishRequest = self._offlinePublishQueue.popleft()
             self._offlinePublishQueueLock.release()
-            time.sleep(self._drainingIntervalSecond)
+            # Wait for a token without holding the queue lock, new requests keep being queued meanwhile
+            if self._publishRateLimiter.isLimited():
+                self._publishRateLimiter.acquire()
+            # Publish it (call paho API directly)
+            self._publishLock.acquire()
+            (rc, mid) = self._pahoClient.publish(queuedPublishRequest.topic, queuedPublishRequest.payload, queuedPublishRequest.qos, queuedPublishRequest.retain)
+            if rc == 0:
+                self._publishedCount += 1
+            self._publishLock.release()
+            if rc != 0:
+                # Left to the next reconnect
+                self._offlinePublishQueueLock.acquire()
+                self._isDraining = False
+                self._offlinePublishQueueLock.release()
+                break
+            drainedCount += 1
+            if not self._publishRateLimiter.isLimited():
+                time.sleep(self._drainingIntervalSecond)
+        if drainedCount > 0:
+            drainingTimeSecond = time.time() - startTime
+            if drainingTimeSecond > 0:
+                self._drainingThroughput = drainedCount / drainingTimeSecond
+            self._log.writeLog("Drained " + str(drainedCount) + " queued publish request(s) in " + str(drainingTimeSecond) + "s, " + str(self._drainingThroughput) + " request(s)/s, peak queue depth " + str(self._peakOfflinePublishQueueDepth) + ".")
 
     # Callbacks
     def on_connect(self, client, userdata, flags, rc):
         self._disconnectResultCode = sys.maxint
         self._connectResultCode = rc
+        self._operationCompletionTable.complete(self._CONNECT_KEY, rc)
         if self._connectResultCode == 0:
             processResubscription = threading.Thread(target=self._doResubscribe)
             processResubscription.start()
         # If we do not have any topics to resubscribe to, still start a new thread to process queued publish requests
         if not self._subscribePool:
-            offlinePublishQueueDraining = threading.Thread(target=self._doPublishDraining)
-            offlinePublishQueueDraining.start()
+            self._startPublishDraining()
         self._log.writeLog("Connect result code " + str(rc))
 
     def on_disconnect(self, client, userdata, rc):
         self._connectResultCode = sys.maxint
         self._disconnectResultCode = rc
         self._drainingComplete = False  # Draining status should be reset when disconnect happens
+        self._operationCompletionTable.complete(self._DISCONNECT_KEY, rc)
         self._log.writeLog("Disconnect result code " + str(rc))
 
     def on_subscribe(self, client, userdata, mid, granted_qos):
         # Execution of this callback is atomic, guaranteed by Paho
-        # Check if we have got all SUBACKs for all resubscriptions
-        if self._resubscribeCount > 0:
-            self._resubscribeCount -= 1
-            if self._resubscribeCount == 0:
-                # start a thread draining the offline publish queue
-                offlinePublishQueueDraining = threading.Thread(target=self._doPublishDraining)
-                offlinePublishQueueDraining.start()
-                self._resubscribeCount = -1
-        self._subscribeSent = True
+        # granted_qos: one per topic of this SUBSCRIBE, _SUBACK_FAILURE for a refused topic
+        self._operationCompletionTable.complete(mid, granted_qos)
         self._log.writeLog("Subscribe request " + str(mid) + " sent.")
 
     def on_unsubscribe(self, client, userdata, mid):
-        self._unsubscribeSent = True
+        self._operationCompletionTable.complete(mid)
         self._log.writeLog("Unsubscribe request sent.")
 
     def on_message(self, client, userdata, message):
@@ -164,15 +298,13 @@ class mqttCore:
         # Tool data structure
         self._connectResultCode = sys.maxint
         self._disconnectResultCode = sys.maxint
-        self._subscribeSent = False
-        self._unsubscribeSent = False
+        self._operationCompletionTable = _operationCompletionTable()
         self._connectdisconnectTimeout = 0  # Default connect/disconnect timeout set to 0 second
         self._mqttOperationTimeout = 0  # Default MQTT operation timeout set to 0 second
         # Use Websocket
         self._useWebsocket = srcUseWebsocket
         # Subscribe record
         self._subscribePool = dict()
-        self._resubscribeCount = -1
         # Broker information
         self._host = ""
         self._port = -1
@@ -186,10 +318,23 @@ class mqttCore:
         # OfflinePublishQueue
         self._offlinePublishQueueLock = Lock()
         self._offlinePublishQueue = offlinePublishQueue.offlinePublishQueue(20, 1)
+        self._offlinePublishQueueSize = 20
+        self._offlinePublishQueueDropBehavior = 1
+        self._offlinePublishQueueMaximumBytes = 0  # No byte limit
+        # Directory of the disk-backed queue, in-memory queue if None
+        self._offlinePublishQueueDirectory = None
         # Draining interval in seconds
         self._drainingIntervalSecond = 0.5
+        # Rate limit on the requests handed to paho, live and drained (no limit by default)
+        self._publishRateLimiter = tokenBucket()
+        # Publish statistics
+        self._publishedCount = 0
+        self._drainingThroughput = 0.0  # Requests per second of the last draining
+        self._peakOfflinePublishQueueDepth = 0
         # Is Draining complete
         self._drainingComplete = True
+        # Is a draining running (claimed by _claimPublishDraining)
+        self._isDraining = False
         self._log.writeLog("mqttCore init.")
 
     def config(self, srcHost, srcPort, srcCAFile, srcKey, srcCert):
@@ -209,12 +354,69 @@ class mqttCore:
         self._pahoClient.setBackoffTiming(srcBaseReconnectTimeSecond, srcMaximumReconnectTimeSecond, srcMinimumConnectTimeSecond)
         self._log.writeLog("Custom setting for backoff timing.")
 
-    def setOfflinePublishQueueing(self, srcQueueSize, srcDropBehavior=mqtt.MSG_QUEUEING_DROP_NEWEST):
+    def setOfflinePublishQueueing(self, srcQueueSize, srcDropBehavior=mqtt.MSG_QUEUEING_DROP_NEWEST, srcMaximumBytes=None):
+        # srcMaximumBytes: limit on the total size of the queued requests (0 for no limit), unchanged if None
         if srcQueueSize is None or srcDropBehavior is None:
             raise TypeError("None type inputs detected.")
-        self._offlinePublishQueue = offlinePublishQueue.offlinePublishQueue(srcQueueSize, srcDropBehavior)
+        if srcMaximumBytes is None:
+            srcMaximumBytes = self._offlinePublishQueueMaximumBytes
+        self._replaceOfflinePublishQueue(srcQueueSize, srcDropBehavior, self._offlinePublishQueueDirectory, srcMaximumBytes)
         self._log.writeLog("Custom setting for publish queueing.")
 
+    def setOfflinePublishQueueDirectory(self, srcDirectory, srcMaximumBytes=0):
+        # Keep queued publish requests in segment files under srcDirectory, up to srcMaximumBytes (0 for no limit)
+        # Requests left there by a previous run are published once connected
+        if srcDirectory is None or srcMaximumBytes is None:
+            raise TypeError("None type inputs detected.")
+        self._replaceOfflinePublishQueue(self._offlinePublishQueueSize, self._offlinePublishQueueDropBehavior, srcDirectory, srcMaximumBytes)
+        self._log.writeLog("Offline publish queue on disk at " + srcDirectory + ".")
+
+    def getOfflinePublishQueueDropCounts(self):
+        # (number of requests, their bytes) dropped by the offline publish queue in place
+        return (self._offlinePublishQueue.getDroppedCount(), self._offlinePublishQueue.getDroppedBytes())
+
+    def closeOfflinePublishQueue(self):
+        # Leave the segment files on disk to another mqttCore, queueing goes on in memory
+        self._replaceOfflinePublishQueue(self._offlinePublishQueueSize, self._offlinePublishQueueDropBehavior, None, self._offlinePublishQueueMaximumBytes)
+
+    def _replaceOfflinePublishQueue(self, srcQueueSize, srcDropBehavior, srcDirectory, srcMaximumBytes):
+        self._offlinePublishQueueLock.acquire()
+        try:
+            # The disk-backed queue in place holds the segment files the new one recovers from
+            isPersistent = isinstance(self._offlinePublishQueue, persistentPublishQueue.persistentPublishQueue)
+            if isPersistent:
+                self._offlinePublishQueue.close()
+            try:
+                if srcDirectory is None:
+                    self._offlinePublishQueue = offlinePublishQueue.offlinePublishQueue(srcQueueSize, srcDropBehavior, srcMaximumBytes)
+                else:
+                    self._offlinePublishQueue = persistentPublishQueue.persistentPublishQueue(srcDirectory, srcQueueSize, srcMaximumBytes, srcDropBehavior, _publishRequest)
+            except Exception:
+                # Keep queueing as before
+                if isPersistent:
+                    self._offlinePublishQueue = persistentPublishQueue.persistentPublishQueue(self._offlinePublishQueueDirectory, self._offlinePublishQueueSize, self._offlinePublishQueueMaximumBytes, self._offlinePublishQueueDropBehavior, _publishRequest)
+                raise
+            self._offlinePublishQueueSize = srcQueueSize
+            self._offlinePublishQueueDropBehavior = srcDropBehavior
+            self._offlinePublishQueueDirectory = srcDirectory
+            self._offlinePublishQueueMaximumBytes = srcMaximumBytes
+            # A backlog recovered from disk goes out before any new publish request
+            if self._offlinePublishQueue:
+                self._drainingComplete = False
+        finally:
+            self._offlinePublishQueueLock.release()
+
+    def setPublishRateLimit(self, srcRatePerSecond, srcBurst):
+        # At most srcRatePerSecond publish requests per second go to paho, srcBurst of them back to back; 0 for no limit
+        if srcRatePerSecond is None or srcBurst is None:
+            raise TypeError("None type inputs detected.")
+        self._publishRateLimiter.setRate(srcRatePerSecond, srcBurst)
+        self._log.writeLog("Custom setting for publish rate limit.")
+
+    def getPublishStatistics(self):
+        # (number of publish requests handed to paho, live and drained, requests/s of the last draining, peak offline queue depth)
+        return (self._publishedCount, self._drainingThroughput, self._peakOfflinePublishQueueDepth)
+
     def setDrainingIntervalSecond(self, srcDrainingIntervalSecond):
         if srcDrainingIntervalSecond is None:
             raise TypeError("None type inputs detected.")
@@ -234,19 +436,18 @@ class mqttCore:
         else:
             self._pahoClient.tls_set(self._cafile, self._cert, self._key, ssl.CERT_REQUIRED, ssl.PROTOCOL_SSLv23)  # Throw exception...
         # Connect
+        self._operationCompletionTable.discard(self._CONNECT_KEY)
         self._pahoClient.connect(self._host, self._port, keepAliveInterval)  # Throw exception...
+        startTime = time.time()
         self._pahoClient.loop_start()
-        TenmsCount = 0
-        while(TenmsCount != self._connectdisconnectTimeout * 100 and self._connectResultCode == sys.maxint):
-            TenmsCount += 1
-            time.sleep(0.01)
-        if(self._connectResultCode == sys.maxint):
+        isCompleted = self._operationCompletionTable.wait(self._CONNECT_KEY, self._connectdisconnectTimeout)[0]
+        if not isCompleted:
             self._log.writeLog("Connect timeout.")
             self._pahoClient.loop_stop()
             raise connectTimeoutException()
         elif(self._connectResultCode == 0):
             ret = True
-            self._log.writeLog("Connect time consumption: " + str(float(TenmsCount) * 10) + "ms.")
+            self._log.writeLog("Connect time consumption: " + str((time.time() - startTime) * 1000) + "ms.")
         else:
             self._log.writeLog("A connect error happened.")
             self._pahoClient.loop_stop()
@@ -257,17 +458,16 @@ class mqttCore:
         # Return disconnect succeeded/failed
         ret = False
         # Disconnect
+        self._operationCompletionTable.discard(self._DISCONNECT_KEY)
+        startTime = time.time()
         self._pahoClient.disconnect()  # Throw exception...
-        TenmsCount = 0
-        while(TenmsCount != self._connectdisconnectTimeout * 100 and self._disconnectResultCode == sys.maxint):
-            TenmsCount += 1
-            time.sleep(0.01)
-        if(self._disconnectResultCode == sys.maxint):
+        isCompleted = self._operationCompletionTable.wait(self._DISCONNECT_KEY, self._connectdisconnectTimeout)[0]
+        if not isCompleted:
             self._log.writeLog("Disconnect timeout.")
             raise disconnectTimeoutException()
         elif(self._disconnectResultCode == 0):
             ret = True
-            self._log.writeLog("Disconnect time consumption: " + str(float(TenmsCount) * 10) + "ms.")
+            self._log.writeLog("Disconnect time consumption: " + str((time.time() - startTime) * 1000) + "ms.")
             self._pahoClient.loop_stop()  # Do NOT maintain a background thread for socket communication since it is a successful disconnect
         else:
             self._log.writeLog("A disconnect error happened.")
@@ -282,13 +482,24 @@ class mqttCore:
         # Queueing should happen when disconnected or draining is in progress
         self._offlinePublishQueueLock.acquire()
         queuedPublishCondition = not self._drainingComplete or self._connectResultCode == sys.maxint
-        if queuedPublishCondition:
+        # Out of tokens: queue it for the draining, paced by the rate limiter, instead of blocking the caller
+        isThrottled = not queuedPublishCondition and not self._publishRateLimiter.tryAcquire()
+        if queuedPublishCondition or isThrottled:
             # Publish to the queue and report error (raise Exception)
             currentQueuedPublishRequest = _publishRequest(topic, payload, qos, retain)
             if not self._offlinePublishQueue.append(currentQueuedPublishRequest):
+                droppedCount = self._offlinePublishQueue.getDroppedCount()
                 self._offlinePublishQueueLock.release()
+                self._log.writeLog("Offline publish queue is full, " + str(droppedCount) + " request(s) dropped so far.")
                 raise publishQueueFullException()
+            self._peakOfflinePublishQueueDepth = max(self._peakOfflinePublishQueueDepth, len(self._offlinePublishQueue))
+            if isThrottled:
+                # Later requests queue up behind this one until the draining completes
+                self._drainingComplete = False
             self._offlinePublishQueueLock.release()
+            if isThrottled:
+                self._log.writeLog("Publish rate limit reached, draining queued publish requests.")
+                self._startPublishDraining()
         # Publish to Paho
         else:
             self._offlinePublishQueueLock.release()
@@ -298,6 +509,7 @@ class mqttCore:
             self._log.writeLog("Try to put a publish request " + str(mid) + " in the TCP stack.")
             ret = rc == 0
             if(ret):
+                self._publishedCount += 1
                 self._log.writeLog("Publish request " + str(mid) + " succeeded.")
             else:
                 self._log.writeLog("Publish request " + str(mid) + " failed with code: " + str(rc))
@@ -306,33 +518,33 @@ class mqttCore:
             self._publishLock.release()
         return ret
 
-    def subscribe(self, topic, qos, callback):
-        if(topic is None or qos is None):
-            raise TypeError("None type inputs detected.")
-        # Return subscribe succeeded/failed
-        ret = False
+    # Subscribe/unsubscribe are sent under their lock, the acknowledgement is waited for outside of it
+    # Many of them can be in flight at once, each caller waits for the SUBACK/UNSUBACK of its own mid
+    def _startSubscribe(self, topic, qos, callback):
         self._subscribeLock.acquire()
-        # Subscribe
-        # Register callback
-        if(callback is not None):
-            self._pahoClient.message_callback_add(topic, callback)
-        (rc, mid) = self._pahoClient.subscribe(topic, qos)  # Throw exception...
+        try:
+            # Register callback
+            if(callback is not None):
+                self._pahoClient.message_callback_add(topic, callback)
+            (rc, mid) = self._pahoClient.subscribe(topic, qos)  # Throw exception...
+        finally:
+            self._subscribeLock.release()
         self._log.writeLog("Started a subscribe request " + str(mid))
-        TenmsCount = 0
-        while(TenmsCount != self._mqttOperationTimeout * 100 and not self._subscribeSent):
-            TenmsCount += 1
-            time.sleep(0.01)
-        if(self._subscribeSent):
+        return (rc, mid)
+
+    def _finishSubscribe(self, topic, qos, callback, rc, mid, startTime):
+        # Ends as soon as the SUBACK for this mid is in
+        isCompleted = self._operationCompletionTable.wait(mid, self._mqttOperationTimeout)[0]
+        if(isCompleted):
             ret = rc == 0
             if(ret):
                 self._subscribePool[topic] = (qos, callback)
-                self._log.writeLog("Subscribe request " + str(mid) + " succeeded. Time consumption: " + str(float(TenmsCount) * 10) + "ms.")
+                self._log.writeLog("Subscribe request " + str(mid) + " succeeded. Time consumption: " + str((time.time() - startTime) * 1000) + "ms.")
             else:
                 if(callback is not None):
                     self._pahoClient.message_callback_remove(topic)
                 self._log.writeLog("Subscribe request " + str(mid) + " failed with code: " + str(rc))
                 self._log.writeLog("Callback cleaned up.")
-                self._subscribeLock.release()  # Release the lock when exception is raised
                 raise subscribeError(rc)
         else:
             # Subscribe timeout
@@ -340,46 +552,76 @@ class mqttCore:
                 self._pahoClient.message_callback_remove(topic)
             self._log.writeLog("No feedback detected for subscribe request " + str(mid) + ". Timeout and failed.")
             self._log.writeLog("Callback cleaned up.")
-            self._subscribeLock.release()  # Release the lock when exception is raised
             raise subscribeTimeoutException()
-        self._subscribeSent = False
-        self._log.writeLog("Recover subscribe context for the next request: subscribeSent: " + str(self._subscribeSent))
-        self._subscribeLock.release()
         return ret
 
+    def subscribe(self, topic, qos, callback):
+        if(topic is None or qos is None):
+            raise TypeError("None type inputs detected.")
+        # Return subscribe succeeded/failed
+        startTime = time.time()
+        (rc, mid) = self._startSubscribe(topic, qos, callback)
+        return self._finishSubscribe(topic, qos, callback, rc, mid, startTime)
+
+    def subscribeAll(self, srcSubscriptionList):
+        # srcSubscriptionList: [(topic, qos, callback), ...]
+        # All SUBSCRIBEs go out before waiting, so that their SUBACKs come back in ONE round trip
+        # Raises the exception of the first subscription that failed, once all of them are done
+        for (topic, qos, callback) in srcSubscriptionList:
+            if(topic is None or qos is None):
+                raise TypeError("None type inputs detected.")
+        startTime = time.time()
+        startedList = [(topic, qos, callback) + self._startSubscribe(topic, qos, callback) for (topic, qos, callback) in srcSubscriptionList]
+        firstException = None
+        for (topic, qos, callback, rc, mid) in startedList:
+            try:
+                self._finishSubscribe(topic, qos, callback, rc, mid, startTime)
+            except (subscribeError, subscribeTimeoutException) as e:
+                if firstException is None:
+                    firstException = e
+        if firstException is not None:
+            raise firstException
+        return True
+
+    def restoreSubscription(self, topic, qos, callback):
+        # Take back a subscription from a previous run without going to the broker
+        # It is sent together with the other resubscriptions as soon as the connection is up
+        if(topic is None or qos is None):
+            raise TypeError("None type inputs detected.")
+        if(callback is not None):
+            self._pahoClient.message_callback_add(topic, callback)
+        self._subscribePool[topic] = (qos, callback)
+        self._log.writeLog("Restored subscription to " + str(topic) + ", waiting for the connection.")
+
     def unsubscribe(self, topic):
         if(topic is None):
             raise TypeError("None type inputs detected.")
         # Return unsubscribe succeeded/failed
         ret = False
+        startTime = time.time()
         self._unsubscribeLock.acquire()
-        # Unsubscribe
-        (rc, mid) = self._pahoClient.unsubscribe(topic)  # Throw exception...
+        try:
+            (rc, mid) = self._pahoClient.unsubscribe(topic)  # Throw exception...
+        finally:
+            self._unsubscribeLock.release()
         self._log.writeLog("Started an unsubscribe request " + str(mid))
-        TenmsCount = 0
-        while(TenmsCount != self._mqttOperationTimeout * 100 and not self._unsubscribeSent):
-            TenmsCount += 1
-            time.sleep(0.01)
-        if(self._unsubscribeSent):
+        # Ends as soon as the UNSUBACK for this mid is in
+        isCompleted = self._operationCompletionTable.wait(mid, self._mqttOperationTimeout)[0]
+        if(isCompleted):
             ret = rc == 0
             if(ret):
                 try:
                     del self._subscribePool[topic]
                 except KeyError:
                     pass  # Ignore topics that are never subscribed to
-                self._log.writeLog("Unsubscribe request " + str(mid) + " succeeded. Time consumption: " + str(float(TenmsCount) * 10) + "ms.")
+                self._log.writeLog("Unsubscribe request " + str(mid) + " succeeded. Time consumption: " + str((time.time() - startTime) * 1000) + "ms.")
                 self._pahoClient.message_callback_remove(topic)
                 self._log.writeLog("Remove the callback.")
             else:
                 self._log.writeLog("Unsubscribe request " + str(mid) + " failed with code: " + str(rc))
-                self._unsubscribeLock.release()  # Release the lock when exception is raised
                 raise unsubscribeError(rc)
         else:
             # Unsubscribe timeout
             self._log.writeLog("No feedback detected for unsubscribe request " + str(mid) + ". Timeout and failed.")
-            self._unsubscribeLock.release()  # Release the lock when exception is raised
             raise unsubscribeTimeoutException()
-        self._unsubscribeSent = False
-        self._log.writeLog("Recover unsubscribe context for the next request: unsubscribeSent: " + str(self._unsubscribeSent))
-        self._unsubscribeLock.release()
         return ret
@@ -49,7 +49,6 @@ sys.path.append("./lib/protocol/paho")
 sys.path.append("../lib/protocol/paho")
 sys.path.append("./lib/")
 sys.path.append("../lib/")
-import securedWebsocket.securedWebsocketCore as wssCore
 import util.progressiveBackoffCore as backoffCore
 import util.offlinePublishQueue as offlinePublishQueue
 
@@ -773,6 +772,8 @@ class Client(object):
             if self._useSecuredWebsocket:
                 # Never assign to ._ssl before wss handshake is finished
                 # Non-None value for ._ssl will allow ops before wss-MQTT connection is established
+                # The websocket/SigV4 code is only loaded when a websocket connection is made
+                import securedWebsocket.securedWebsocketCore as wssCore
                 rawSSL = ssl.wrap_socket(sock, ca_certs=self._tls_ca_certs, cert_reqs=ssl.CERT_REQUIRED)  # Add server certificate verification
                 rawSSL.setblocking(0)  # Non-blocking socket
                 self._ssl = wssCore.securedWebsocketCore(rawSSL, self._host, self._port)  # Overeride the _ssl socket
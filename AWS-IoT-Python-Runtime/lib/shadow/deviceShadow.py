@@ -257,6 +257,16 @@ class deviceShadow:
         # One subscription
         self._shadowManagerHandler.basicShadowSubscribe(self._shadowName, "delta", self._generalCallback)
 
+    def isPersistentSubscribe(self):
+        return self._isPersistentSubscribe
+
+    def restoreDeltaCallback(self, srcCallback):
+        # Delta callback of a previous run, its subscription is made once the connection is up
+        self._dataStructureLock.acquire()
+        self._shadowSubscribeCallbackTable["delta"] = srcCallback
+        self._dataStructureLock.release()
+        self._shadowManagerHandler.basicShadowRestoreSubscribe(self._shadowName, "delta", self._generalCallback)
+
     def shadowUnregisterDeltaCallback(self):
         self._dataStructureLock.acquire()
         # Update callback data structure
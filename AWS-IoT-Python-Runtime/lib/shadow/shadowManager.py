@@ -73,8 +73,17 @@ class shadowManager:
         if currentShadowAction.isDelta:
             self._mqttCoreHandler.subscribe(currentShadowAction.getTopicDelta(), 0, srcCallback)
         else:
-            self._mqttCoreHandler.subscribe(currentShadowAction.getTopicAccept(), 0, srcCallback)
-            self._mqttCoreHandler.subscribe(currentShadowAction.getTopicReject(), 0, srcCallback)
+            # accepted and rejected are in flight together
+            self._mqttCoreHandler.subscribeAll([(currentShadowAction.getTopicAccept(), 0, srcCallback), (currentShadowAction.getTopicReject(), 0, srcCallback)])
+
+    def basicShadowRestoreSubscribe(self, srcShadowName, srcShadowAction, srcCallback):
+        # Same topics as basicShadowSubscribe, subscribed once the connection is up
+        currentShadowAction = _shadowAction(srcShadowName, srcShadowAction)
+        if currentShadowAction.isDelta:
+            self._mqttCoreHandler.restoreSubscription(currentShadowAction.getTopicDelta(), 0, srcCallback)
+        else:
+            self._mqttCoreHandler.restoreSubscription(currentShadowAction.getTopicAccept(), 0, srcCallback)
+            self._mqttCoreHandler.restoreSubscription(currentShadowAction.getTopicReject(), 0, srcCallback)
 
     def basicShadowUnsubscribe(self, srcShadowName, srcShadowAction):
         currentShadowAction = _shadowAction(srcShadowName, srcShadowAction)
@@ -0,0 +1,89 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Matches shadow responses (accepted/rejected/timeout) with the sketch slot of the request, by client token.
+# Two sides meet here, in either order, without any waiting:
+# register(): the command side, once the request is out and its token is known, records the sketch slot
+# resolve(): the shadow callback, from the paho network thread or a timeout timer, hands over the response
+# Whichever comes second completes the pair and the response is delivered through the delivery callback.
+# A response that shows up before its token is registered is parked until the command side catches up.
+# Parked responses whose token is never registered (the request failed after publishing) and registrations
+# that never get a response are orphans, dropped once they are older than their timeout.
+# Orphans are cleaned up as new tokens come and go, and by sweepOrphans() while the runtime waits for the sketch,
+# no extra thread is needed.
+
+import time
+import threading
+
+
+class shadowTokenRegistry:
+
+    def __init__(self, srcDeliveryCallback, srcResponseTimeoutSecond=10, srcRegistrationTimeoutSecond=600):
+        # srcDeliveryCallback(srcSketchSlotNumber, srcResponse), called outside the registry lock
+        self._deliveryCallback = srcDeliveryCallback
+        self._responseTimeoutSecond = srcResponseTimeoutSecond
+        self._registrationTimeoutSecond = srcRegistrationTimeoutSecond
+        self._lock = threading.Lock()
+        self._slots = dict()  # token -> (sketchSlotNumber, registered time)
+        self._responses = dict()  # token -> (response, arrival time)
+        self._orphanCount = 0
+
+    def _dropOrphans(self, srcCurrentTime):
+        # Lock is held by the caller
+        for token, (response, arrivalTime) in self._responses.items():
+            if srcCurrentTime - arrivalTime > self._responseTimeoutSecond:
+                del self._responses[token]
+                self._orphanCount += 1
+        for token, (sketchSlotNumber, registeredTime) in self._slots.items():
+            if srcCurrentTime - registeredTime > self._registrationTimeoutSecond:
+                del self._slots[token]
+                self._orphanCount += 1
+
+    def register(self, srcToken, srcSketchSlotNumber):
+        currentTime = time.time()
+        self._lock.acquire()
+        self._dropOrphans(currentTime)
+        parked = self._responses.pop(srcToken, None)
+        if parked is None:
+            self._slots[srcToken] = (srcSketchSlotNumber, currentTime)
+        self._lock.release()
+        if parked is not None:
+            self._deliveryCallback(srcSketchSlotNumber, parked[0])
+
+    def resolve(self, srcToken, srcResponse):
+        currentTime = time.time()
+        self._lock.acquire()
+        self._dropOrphans(currentTime)
+        registered = self._slots.pop(srcToken, None)
+        if registered is None:
+            self._responses[srcToken] = (srcResponse, currentTime)
+        self._lock.release()
+        if registered is not None:
+            self._deliveryCallback(registered[0], srcResponse)
+
+    def sweepOrphans(self):
+        # Housekeeping: drop orphans even when no new tokens come
+        self._lock.acquire()
+        self._dropOrphans(time.time())
+        self._lock.release()
+
+    def getPendingCount(self):
+        # (registered tokens waiting for a response, responses waiting for a registration)
+        return len(self._slots), len(self._responses)
+
+    def getOrphanCount(self):
+        return self._orphanCount
@@ -0,0 +1,106 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# This class keeps the last JSON document delivered to each sketch slot that asked for delta encoding
+# and turns a new document into the fields that changed since then.
+# Nested objects are flattened into dot-separated paths, every other value is a leaf in compact JSON:
+#   {"state":{"desired":{"color":"red","level":3}}} -> state.desired.color="red"<TAB>state.desired.level=3
+# Changed and new fields come as path=value records. Fields that are gone come as a bare path, with no equal sign,
+# so that a field set to null (path=null) is not taken for a removed one:
+#   {"a":1,"b":null} then {"b":null,"c":2} -> c=2<TAB>a
+# Records are separated by TAB, which never shows up unescaped in a JSON value.
+# In keys, backslash, dot, equal sign, TAB, CR and LF are escaped with a backslash so that paths stay unambiguous:
+#   {"a.b":{"c=d":1}} -> a\.b.c\=d=1
+# The first document for a slot comes in full. A document with no changes since the last one gives None: nothing to send.
+# Payloads that are not JSON objects are passed through as they are.
+
+import re
+
+
+class jsonDeltaEncoder:
+
+    RECORD_SEPARATOR = "\t"
+    _KEY_ESCAPES = {"\\": "\\\\", ".": "\\.", "=": "\\=", "\t": "\\t", "\r": "\\r", "\n": "\\n"}
+    _KEY_SPECIAL_CHARACTERS = re.compile("[\\\\.=\t\r\n]")
+
+    def __init__(self):
+        self._encodingSlots = set()
+        self._lastDocuments = dict()  # sketchSlotNumber -> {path: compact JSON value} of the last delivered document
+
+    def setSlotEncoding(self, srcSketchSlotNumber, srcEncoding):
+        # Start over from a full document whenever the setting is (re-)applied
+        self._lastDocuments.pop(srcSketchSlotNumber, None)
+        if srcEncoding:
+            self._encodingSlots.add(srcSketchSlotNumber)
+        else:
+            self._encodingSlots.discard(srcSketchSlotNumber)
+
+    def resetDocuments(self):
+        # Every encoding slot starts over from a full document
+        self._lastDocuments.clear()
+
+    def resetSlotDocument(self, srcSketchSlotNumber):
+        # The last document did not make it to the sketch slot, the next one comes in full
+        self._lastDocuments.pop(srcSketchSlotNumber, None)
+
+    def isSlotEncoding(self, srcSketchSlotNumber):
+        return srcSketchSlotNumber in self._encodingSlots
+
+    def _flatten(self, srcObject, srcPrefix, srcFields):
+        import json  # Loaded with the first encoded payload, not at startup
+        for key, value in srcObject.iteritems():
+            if isinstance(key, unicode):
+                key = key.encode("utf-8")
+            if self._KEY_SPECIAL_CHARACTERS.search(key) is not None:
+                key = self._KEY_SPECIAL_CHARACTERS.sub(lambda match: self._KEY_ESCAPES[match.group(0)], key)
+            path = srcPrefix + key
+            if isinstance(value, dict) and len(value) > 0:
+                self._flatten(value, path + ".", srcFields)
+            else:
+                srcFields[path] = json.dumps(value, separators=(",", ":"))
+
+    def _parseFields(self, srcPayload):
+        # Return {path: compact JSON value}, None if this is not a JSON object
+        import json
+        try:
+            document = json.loads(srcPayload)
+        except ValueError:
+            return None
+        if not isinstance(document, dict):
+            return None
+        ret = dict()
+        self._flatten(document, "", ret)
+        return ret
+
+    def encode(self, srcSketchSlotNumber, srcPayload):
+        currentFields = self._parseFields(srcPayload)
+        if currentFields is None:
+            return srcPayload
+        lastFields = self._lastDocuments.get(srcSketchSlotNumber)
+        if lastFields == currentFields:
+            return None  # Nothing changed
+        if lastFields is None:
+            lastFields = dict()
+        records = []
+        for path in sorted(currentFields):
+            if lastFields.get(path) != currentFields[path]:
+                records.append(path + "=" + currentFields[path])
+        for path in sorted(lastFields):
+            if path not in currentFields:
+                records.append(path)
+        self._lastDocuments[srcSketchSlotNumber] = currentFields
+        return self.RECORD_SEPARATOR.join(records)
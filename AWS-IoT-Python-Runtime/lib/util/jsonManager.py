@@ -1,6 +1,3 @@
-import json
-
-
 class jsonManager:
     # This is the JSON Manager that stores all the complete JSON payload
     # JSON payload can be accessed by keys provided when inserting them
@@ -78,6 +75,7 @@ class jsonManager:
         # Get the value using the key in JSON
         # If key is not present/Invalid JSON input detected, None will be returned
         # ***Need to work on property that contains ':'
+        import json  # Loaded on the first JSON retrieve, not at startup
         try:
             levels = key.split('"')
             tempDict = json.loads(JSONPayload)
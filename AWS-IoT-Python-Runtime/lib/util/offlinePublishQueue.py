@@ -15,57 +15,98 @@
  */
  '''
 
-# This class implements the offline Publish Queue, with configurable length and drop behaviors.
+# This class implements the offline Publish Queue, with configurable length, byte budget and drop behaviors.
 # This queue will be used as the offline Publish Queue for all message outside Paho as an option
 # to publish to when the client is offline.
-# DROP_OLDEST: Drop the head of the queue when the size limit is reached.
-# DROP_NEWEST: Drop the new incoming elements when the size limit is reached.
+# Requests are kept in a deque together with their size (topic + payload), so that enqueue, drop and dequeue are O(1)
+# and draining a large backlog stays linear.
+# MaximumSize limits the number of requests and MaximumBytes their total size, 0 for no limit.
+# DROP_OLDEST: Drop the head of the queue when a limit is reached.
+# DROP_NEWEST: Drop the new incoming elements when a limit is reached.
+# Every dropped request is counted, with its size.
 
+from collections import deque
 
-class offlinePublishQueue(list):
+
+class offlinePublishQueue:
 
     _DROPBEHAVIOR_OLDEST = 0
     _DROPBEHAVIOR_NEWEST = 1
 
-    def __init__(self, srcMaximumSize, srcDropBehavior=1):
-        if not isinstance(srcMaximumSize, int) or not isinstance(srcDropBehavior, int):
-            raise TypeError("MaximumSize/DropBehavior must be integer.")
-        if srcMaximumSize < 0:
-            raise ValueError('MaximumSize must be greater than or equal to zero.')
+    def __init__(self, srcMaximumSize, srcDropBehavior=1, srcMaximumBytes=0):
+        if not isinstance(srcMaximumSize, int) or not isinstance(srcDropBehavior, int) or not isinstance(srcMaximumBytes, int):
+            raise TypeError("MaximumSize/DropBehavior/MaximumBytes must be integer.")
+        if srcMaximumSize < 0 or srcMaximumBytes < 0:
+            raise ValueError('MaximumSize/MaximumBytes must be greater than or equal to zero.')
         if srcDropBehavior != 0 and srcDropBehavior != 1:
             raise ValueError('Drop behavior not supported.')
-        list.__init__([])
+        self._queue = deque()  # (size, request)
+        self._bytes = 0
         self._dropBehavior = srcDropBehavior
         self._maximumSize = srcMaximumSize
+        self._maximumBytes = srcMaximumBytes
+        self._droppedCount = 0
+        self._droppedBytes = 0
+
+    def __len__(self):
+        return len(self._queue)
+
+    def getByteCount(self):
+        # Size of the queued requests
+        return self._bytes
+
+    def getDroppedCount(self):
+        # Number of requests dropped since start
+        return self._droppedCount
 
-    def _needDropMessages(self):
-        isWholeQueueFull = len(self) >= self._maximumSize
-        isQueueLimited = self._maximumSize > 0
-        # Only if the whole queue is full and the queue section is limited will we need to do the dropping
-        return isWholeQueueFull and isQueueLimited
+    def getDroppedBytes(self):
+        return self._droppedBytes
+
+    def _sizeOf(self, srcData):
+        return len(srcData.topic) + len(srcData.payload)
+
+    def _needDropMessages(self, srcSize):
+        isCountFull = self._maximumSize > 0 and len(self._queue) >= self._maximumSize
+        isBytesFull = self._maximumBytes > 0 and self._bytes + srcSize > self._maximumBytes
+        # Only if one of the limits is reached will we need to do the dropping
+        return len(self._queue) > 0 and (isCountFull or isBytesFull)
+
+    def _countDrop(self, srcSize):
+        self._droppedCount += 1
+        self._droppedBytes += srcSize
 
     def setDropBehavior(self, srcDropBehavior):
         if not isinstance(srcDropBehavior, int):
             raise TypeError("Drop behavior must be an integer.")
-        if srcDropBehavior != self._DROPBEHAVIOR_NEWEST or srcDropBehavior != self._DROPBEHAVIOR_OLDEST:
+        if srcDropBehavior != self._DROPBEHAVIOR_NEWEST and srcDropBehavior != self._DROPBEHAVIOR_OLDEST:
             raise ValueError('Drop behavior not supported, must be 0-drop_oldest or 1-drop-newest.')
         self._dropBehavior = srcDropBehavior
 
-    # Override
     # Append to a queue with a limited size.
     # Return True if the append is successful
     # Return False if the queue is full
     def append(self, srcData):
+        size = self._sizeOf(srcData)
+        if self._maximumBytes > 0 and size > self._maximumBytes:
+            # Would never fit
+            self._countDrop(size)
+            return False
         ret = True
-        if self._needDropMessages():
+        while self._needDropMessages(size):
             # We should drop the newest
             if self._dropBehavior == self._DROPBEHAVIOR_NEWEST:
-                ret = False
+                self._countDrop(size)
+                return False
             # We should drop the oldest
-            else:
-                super(offlinePublishQueue, self).pop(0)
-                super(offlinePublishQueue, self).append(srcData)
-                ret = False
-        else:
-            super(offlinePublishQueue, self).append(srcData)
+            (droppedSize, droppedData) = self._queue.popleft()
+            self._bytes -= droppedSize
+            self._countDrop(droppedSize)
+            ret = False
+        self._queue.append((size, srcData))
+        self._bytes += size
         return ret
+
+    def popleft(self):
+        (size, data) = self._queue.popleft()  # IndexError if empty
+        self._bytes -= size
+        return data
@@ -0,0 +1,365 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# This class implements the offline Publish Queue on disk, so that queued publish requests outlive a restart of the
+# runtime or a reboot of the board. It has the same interface and drop behaviors as offlinePublishQueue.
+# Requests are appended to segment files (segment-<number>.log) in the queue directory. Each record is:
+#   <body length (4 bytes)> <crc32 of the body (4 bytes)> <qos (1 byte)> <retain (1 byte)> <topic length (2 bytes)> <topic> <payload>
+# A new segment is started once the current one reaches the segment size, a segment is deleted once it is fully read.
+# The position of the head (segment number and offset) is kept in the cursor file, renamed over after each update.
+# It is written every _CURSOR_COMMIT_INTERVAL pops and whenever the queue runs empty, so up to that many requests can
+# be published again after a crash: the same at-least-once delivery as QoS 1.
+# On start, the segments are scanned from the cursor on. A record cut short by a crash or that fails its crc ends its
+# segment, which is truncated there.
+# Appends are flushed to the OS at once, so they outlive a crash of the runtime. They are fsync-ed in batches, every
+# SyncInterval appends, when a segment is full and on close, so a power cut can lose up to SyncInterval of them.
+# SyncInterval 1 fsyncs every append, 0 leaves it to the OS.
+# Only the head record is read to pop it, the backlog itself never sits in memory.
+# MaximumSize limits the number of requests and MaximumBytes the size of the records on disk, 0 for no limit.
+# DROP_OLDEST: Drop the head of the queue when a limit is reached.
+# DROP_NEWEST: Drop the new incoming elements when a limit is reached.
+# Every dropped request is counted, with its record size.
+
+import os
+import struct
+import zlib
+
+
+class persistentPublishQueue:
+
+    _DROPBEHAVIOR_OLDEST = 0
+    _DROPBEHAVIOR_NEWEST = 1
+    _SEGMENT_PREFIX = "segment-"
+    _SEGMENT_SUFFIX = ".log"
+    _CURSOR_FILE_NAME = "cursor"
+    _CURSOR_COMMIT_INTERVAL = 16
+    _SYNC_INTERVAL = 32
+    _RECORD_HEADER = struct.Struct(">II")
+    _BODY_HEADER = struct.Struct(">BBH")
+
+    # srcRequestType: builds a popped request from (topic, payload, qos, retain), a tuple of them if None
+    # srcSyncInterval: number of appends between two fsyncs, 1 so that a power cut does not lose what was accepted
+    def __init__(self, srcDirectory, srcMaximumSize, srcMaximumBytes, srcDropBehavior=1, srcRequestType=None, srcSegmentBytes=64*1024, srcSyncInterval=_SYNC_INTERVAL):
+        if srcDirectory is None:
+            raise TypeError("None type inputs detected.")
+        if not isinstance(srcMaximumSize, int) or not isinstance(srcMaximumBytes, int) or not isinstance(srcDropBehavior, int):
+            raise TypeError("MaximumSize/MaximumBytes/DropBehavior must be integer.")
+        if srcMaximumSize < 0 or srcMaximumBytes < 0:
+            raise ValueError('MaximumSize/MaximumBytes must be greater than or equal to zero.')
+        if srcDropBehavior != 0 and srcDropBehavior != 1:
+            raise ValueError('Drop behavior not supported.')
+        if srcSegmentBytes <= 0:
+            raise ValueError('Segment size must be greater than zero.')
+        if srcSyncInterval < 0:
+            raise ValueError('Sync interval must be greater than or equal to zero.')
+        self._directory = srcDirectory
+        self._maximumSize = srcMaximumSize
+        self._maximumBytes = srcMaximumBytes
+        self._dropBehavior = srcDropBehavior
+        self._requestType = srcRequestType
+        self._segmentBytes = srcSegmentBytes
+        self._syncInterval = srcSyncInterval
+        self._unsyncedAppendCount = 0
+        self._segmentNumbers = []  # Segments on disk, oldest first: the head is read from the first, the last is written
+        self._readFile = None
+        self._readOffset = 0
+        self._writeFile = None
+        self._writeOffset = 0
+        self._length = 0
+        self._byteCount = 0
+        self._uncommittedPopCount = 0
+        self._droppedCount = 0
+        self._droppedBytes = 0
+        self._recover()
+
+    def __len__(self):
+        return self._length
+
+    def getDirectory(self):
+        return self._directory
+
+    def getByteCount(self):
+        # Size of the queued records on disk
+        return self._byteCount
+
+    def getDroppedCount(self):
+        # Number of requests dropped since start
+        return self._droppedCount
+
+    def getDroppedBytes(self):
+        return self._droppedBytes
+
+    def _countDrop(self, srcSize):
+        self._droppedCount += 1
+        self._droppedBytes += srcSize
+
+    def setDropBehavior(self, srcDropBehavior):
+        if not isinstance(srcDropBehavior, int):
+            raise TypeError("Drop behavior must be an integer.")
+        if srcDropBehavior != self._DROPBEHAVIOR_NEWEST and srcDropBehavior != self._DROPBEHAVIOR_OLDEST:
+            raise ValueError('Drop behavior not supported, must be 0-drop_oldest or 1-drop-newest.')
+        self._dropBehavior = srcDropBehavior
+
+    # Files
+    def _segmentPath(self, srcSegmentNumber):
+        return os.path.join(self._directory, self._SEGMENT_PREFIX + "%08d" % srcSegmentNumber + self._SEGMENT_SUFFIX)
+
+    def _cursorPath(self):
+        return os.path.join(self._directory, self._CURSOR_FILE_NAME)
+
+    def _listSegmentNumbers(self):
+        segmentNumbers = []
+        for fileName in os.listdir(self._directory):
+            if fileName.startswith(self._SEGMENT_PREFIX) and fileName.endswith(self._SEGMENT_SUFFIX):
+                numberString = fileName[len(self._SEGMENT_PREFIX):-len(self._SEGMENT_SUFFIX)]
+                if numberString.isdigit():
+                    segmentNumbers.append(int(numberString))
+        segmentNumbers.sort()
+        return segmentNumbers
+
+    def _loadCursor(self):
+        # (segment number, offset) of the head, None if there is no valid cursor
+        try:
+            cursorFile = open(self._cursorPath(), "r")
+            try:
+                fields = cursorFile.read().split()
+            finally:
+                cursorFile.close()
+            if len(fields) == 2:
+                return (int(fields[0]), int(fields[1]))
+        except (IOError, ValueError):
+            pass
+        return None
+
+    def _commitCursor(self):
+        temporaryPath = self._cursorPath() + ".tmp"
+        cursorFile = open(temporaryPath, "w")
+        try:
+            cursorFile.write(str(self._segmentNumbers[0]) + " " + str(self._readOffset) + "\n")
+            if self._syncInterval > 0:
+                cursorFile.flush()
+                os.fsync(cursorFile.fileno())
+        finally:
+            cursorFile.close()
+        os.rename(temporaryPath, self._cursorPath())
+        self._uncommittedPopCount = 0
+
+    # Records
+    def _encodeRecord(self, srcRequest):
+        if isinstance(srcRequest, tuple):
+            (topic, payload, qos, retain) = srcRequest
+        else:
+            (topic, payload, qos, retain) = (srcRequest.topic, srcRequest.payload, srcRequest.qos, srcRequest.retain)
+        if isinstance(topic, unicode):
+            topic = topic.encode("utf-8")
+        if isinstance(payload, unicode):
+            payload = payload.encode("utf-8")
+        payload = str(payload)
+        body = self._BODY_HEADER.pack(int(qos), int(bool(retain)), len(topic)) + topic + payload
+        return self._RECORD_HEADER.pack(len(body), zlib.crc32(body) & 0xffffffff) + body
+
+    def _decodeBody(self, srcBody):
+        (qos, retain, topicLength) = self._BODY_HEADER.unpack_from(srcBody)
+        topicStart = self._BODY_HEADER.size
+        topic = srcBody[topicStart:topicStart + topicLength]
+        payload = srcBody[topicStart + topicLength:]
+        if self._requestType is None:
+            return (topic, payload, qos, retain == 1)
+        return self._requestType(topic, payload, qos, retain == 1)
+
+    def _scanSegment(self, srcSegmentNumber, srcOffset):
+        # Count the valid records of a segment from srcOffset on, truncating it after the last one
+        # Return (number of records, their size in bytes, end offset)
+        recordCount = 0
+        byteCount = 0
+        offset = srcOffset
+        segmentFile = open(self._segmentPath(srcSegmentNumber), "r+b")
+        try:
+            segmentFile.seek(offset)
+            while True:
+                header = segmentFile.read(self._RECORD_HEADER.size)
+                if len(header) < self._RECORD_HEADER.size:
+                    break
+                (bodyLength, checksum) = self._RECORD_HEADER.unpack(header)
+                body = segmentFile.read(bodyLength)
+                if len(body) < bodyLength or bodyLength < self._BODY_HEADER.size or zlib.crc32(body) & 0xffffffff != checksum:
+                    break
+                recordCount += 1
+                byteCount += self._RECORD_HEADER.size + bodyLength
+                offset += self._RECORD_HEADER.size + bodyLength
+            segmentFile.seek(0, os.SEEK_END)
+            if segmentFile.tell() > offset:
+                segmentFile.truncate(offset)
+        finally:
+            segmentFile.close()
+        return (recordCount, byteCount, offset)
+
+    def _recover(self):
+        if not os.path.isdir(self._directory):
+            os.makedirs(self._directory)
+        segmentNumbers = self._listSegmentNumbers()
+        cursor = self._loadCursor()
+        headOffset = 0
+        if cursor is not None:
+            # Segments before the cursor were fully read
+            for segmentNumber in segmentNumbers:
+                if segmentNumber < cursor[0]:
+                    os.unlink(self._segmentPath(segmentNumber))
+            segmentNumbers = [segmentNumber for segmentNumber in segmentNumbers if segmentNumber >= cursor[0]]
+            if segmentNumbers and segmentNumbers[0] == cursor[0]:
+                headOffset = cursor[1]
+        liveSegmentNumbers = []
+        for segmentNumber in segmentNumbers:
+            offset = 0
+            if segmentNumber == segmentNumbers[0]:
+                offset = min(headOffset, os.path.getsize(self._segmentPath(segmentNumber)))
+            (recordCount, byteCount, endOffset) = self._scanSegment(segmentNumber, offset)
+            if recordCount == 0 and segmentNumber != segmentNumbers[-1]:
+                # Nothing left to read in it
+                os.unlink(self._segmentPath(segmentNumber))
+                continue
+            if not liveSegmentNumbers:
+                self._readOffset = offset
+            liveSegmentNumbers.append(segmentNumber)
+            self._length += recordCount
+            self._byteCount += byteCount
+            self._writeOffset = endOffset
+        if self._length == 0:
+            # Nothing left to publish, start over with ONE empty segment
+            nextSegmentNumber = 0
+            if segmentNumbers:
+                nextSegmentNumber = segmentNumbers[-1] + 1
+            elif cursor is not None:
+                nextSegmentNumber = cursor[0] + 1
+            for segmentNumber in liveSegmentNumbers:
+                os.unlink(self._segmentPath(segmentNumber))
+            liveSegmentNumbers = [nextSegmentNumber]
+            self._readOffset = 0
+            self._writeOffset = 0
+        self._segmentNumbers = liveSegmentNumbers
+        self._writeFile = open(self._segmentPath(liveSegmentNumbers[-1]), "ab")
+        self._readFile = open(self._segmentPath(liveSegmentNumbers[0]), "rb")
+        self._commitCursor()
+
+    def _syncWriteFile(self):
+        if self._syncInterval > 0 and self._unsyncedAppendCount > 0:
+            os.fsync(self._writeFile.fileno())
+        self._unsyncedAppendCount = 0
+
+    # Head and tail
+    def _startSegment(self):
+        self._syncWriteFile()
+        self._writeFile.close()
+        self._segmentNumbers.append(self._segmentNumbers[-1] + 1)
+        self._writeFile = open(self._segmentPath(self._segmentNumbers[-1]), "ab")
+        self._writeOffset = 0
+
+    def _nextReadSegment(self):
+        # The head segment is fully read and is not the one being written: move on to the next one
+        self._readFile.close()
+        os.unlink(self._segmentPath(self._segmentNumbers.pop(0)))
+        self._readFile = open(self._segmentPath(self._segmentNumbers[0]), "rb")
+        self._readOffset = 0
+        self._commitCursor()
+
+    def _reset(self):
+        # The queue ran empty: drop its segments and go on with a new empty one
+        self._unsyncedAppendCount = 0
+        self._readFile.close()
+        self._writeFile.close()
+        for segmentNumber in self._segmentNumbers:
+            os.unlink(self._segmentPath(segmentNumber))
+        self._segmentNumbers = [self._segmentNumbers[-1] + 1]
+        self._writeFile = open(self._segmentPath(self._segmentNumbers[0]), "ab")
+        self._writeOffset = 0
+        self._readFile = open(self._segmentPath(self._segmentNumbers[0]), "rb")
+        self._readOffset = 0
+        self._commitCursor()
+
+    def _advanceHead(self, srcIsDecoding):
+        # Take the head record off the queue, return the request if srcIsDecoding
+        self._readFile.seek(self._readOffset)
+        (bodyLength, checksum) = self._RECORD_HEADER.unpack(self._readFile.read(self._RECORD_HEADER.size))
+        request = None
+        if srcIsDecoding:
+            request = self._decodeBody(self._readFile.read(bodyLength))
+        self._readOffset += self._RECORD_HEADER.size + bodyLength
+        self._length -= 1
+        self._byteCount -= self._RECORD_HEADER.size + bodyLength
+        self._uncommittedPopCount += 1
+        if self._length == 0:
+            self._reset()
+        elif len(self._segmentNumbers) > 1 and self._readOffset >= os.fstat(self._readFile.fileno()).st_size:
+            self._nextReadSegment()
+        elif self._uncommittedPopCount >= self._CURSOR_COMMIT_INTERVAL:
+            self._commitCursor()
+        return request
+
+    def _needDropMessages(self, srcRecordBytes):
+        isCountFull = self._maximumSize > 0 and self._length >= self._maximumSize
+        isBytesFull = self._maximumBytes > 0 and self._byteCount + srcRecordBytes > self._maximumBytes
+        return self._length > 0 and (isCountFull or isBytesFull)
+
+    # Append to a queue with a limited size.
+    # Return True if the append is successful
+    # Return False if the queue is full
+    def append(self, srcData):
+        record = self._encodeRecord(srcData)
+        if self._maximumBytes > 0 and len(record) > self._maximumBytes:
+            # Would never fit
+            self._countDrop(len(record))
+            return False
+        ret = True
+        while self._needDropMessages(len(record)):
+            # We should drop the newest
+            if self._dropBehavior == self._DROPBEHAVIOR_NEWEST:
+                self._countDrop(len(record))
+                return False
+            # We should drop the oldest
+            byteCount = self._byteCount
+            self._advanceHead(False)
+            self._countDrop(byteCount - self._byteCount)
+            ret = False
+        if not ret and self._uncommittedPopCount > 0:
+            # Dropped requests must not come back after a crash
+            self._commitCursor()
+        if self._writeOffset >= self._segmentBytes:
+            self._startSegment()
+        self._writeFile.write(record)
+        self._writeFile.flush()
+        self._unsyncedAppendCount += 1
+        if self._unsyncedAppendCount >= self._syncInterval:
+            self._syncWriteFile()
+        self._writeOffset += len(record)
+        self._length += 1
+        self._byteCount += len(record)
+        return ret
+
+    def popleft(self):
+        if self._length == 0:
+            raise IndexError("Pop from an empty queue.")
+        return self._advanceHead(True)
+
+    def close(self):
+        # Keep the head position for the next start
+        if self._readFile is not None:
+            self._syncWriteFile()
+            self._commitCursor()
+            self._readFile.close()
+            self._writeFile.close()
+            self._readFile = None
+            self._writeFile = None
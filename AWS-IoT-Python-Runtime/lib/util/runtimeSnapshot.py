@@ -0,0 +1,95 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# This class keeps a checkpoint of the runtime state in ONE local file, so that a restarted runtime can take it back
+# without the sketch replaying its setup over the Bridge.
+# The state is a dict of plain values (strings, numbers, lists) put together by the runtime, stored as compact JSON.
+# A checkpoint is written to a temporary file next to the snapshot and renamed over it, so that a power cut in the
+# middle of a write leaves the previous checkpoint in place.
+# Snapshots of another format version, or that cannot be read, are ignored: the runtime starts clean.
+
+import os
+
+
+def _toByteString(srcValue):
+    # json gives unicode strings, the runtime works with utf-8 str everywhere else
+    if isinstance(srcValue, unicode):
+        return srcValue.encode("utf-8")
+    if isinstance(srcValue, list):
+        return [_toByteString(value) for value in srcValue]
+    if isinstance(srcValue, dict):
+        return dict((_toByteString(key), _toByteString(value)) for key, value in srcValue.iteritems())
+    return srcValue
+
+
+class runtimeSnapshot:
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, srcFilePath):
+        if srcFilePath is None:
+            raise TypeError("None type inputs detected.")
+        self._filePath = srcFilePath
+        self._temporaryFilePath = srcFilePath + ".tmp"
+        self._lastContent = None
+        self._saveCount = 0
+
+    def getFilePath(self):
+        return self._filePath
+
+    def getSaveCount(self):
+        # Number of checkpoints actually written, unchanged states are not written again
+        return self._saveCount
+
+    def save(self, srcState):
+        import json
+        content = json.dumps({"version": self.FORMAT_VERSION, "state": srcState}, separators=(",", ":"), sort_keys=True)
+        if content == self._lastContent:
+            return False
+        snapshotFile = open(self._temporaryFilePath, "w")
+        try:
+            snapshotFile.write(content)
+            snapshotFile.flush()
+            os.fsync(snapshotFile.fileno())
+        finally:
+            snapshotFile.close()
+        os.rename(self._temporaryFilePath, self._filePath)
+        self._lastContent = content
+        self._saveCount += 1
+        return True
+
+    def load(self):
+        # The state of the last checkpoint, None if there is none to take back
+        import json
+        try:
+            snapshotFile = open(self._filePath, "r")
+            try:
+                content = snapshotFile.read()
+            finally:
+                snapshotFile.close()
+            document = json.loads(content)
+        except (IOError, ValueError):
+            return None
+        if not isinstance(document, dict) or document.get("version") != self.FORMAT_VERSION or not isinstance(document.get("state"), dict):
+            return None
+        self._lastContent = content
+        return _toByteString(document["state"])
+
+    def clear(self):
+        if os.path.exists(self._filePath):
+            os.unlink(self._filePath)
+        self._lastContent = None
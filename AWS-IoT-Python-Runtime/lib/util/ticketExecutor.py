@@ -0,0 +1,142 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# This class runs blocking runtime tasks (connect/subscribe/shadow requests) in ONE worker thread.
+# Each submitted task gets a ticket id right away, the task itself runs later in submission order
+# so that a subscribe submitted after a connect still sees the connection.
+# When a task finishes, its reply is handed to the completion callback together with its ticket id.
+# Ticket ids start from 1 and wrap around after _MAXIMUM_TICKET_ID.
+# Pipelined tasks (subscribe/unsubscribe) come with a pipeline key (the topic). Tasks with different keys do not wait
+# for each other: up to _MAXIMUM_PIPELINED_TASKS keys are served at once, each in its own thread, and may complete
+# out of order. Tasks with the same key run one after another in submission order, so the last request on a topic wins.
+# Any other task still waits for all tasks before it.
+# Async mode (on/off and the sketch slot that receives completions) is kept here for the runtime to check.
+
+import threading
+import Queue
+
+
+class ticketExecutor:
+
+    _MAXIMUM_TICKET_ID = 65535
+    _MAXIMUM_PIPELINED_TASKS = 8
+
+    def __init__(self, srcCompletionCallback):
+        self._completionCallback = srcCompletionCallback
+        self._taskQueue = Queue.Queue()
+        self._lock = threading.Lock()
+        self._lastTicketID = 0
+        self._pendingCount = 0
+        self._workerThread = None
+        self._pipelineCondition = threading.Condition(threading.Lock())
+        self._pipelinedCount = 0  # Pipeline keys being served
+        self._pipelineChains = dict()  # pipelineKey -> [(ticketID, task), ...] still to run after the running one
+        self._enabled = False
+        self._completionSlotNumber = -1
+
+    def _nextTicketID(self):
+        self._lastTicketID += 1
+        if self._lastTicketID > self._MAXIMUM_TICKET_ID:
+            self._lastTicketID = 1
+        return self._lastTicketID
+
+    def _startWorker(self):
+        if self._workerThread is None:
+            self._workerThread = threading.Thread(target=self._work)
+            self._workerThread.daemon = True
+            self._workerThread.start()
+
+    def _work(self):
+        while True:
+            currentTicketID, currentTask, currentPipelineKey = self._taskQueue.get()
+            isPipelined = currentPipelineKey is not None
+            self._pipelineCondition.acquire()
+            if isPipelined and currentPipelineKey in self._pipelineChains:
+                # Runs after the tasks already queued for this key, in the same thread
+                self._pipelineChains[currentPipelineKey].append((currentTicketID, currentTask))
+                self._pipelineCondition.release()
+                continue
+            # A pipelined task waits for a free place, any other task for the pipelined tasks before it to finish
+            maximumPipelinedCount = self._MAXIMUM_PIPELINED_TASKS - 1 if isPipelined else 0
+            while self._pipelinedCount > maximumPipelinedCount:
+                self._pipelineCondition.wait()
+            if isPipelined:
+                self._pipelinedCount += 1
+                self._pipelineChains[currentPipelineKey] = []
+            self._pipelineCondition.release()
+            if isPipelined:
+                pipelinedThread = threading.Thread(target=self._runPipelined, args=[currentPipelineKey, currentTicketID, currentTask])
+                pipelinedThread.daemon = True
+                pipelinedThread.start()
+            else:
+                self._run(currentTicketID, currentTask)
+
+    def _run(self, srcTicketID, srcTask):
+        try:
+            currentReply = srcTask()
+        except Exception as e:
+            currentReply = None
+        self._lock.acquire()
+        self._pendingCount -= 1
+        self._lock.release()
+        self._completionCallback(srcTicketID, currentReply)
+
+    def _runPipelined(self, srcPipelineKey, srcTicketID, srcTask):
+        # Run this task, then the ones queued for the same key meanwhile
+        while srcTask is not None:
+            try:
+                self._run(srcTicketID, srcTask)
+            except Exception as e:
+                pass  # A failing completion callback must not hold up the tasks queued behind this one
+            srcTask = None
+            self._pipelineCondition.acquire()
+            currentChain = self._pipelineChains[srcPipelineKey]
+            if len(currentChain) > 0:
+                srcTicketID, srcTask = currentChain.pop(0)
+            else:
+                del self._pipelineChains[srcPipelineKey]
+                self._pipelinedCount -= 1
+                self._pipelineCondition.notifyAll()
+            self._pipelineCondition.release()
+
+    def setAsyncMode(self, srcEnabled, srcCompletionSlotNumber):
+        if not isinstance(srcEnabled, bool) or not isinstance(srcCompletionSlotNumber, int):
+            raise TypeError("Enabled must be boolean and CompletionSlotNumber must be integer.")
+        if srcEnabled and srcCompletionSlotNumber < 0:
+            raise ValueError("CompletionSlotNumber must not be negative.")
+        self._enabled = srcEnabled
+        self._completionSlotNumber = srcCompletionSlotNumber
+
+    def isEnabled(self):
+        return self._enabled
+
+    def getCompletionSlotNumber(self):
+        return self._completionSlotNumber
+
+    def submit(self, srcTask, srcPipelineKey=None):
+        # srcTask: callable with no arguments, returns the reply for this ticket
+        # srcPipelineKey: may run alongside the pipelined tasks next to it that have another key, None if not pipelined
+        self._lock.acquire()
+        ret = self._nextTicketID()
+        self._pendingCount += 1
+        self._startWorker()
+        self._lock.release()
+        self._taskQueue.put((ret, srcTask, srcPipelineKey))
+        return ret
+
+    def getPendingCount(self):
+        return self._pendingCount
@@ -0,0 +1,103 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# This class implements a token bucket: requests go through at a sustained rate, with bursts of up to burst requests.
+# The bucket starts full and gains rate tokens per second, up to burst.
+# A caller takes its token right away, the balance going negative if there is none, and waits for the time it takes
+# the bucket to get back to zero. Waiting callers are served in the order they came, without holding the lock.
+# A caller that cannot wait tries to take a token instead, and gets none if the bucket is empty.
+# A rate of 0 means no limit.
+
+import time
+import threading
+
+
+class tokenBucket:
+
+    def __init__(self, srcRatePerSecond=0, srcBurst=1):
+        self._lock = threading.Lock()
+        self._ratePerSecond = 0
+        self._burst = 1
+        self._tokens = 0.0
+        self._lastRefillTime = time.time()
+        self.setRate(srcRatePerSecond, srcBurst)
+
+    def setRate(self, srcRatePerSecond, srcBurst):
+        if not isinstance(srcRatePerSecond, (int, float)) or not isinstance(srcBurst, int):
+            raise TypeError("Rate must be a number and burst must be integer.")
+        if srcRatePerSecond < 0:
+            raise ValueError("Rate must be greater than or equal to zero.")
+        if srcBurst < 1:
+            raise ValueError("Burst must be greater than zero.")
+        self._lock.acquire()
+        try:
+            self._ratePerSecond = srcRatePerSecond
+            self._burst = srcBurst
+            self._tokens = float(srcBurst)
+            self._lastRefillTime = time.time()
+        finally:
+            self._lock.release()
+
+    def getRatePerSecond(self):
+        return self._ratePerSecond
+
+    def getBurst(self):
+        return self._burst
+
+    def isLimited(self):
+        return self._ratePerSecond > 0
+
+    def _refill(self, srcCurrentTime):
+        # A clock set backwards adds nothing
+        elapsedTime = max(0.0, srcCurrentTime - self._lastRefillTime)
+        self._tokens = min(float(self._burst), self._tokens + elapsedTime * self._ratePerSecond)
+        self._lastRefillTime = srcCurrentTime
+
+    def reserve(self):
+        # Take a token, return the number of seconds to wait before using it
+        if not self.isLimited():
+            return 0.0
+        self._lock.acquire()
+        try:
+            self._refill(time.time())
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self._ratePerSecond
+        finally:
+            self._lock.release()
+
+    def tryAcquire(self):
+        # Take a token only if one is available now, return whether it was taken
+        if not self.isLimited():
+            return True
+        self._lock.acquire()
+        try:
+            self._refill(time.time())
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+        finally:
+            self._lock.release()
+
+    def acquire(self):
+        # Block until a token is available
+        waitTime = self.reserve()
+        if waitTime > 0:
+            time.sleep(waitTime)
+        return waitTime
@@ -15,7 +15,125 @@
  */
  '''
 
-from runtimeHub import *
+# Usage: python run.py                      Serve the sketch over stdin/stdout (Bridge)
+#        python run.py --tty <device>       Serve the remote client on a tty device
+#        python run.py --pty                Serve the remote client on a new pty, its name goes to stderr
+#        python run.py --unix <path>        Serve remote clients on a UNIX domain socket, one runtimeHub each
+#        python run.py --tcp <host>:<port>  Serve remote clients on TCP, one runtimeHub each
+#        python run.py --daemon <path>      Serve remote clients on a UNIX domain socket, one at a time, all with the same
+#                                           runtimeHub: MQTT connections, subscriptions and shadow registrations outlive them
+#        python run.py --attach <path>      Relay stdin/stdout to the daemon on <path>, starting the daemon if needed
+# Add --snapshot <file> to checkpoint the runtime state (MQTT setup, subscriptions, deviceShadows) to <file> and to restore
+# it on start. Add --offline-queue <directory> to keep the offline publish queue on disk under <directory>, one
+# subdirectory per client ID, so that queued publish requests outlive a restart, and --offline-queue-bytes <bytes> to
+# change its byte budget (1 MB by default). Neither is for --unix/--tcp, where every remote client has its own runtimeHub.
 
-AWSIoTMQTTArduinoPyHub = runtimeHub("AWSIoTMQTTArduinoHub", "../log/")
-AWSIoTMQTTArduinoPyHub.run()
+import os
+import sys
+import threading
+import subprocess
+sys.path.append("../lib/")
+# runtimeHub (paho, ssl...) is imported by the modes that need it, --attach stays light
+
+snapshotFilePath = None
+if "--snapshot" in sys.argv[1:-1]:
+    optionIndex = sys.argv.index("--snapshot")
+    snapshotFilePath = sys.argv[optionIndex + 1]
+    del sys.argv[optionIndex:optionIndex + 2]
+offlineQueueDirectory = None
+if "--offline-queue" in sys.argv[1:-1]:
+    optionIndex = sys.argv.index("--offline-queue")
+    offlineQueueDirectory = sys.argv[optionIndex + 1]
+    del sys.argv[optionIndex:optionIndex + 2]
+offlineQueueMaximumBytes = 1024*1024
+if "--offline-queue-bytes" in sys.argv[1:-1]:
+    optionIndex = sys.argv.index("--offline-queue-bytes")
+    offlineQueueMaximumBytes = int(sys.argv[optionIndex + 1])
+    del sys.argv[optionIndex:optionIndex + 2]
+
+
+def _serveClient(srcTransport, srcSnapshotFilePath=None, srcOfflineQueueDirectory=None):
+    from runtimeHub import runtimeHub
+    try:
+        runtimeHub("AWSIoTMQTTArduinoHub", "../log/", srcTransport, srcSnapshotFilePath, srcOfflineQueueDirectory, offlineQueueMaximumBytes).run()
+    finally:
+        srcTransport.close()
+
+
+def _serveListener(srcListener):
+    try:
+        while True:
+            clientThread = threading.Thread(target=_serveClient, args=[srcListener.acceptTransport()])
+            clientThread.daemon = True
+            clientThread.start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srcListener.close()
+
+
+def _serveDaemon(srcListener):
+    from runtimeHub import runtimeHub
+    daemonHub = None
+    try:
+        while True:
+            transport = srcListener.acceptTransport()
+            try:
+                if daemonHub is None:
+                    daemonHub = runtimeHub("AWSIoTMQTTArduinoHub", "../log/", transport, snapshotFilePath, offlineQueueDirectory, offlineQueueMaximumBytes)
+                else:
+                    daemonHub.attachTransport(transport)
+                daemonHub.run()
+            finally:
+                transport.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srcListener.close()
+
+
+def _attachDaemon(srcPath):
+    from comm.socketRelay import socketRelay
+    relay = socketRelay(srcPath, sys.stdin.fileno(), sys.stdout.fileno())
+    try:
+        relay.connect()
+    except Exception:
+        # No daemon yet, start one in its own session so that it outlives this process
+        devNull = open(os.devnull, "r+b")
+        daemonArgumentList = [sys.executable, os.path.abspath(sys.argv[0]), "--daemon", srcPath]
+        if snapshotFilePath is not None:
+            daemonArgumentList += ["--snapshot", os.path.abspath(snapshotFilePath)]
+        if offlineQueueDirectory is not None:
+            daemonArgumentList += ["--offline-queue", os.path.abspath(offlineQueueDirectory), "--offline-queue-bytes", str(offlineQueueMaximumBytes)]
+        subprocess.Popen(daemonArgumentList, stdin=devNull, stdout=devNull, stderr=devNull, close_fds=True, preexec_fn=os.setsid)
+        relay.connect(10)
+    relay.run()
+
+
+if len(sys.argv) == 1:
+    from runtimeHub import runtimeHub
+    AWSIoTMQTTArduinoPyHub = runtimeHub("AWSIoTMQTTArduinoHub", "../log/", None, snapshotFilePath, offlineQueueDirectory, offlineQueueMaximumBytes)
+    AWSIoTMQTTArduinoPyHub.run()
+elif sys.argv[1] == "--attach" and len(sys.argv) == 3:
+    _attachDaemon(sys.argv[2])
+elif sys.argv[1] == "--tty" and len(sys.argv) == 3:
+    from comm.streamTransport import ttyTransport
+    _serveClient(ttyTransport(sys.argv[2]), snapshotFilePath, offlineQueueDirectory)
+elif sys.argv[1] == "--pty":
+    from comm.streamTransport import ptyTransport
+    transport = ptyTransport()
+    sys.stderr.write(transport.getSlaveName() + "\n")
+    _serveClient(transport, snapshotFilePath, offlineQueueDirectory)
+elif sys.argv[1] == "--unix" and len(sys.argv) == 3:
+    from comm.streamTransport import socketListener
+    _serveListener(socketListener(sys.argv[2]))
+elif sys.argv[1] == "--tcp" and len(sys.argv) == 3:
+    from comm.streamTransport import socketListener
+    host, port = sys.argv[2].rsplit(":", 1)
+    _serveListener(socketListener((host, int(port))))
+elif sys.argv[1] == "--daemon" and len(sys.argv) == 3:
+    from comm.streamTransport import socketListener
+    _serveDaemon(socketListener(sys.argv[2]))
+else:
+    sys.stderr.write("Usage: python run.py [--tty <device> | --pty | --unix <path> | --tcp <host>:<port> | --daemon <path> | --attach <path>] [--snapshot <file>] [--offline-queue <directory> [--offline-queue-bytes <bytes>]]\n")
+    sys.exit(1)
@@ -15,53 +15,41 @@
  */
  '''
 
+import os
 import sys
+import threading
 sys.path.append("../lib/")
 from util.logManager import logManager
 from util.jsonManager import jsonManager
-from protocol.mqttCore import *
+from util.ticketExecutor import ticketExecutor
+from util.runtimeSnapshot import runtimeSnapshot
 from exception.AWSIoTExceptions import *
 from comm.serialCommunicationServer import *
-from shadow.deviceShadow import *
-from shadow.shadowManager import *
-from command.AWSIoTCommand import *
-from command.commandConnect import *
-from command.commandDisconnect import *
-from command.commandConfig import *
-from command.commandPublish import *
-from command.commandSubscribe import *
-from command.commandUnsubscribe import *
-from command.commandShadowGet import *
-from command.commandShadowDelete import *
-from command.commandShadowUpdate import *
-from command.commandShadowRegisterDeltaCallback import *
-from command.commandShadowUnregisterDeltaCallback import *
-from command.commandYield import *
-from command.commandLockSize import *
-from command.commandJSONKeyVal import *
-from command.commandSetBackoffTiming import *
-from command.commandSetOfflinePublishQueueing import *
-from command.commandSetDrainingIntervalSecond import *
-from protocol.paho.client import *
+from comm.yieldScheduler import *
+from shadow.shadowTokenRegistry import *
+from command import AWSIoTCommand
+from command.commandRegistry import *
 # import traceback
+# mqttCore (with paho and ssl), the shadow modules and each command module are imported the first time they are needed,
+# so that the runtime is ready for the sketch without paying for what it never requests
 
 
 # Object for each MQTT subscription to hold the sketch info (slot #)
 class _mqttSubscribeUnit:
     _topicName = None
     _sketchSlotNumber = -1
-    _formatPayloadForYield = None
+    _qos = 0
     _serialCommunicationServerHub = None
 
-    def __init__(self, srcFormatPayloadForYieldFunctionPointer):
-        self._formatPayloadForYield = srcFormatPayloadForYieldFunctionPointer
-
     def setTopicName(self, srcTopicName):
         self._topicName = srcTopicName
 
     def setSketchSlotNumber(self, srcSketchSlotNumber):
         self._sketchSlotNumber = srcSketchSlotNumber
 
+    def setQoS(self, srcQoS):
+        self._qos = srcQoS
+
     def setSerialCommunicationServerHub(self, srcSerialCommunicationServerHub):
         self._serialCommunicationServerHub = srcSerialCommunicationServerHub
 
@@ -71,10 +59,13 @@ class _mqttSubscribeUnit:
     def getSketchSlotNumber(self):
         return self._sketchSlotNumber
 
+    def getQoS(self):
+        return self._qos
+
     def individualCallback(self, client, userdata, message):
         # Process the incoming non-shadow messages for a specific MQTT subscription
-        # Parse them into protocol-style chunks that can be transmitted over the serial
-        # and understood by Atmega
+        # Queue them for yield, the serialCommunicationServer divides them into protocol-style chunks
+        # that can be transmitted over the serial and understood by Atmega
         # Execution of this callback is ATOMIC (Guaranteed by paho)
         ####
         # Get the topic
@@ -82,211 +73,594 @@ class _mqttSubscribeUnit:
         # Find the sketch slot related to this topic name, ignore if not exist any more
         try:
             currentSketchSlotNumber = self._sketchSlotNumber
-            # Refactor the payload by adding protocol head and dividing into reasonable chunks
-            formattedPayload = self._formatPayloadForYield(str(message.payload), currentSketchSlotNumber)
             # Put it into the internal queue of serialCommunicationServer
-            self._serialCommunicationServerHub.writeToInternalYield(formattedPayload)
+            self._serialCommunicationServerHub.writeToInternalYield(currentSketchSlotNumber, str(message.payload), yieldScheduler.CLASS_SUBSCRIPTION)
             # This message will get to be transmitted in future Yield requests
         except KeyError:
             pass  # Ignore messages coming between callback and unsubscription
 
 
+# Everything that belongs to ONE MQTT client session, selected by its session id
+class _mqttSession:
+    _sessionID = None
+    _mqttCoreHub = None
+    _shadowManagerHub = None
+    _mqttSubscribeTable = None
+    _shadowSubscribeRecord = None
+    _shadowRegistrationTable = None
+    _shadowCallback = None  # Shadow callback bound to the delta records of this session
+    _isWarm = False  # Set up by a previous remote client, requests repeating that setup are answered from it
+    _setupRecord = None  # Protocol name -> parameter list of the last successful i/g/bf/pq/di/pr, for the snapshot
+
+    def __init__(self, srcSessionID):
+        self._sessionID = srcSessionID
+        self._setupRecord = dict()
+        self._mqttSubscribeTable = dict()
+        self._shadowSubscribeRecord = dict()
+        self._shadowRegistrationTable = dict()
+
+
+# Answers a request from state that is already there, without going to the broker
+# srcAction does the bookkeeping and returns the reply
+class _warmCommand(AWSIoTCommand.AWSIoTCommand):
+
+    def __init__(self, srcCommandProtocolName, srcSerialCommuteServer, srcAction):
+        self._commandProtocolName = srcCommandProtocolName
+        self._parameterList = []
+        self._serialCommServerHandler = srcSerialCommuteServer
+        self._action = srcAction
+
+    def execute(self):
+        self._serialCommServerHandler.writeToInternalProtocol(self._action())
+
+
+# Stands in for the serialCommunicationServer of a command executed for a ticket
+# Keeps the protocol reply for the ticket, everything else goes to the real serialCommunicationServer
+class _ticketReplyCollector:
+    _serialCommunicationServerHub = None
+    _reply = None
+
+    def __init__(self, srcSerialCommunicationServerHub):
+        self._serialCommunicationServerHub = srcSerialCommunicationServerHub
+
+    def writeToInternalProtocol(self, srcContent):
+        self._reply = srcContent
+
+    def getReply(self):
+        return self._reply
+
+    def __getattr__(self, srcName):
+        return getattr(self._serialCommunicationServerHub, srcName)
+
+
 class runtimeHub:
+    # The MQTT/Shadow objects and data structures below are those of the selected session
     # Objects
     _logManagerHub = None
     _serialCommunicationServerHub = None
     _mqttCoreHub = None  # Init when requested
     _shadowManagerHub = None  # Init when requested
     _jsonManagerHub = None
+    _ticketExecutorHub = None
+    _commandRegistryHub = None
+    _runtimeSnapshotHub = None  # Only with a snapshot file
+    _snapshotLock = None
+    _offlineQueueDirectory = None  # Only with a disk-backed offline publish queue, one subdirectory per client ID
+    _offlineQueueMaximumBytes = 0
+    # Sessions
+    _DEFAULT_SESSION_ID = "0"
+    _mqttSessionTable = None  # sessionID -> _mqttSession
+    _currentSession = None
     # Data structures
     # Keep the record of MQTT subscribe sketch info (slot #), in forms of individual object
     _mqttSubscribeTable = None
-    # Keep the record of shadow subscribe sketch info (slot #)
+    # Keep the record of shadow delta sketch info (slot #), by deviceShadow name
     _shadowSubscribeRecord = None
+    # Match shadow responses with the sketch info (slot #) of their requests, by token
+    _shadowTokenRegistryHub = None
     # Keep track of the deviceShadow instances for each individual deviceShadow name
     _shadowRegistrationTable = None
+    # Commands that write their own replies or control the runtime, not allowed in a batch
+    _nonBatchableCommands = ["x", "~", "b", "y", "yb", "j"]
+    # Commands that wait for the broker, run in the background for a ticket in async mode
+    _asyncCommands = ["c", "d", "s", "u", "sg", "su", "sd", "s_rd", "s_ud"]
+    # Commands that only wait for their own acknowledgement from the broker, several of them can be in flight at once
+    # as long as they are for different topics
+    _pipelinedCommands = ["s", "u"]
+    # Commands that change the snapshot state when they succeed, besides i and si
+    _snapshotCommands = ["g", "bf", "pq", "di", "pr", "s", "u", "s_rd", "s_ud"]
+    # mqttCore config commands, replayed from the snapshot
+    _setupCommands = ["g", "bf", "pq", "di", "pr"]
 
     #### Methods start here ####
-    def __init__(self, srcFileName, srcDirectory):
+    def __init__(self, srcFileName, srcDirectory, srcTransport=None, srcSnapshotFilePath=None, srcOfflineQueueDirectory=None, srcOfflineQueueMaximumBytes=0):
         # Init with basic interface for logging and serial communication
+        # srcTransport: where the remote client is, stdin/stdout (Bridge) if None
+        # srcSnapshotFilePath: where the runtime state is checkpointed and restored from, no snapshot if None
+        # srcOfflineQueueDirectory: where offline publish requests are queued on disk, in memory if None
+        # srcOfflineQueueMaximumBytes: byte budget of each client ID's queue on disk, 0 for no limit
         self._logManagerHub = logManager(srcFileName, srcDirectory)
         self._logManagerHub.disable()
-        self._serialCommunicationServerHub = serialCommunicationServer(self._logManagerHub)
+        self._serialCommunicationServerHub = serialCommunicationServer(self._logManagerHub, srcTransport)
         self._serialCommunicationServerHub.setAcceptTimeout(10)
         self._serialCommunicationServerHub.setChunkSize(50)
+        self._serialCommunicationServerHub.setJSONChunkSize(50)
+        self._serialCommunicationServerHub.setYieldQueueing(0, 1024*1024, 0, 0)  # Default yield queue is bounded to 1 MB of payloads, dropping the oldest
         self._jsonManagerHub = jsonManager(512*3)  # Default history limits is set to be 512*3, 512 for accepted, 512 for rejected and 512 for deltas
-        self._mqttSubscribeTable = dict()
-        self._shadowSubscribeRecord = dict()
-        self._shadowRegistrationTable = dict()
+        self._shadowTokenRegistryHub = shadowTokenRegistry(self._deliverShadowResponse)
+        # While waiting for the sketch, drop shadow responses and registrations that will never be paired
+        self._serialCommunicationServerHub.setHousekeepingInterval(1)
+        self._serialCommunicationServerHub.addHousekeepingTask(self._shadowTokenRegistryHub.sweepOrphans)
+        self._mqttSessionTable = dict()
+        self._ticketExecutorHub = ticketExecutor(self._ticketCallback)
+        self._commandRegistryHub = commandRegistry()
+        self._offlineQueueDirectory = srcOfflineQueueDirectory
+        self._offlineQueueMaximumBytes = srcOfflineQueueMaximumBytes
+        self._registerCommands()
+        self._selectSession(self._DEFAULT_SESSION_ID)
+        if srcSnapshotFilePath is not None:
+            self._runtimeSnapshotHub = runtimeSnapshot(srcSnapshotFilePath)
+            self._snapshotLock = threading.Lock()
+            self._restoreSnapshot()
+
+    def _registerCommands(self):
+        # Protocol name -> command module and the factory that builds its command with the objects it works on
+        # Numbers of parameters, opcodes and reusability are declared by each command class
+        registry = self._commandRegistryHub
+        server = self._serialCommunicationServerHub
+        # MQTT/Shadow init
+        registry.register("i", self._initMQTTCore, srcOpcode=0x80)
+        registry.register("si", self._initDeviceShadow, srcOpcode=0x87)
+        # MQTT
+        registry.registerModule("g", "commandConfig", lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList, server, self._mqttCoreHub))
+        registry.registerModule("c", "commandConnect", self._newConnect)
+        registry.registerModule("d", "commandDisconnect", self._newDisconnect)
+        registry.registerModule("p", "commandPublish", lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList, server, self._mqttCoreHub))
+        registry.registerModule("s", "commandSubscribe", self._newSubscribe)
+        registry.registerModule("u", "commandUnsubscribe", lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList, server, self._mqttCoreHub, self._mqttSubscribeTable))
+        # Shadow
+        registry.registerModule("sg", "commandShadowGet", lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList + [self._currentSession._shadowCallback], server, self._shadowRegistrationTable, self._shadowTokenRegistryHub))
+        registry.registerModule("su", "commandShadowUpdate", lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList + [self._currentSession._shadowCallback], server, self._shadowRegistrationTable, self._shadowTokenRegistryHub))
+        registry.registerModule("sd", "commandShadowDelete", lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList + [self._currentSession._shadowCallback], server, self._shadowRegistrationTable, self._shadowTokenRegistryHub))
+        registry.registerModule("s_rd", "commandShadowRegisterDeltaCallback", self._newShadowRegisterDeltaCallback)
+        registry.registerModule("s_ud", "commandShadowUnregisterDeltaCallback", lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList, server, self._shadowRegistrationTable, self._shadowSubscribeRecord))
+        # Yield and JSON retrieve
+        for protocolName, commandModuleName in [("z", "commandLockSize"), ("y", "commandYield"), ("yb", "commandYieldBurst")]:
+            registry.registerModule(protocolName, commandModuleName, lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList, server))
+        registry.registerModule("j", "commandJSONKeyVal", lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList, server, self._jsonManagerHub))
+        # Runtime config
+        for protocolName, commandModuleName in [("bf", "commandSetBackoffTiming"), ("pq", "commandSetOfflinePublishQueueing"), ("di", "commandSetDrainingIntervalSecond"), ("pr", "commandSetPublishRateLimit")]:
+            registry.registerModule(protocolName, commandModuleName, lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList, server, self._mqttCoreHub))
+        for protocolName, commandModuleName in [("bm", "commandSetBinaryMode"), ("yp", "commandSetYieldPriority"), ("yq", "commandSetYieldQueueing"), ("cs", "commandSetChunkSize"), ("ye", "commandSetYieldEncoding")]:
+            registry.registerModule(protocolName, commandModuleName, lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList, server))
+        registry.registerModule("am", "commandSetAsyncMode", lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList, server, self._ticketExecutorHub))
+        # Session select
+        registry.registerModule("ss", "commandSelectSession", lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList, server, self._selectSession, self.getSessionCount))
+        # Reattach to the state left by a previous remote client
+        registry.register("ra", lambda srcParameterList: _warmCommand("ra", server, self._reattachReply), [0], True, 0x9C)
+        # Batch of commands
+        registry.registerModule("b", "commandBatch", lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList, server))
+        # Exit the runtimeHub
+        registry.register("~", lambda srcParameterList: AWSIoTCommand.AWSIoTCommand("~"))
+        # Binary frames carry the opcodes declared above, collected when the sketch switches binary mode on
+        server.setOpcodeSource(registry.getOpcodeTable)
+
+    def _initMQTTCore(self, srcParameterList):
+        # <clientID> <cleanSession> <protocol> <useWebsocket>
+        retCommand = AWSIoTCommand.AWSIoTCommand("i")
+        if len(srcParameterList) == 4 and self._currentSession._isWarm and self._mqttCoreHub.getClientID() == srcParameterList[0]:
+            pass  # Keep the mqttCore, its connection and subscriptions
+        elif len(srcParameterList) == 4:
+            from protocol.mqttCore import mqttCore
+            from protocol.paho.client import MQTTv31, MQTTv311
+            clientID = srcParameterList[0]
+            cleanSession = srcParameterList[1] == "1"
+            protocol = MQTTv31
+            if srcParameterList[2] == "4":
+                protocol = MQTTv311
+            useWebsocket = srcParameterList[3] == "1"
+            try:
+                if self._mqttCoreHub is not None:
+                    # Hand the segment files of its client ID over to the new mqttCore
+                    self._mqttCoreHub.closeOfflinePublishQueue()
+                self._mqttCoreHub = mqttCore(clientID, cleanSession, protocol, self._logManagerHub, useWebsocket)
+                self._mqttCoreHub.setConnectDisconnectTimeoutSecond(10)
+                self._mqttCoreHub.setMQTTOperationTimeoutSecond(5)
+                self._openOfflineQueue(clientID)
+                self._currentSession._mqttCoreHub = self._mqttCoreHub
+                self._currentSession._isWarm = False
+                self._currentSession._setupRecord = {"i": list(srcParameterList)}
+                # Kept commands still hold the previous mqttCore
+                self._commandRegistryHub.resetCommands()
+            except TypeError:
+                retCommand.setInitSuccess(False)  # Error in Init, set flag
+        else:
+            retCommand.setInitSuccess(False)  # Error in obtain parameters for Init
+        return retCommand
+
+    def _openOfflineQueue(self, srcClientID):
+        # Publish requests queued on disk by a previous run with the same client ID are picked up here
+        if self._offlineQueueDirectory is None:
+            return
+        queueDirectory = os.path.join(self._offlineQueueDirectory, "".join([character if character.isalnum() or character in "-_." else "_" for character in srcClientID]) or "_")
+        try:
+            self._mqttCoreHub.setOfflinePublishQueueDirectory(queueDirectory, self._offlineQueueMaximumBytes)
+        except (IOError, OSError) as e:
+            self._logManagerHub.writeLog("Offline publish queue stays in memory, " + queueDirectory + " failed: " + str(e))
+
+    def _initDeviceShadow(self, srcParameterList):
+        # <shadowName> <isPersistentSubscribe>
+        retCommand = AWSIoTCommand.AWSIoTCommand("si")
+        if self._mqttCoreHub is None:
+            # Should have init a mqttCore and got it connected
+            retCommand.setInitSuccess(False)
+        else:
+            from shadow.shadowManager import shadowManager
+            from shadow.deviceShadow import deviceShadow
+            # Init the shadowManager if needed
+            if self._shadowManagerHub is None:
+                self._shadowManagerHub = shadowManager(self._mqttCoreHub)
+                self._currentSession._shadowManagerHub = self._shadowManagerHub
+            # Now register the requested deviceShadow name
+            if len(srcParameterList) == 2 and self._currentSession._isWarm and srcParameterList[0] in self._shadowRegistrationTable:
+                pass  # Keep the deviceShadow, its subscriptions and delta callback
+            elif len(srcParameterList) == 2:
+                srcShadowName = srcParameterList[0]
+                srcIsPersistentSubscribe = srcParameterList[1] == "1"
+                try:
+                    newDeviceShadow = deviceShadow(srcShadowName, srcIsPersistentSubscribe, self._shadowManagerHub)
+                    # Now update the registration table
+                    self._shadowRegistrationTable[srcShadowName] = newDeviceShadow
+                except TypeError:
+                    retCommand.setInitSuccess(False)
+            else:
+                retCommand.setInitSuccess(False)
+        return retCommand
+
+    def _newConnect(self, srcCommandClass, srcParameterList):
+        if self._currentSession._isWarm and self._mqttCoreHub.isConnected():
+            return _warmCommand("c", self._serialCommunicationServerHub, lambda: "C T")
+        return srcCommandClass(srcParameterList, self._serialCommunicationServerHub, self._mqttCoreHub)
+
+    def _newDisconnect(self, srcCommandClass, srcParameterList):
+        self._currentSession._isWarm = False
+        return srcCommandClass(srcParameterList, self._serialCommunicationServerHub, self._mqttCoreHub)
+
+    def _rebindSketchSlot(self, srcSketchSlotNumber, srcCoalescing, srcRebind):
+        # Point an existing subscription/delta callback to the sketch slot the reattached sketch gave it
+        try:
+            srcRebind(int(srcSketchSlotNumber))
+            self._serialCommunicationServerHub.setYieldCoalescing(int(srcSketchSlotNumber), srcCoalescing)
+            return True
+        except ValueError:
+            return False
+
+    def _newSubscribe(self, srcCommandClass, srcParameterList):
+        # <topic> <qos> <ino_id> [<coalesce>]
+        if self._currentSession._isWarm and len(srcParameterList) in [3, 4]:
+            currentMQTTSubscribeUnit = self._mqttSubscribeTable.get(srcParameterList[0])
+            if currentMQTTSubscribeUnit is not None and str(currentMQTTSubscribeUnit.getQoS()) == srcParameterList[1]:
+                isCoalescing = len(srcParameterList) == 4 and srcParameterList[3] == "1"
+                return _warmCommand("s", self._serialCommunicationServerHub, lambda: "S T" if self._rebindSketchSlot(srcParameterList[2], isCoalescing, currentMQTTSubscribeUnit.setSketchSlotNumber) else "SFF: " + "Unknown error.")
+        # Each subscription needs an individual object to hold its sketch slot
+        return srcCommandClass(srcParameterList + [_mqttSubscribeUnit()], self._serialCommunicationServerHub, self._mqttCoreHub, self._mqttSubscribeTable)
+
+    def _newShadowRegisterDeltaCallback(self, srcCommandClass, srcParameterList):
+        # <deviceShadowName> <ino_id> [<coalesce>]
+        if self._currentSession._isWarm and len(srcParameterList) in [2, 3] and srcParameterList[0] in self._shadowSubscribeRecord:
+            currentShadowSubscribeRecord = self._shadowSubscribeRecord
+            isCoalescing = len(srcParameterList) == 3 and srcParameterList[2] == "1"
+
+            def rebindDelta(srcSketchSlotNumber):
+                currentShadowSubscribeRecord[srcParameterList[0]] = srcSketchSlotNumber
+            return _warmCommand("s_rd", self._serialCommunicationServerHub, lambda: "S_RD T" if self._rebindSketchSlot(srcParameterList[1], isCoalescing, rebindDelta) else "S_RDFF: " + "Unknown error.")
+        return srcCommandClass(srcParameterList + [self._currentSession._shadowCallback], self._serialCommunicationServerHub, self._shadowRegistrationTable, self._shadowSubscribeRecord)
+
+    def _reattachReply(self):
+        # RA T <connected> <numberOfSubscriptions> <numberOfDeviceShadows> for the selected session, RA F if there is nothing to reattach to
+        if not self._currentSession._isWarm:
+            return "RA F"
+        isConnected = self._mqttCoreHub.isConnected()
+        return "RA T " + str(int(isConnected)) + " " + str(len(self._mqttSubscribeTable)) + " " + str(len(self._shadowRegistrationTable))
+
+    def attachTransport(self, srcTransport):
+        # Serve a new remote client (daemon mode), keeping MQTT connections, subscriptions and shadow registrations
+        # Settings of the previous remote client are reset, the sketch gives them again in its setup
+        self._serialCommunicationServerHub.setChunkSize(50)
+        self._serialCommunicationServerHub.setJSONChunkSize(50)
+        self._serialCommunicationServerHub.attachTransport(srcTransport)
+        self._ticketExecutorHub.setAsyncMode(False, -1)
+        for currentSession in self._mqttSessionTable.itervalues():
+            currentSession._isWarm = currentSession._mqttCoreHub is not None
+        self._selectSession(self._DEFAULT_SESSION_ID)
+
+    def _selectSession(self, srcSessionID):
+        # Switch the MQTT/Shadow objects and data structures over to this session, a new one is made if needed
+        currentSession = self._mqttSessionTable.get(srcSessionID)
+        if currentSession is None:
+            currentSession = _mqttSession(srcSessionID)
+            currentShadowSubscribeRecord = currentSession._shadowSubscribeRecord
+            currentSession._shadowCallback = lambda srcPayload, srcCurrentType, srcCurrentToken: self._shadowCallback(srcPayload, srcCurrentType, srcCurrentToken, currentShadowSubscribeRecord)
+            self._mqttSessionTable[srcSessionID] = currentSession
+        self._currentSession = currentSession
+        self._mqttCoreHub = currentSession._mqttCoreHub
+        self._shadowManagerHub = currentSession._shadowManagerHub
+        self._mqttSubscribeTable = currentSession._mqttSubscribeTable
+        self._shadowSubscribeRecord = currentSession._shadowSubscribeRecord
+        self._shadowRegistrationTable = currentSession._shadowRegistrationTable
+        # Kept commands still hold the objects of the previous session
+        self._commandRegistryHub.resetCommands()
+
+    def getSessionCount(self):
+        return len(self._mqttSessionTable)
+
+    def getCurrentSessionID(self):
+        return self._currentSession._sessionID
+
+    def getCommandRegistry(self):
+        # Register extra commands here, they are dispatched like the built-in ones
+        return self._commandRegistryHub
+
+    def getSerialCommunicationServer(self):
+        return self._serialCommunicationServerHub
 
     def _findCommand(self, srcProtocolMessage):
         # Whatever comes out of this method should be an AWSIoTCommand
         # Invalid command will have a protocol name of "x"
         # Never raise exceptions
         retCommand = None
-        if srcProtocolMessage is None:
-            retCommand = AWSIoTCommand.AWSIoTCommand()
-        else:
-            # MQTT init
-            if srcProtocolMessage[0] == "i":
-                retCommand = AWSIoTCommand.AWSIoTCommand("i")
-                if len(srcProtocolMessage[1:]) == 4:
-                    clientID = srcProtocolMessage[1]
-                    cleanSession = srcProtocolMessage[2] == "1"
-                    protocol = MQTTv31
-                    if srcProtocolMessage[3] == "4":
-                        protocol = MQTTv311
-                    useWebsocket = srcProtocolMessage[4] == "1"
-                    try:
-                        self._mqttCoreHub = mqttCore(clientID, cleanSession, protocol, self._logManagerHub, useWebsocket)
-                        self._mqttCoreHub.setConnectDisconnectTimeoutSecond(10)
-                        self._mqttCoreHub.setMQTTOperationTimeoutSecond(5)
-                    except TypeError:
-                        retCommand.setInitSuccess(False)  # Error in Init, set flag 
-                else:
-                    retCommand.setInitSuccess(False)  # Error in obtain parameters for Init
-            # Config
-            elif srcProtocolMessage[0] == "g":
-                retCommand = commandConfig(srcProtocolMessage[1:], self._serialCommunicationServerHub, self._mqttCoreHub)
-            # Connect
-            elif srcProtocolMessage[0] == "c":
-                retCommand = commandConnect(srcProtocolMessage[1:], self._serialCommunicationServerHub, self._mqttCoreHub)
-            # Disconnect
-            elif srcProtocolMessage[0] == "d":
-                retCommand = commandDisconnect(srcProtocolMessage[1:], self._serialCommunicationServerHub, self._mqttCoreHub)
-            # Publish
-            elif srcProtocolMessage[0] == "p":
-                retCommand = commandPublish(srcProtocolMessage[1:], self._serialCommunicationServerHub, self._mqttCoreHub)
-            # Subscribe
-            elif srcProtocolMessage[0] == "s":
-                newMQTTSubscribeUnit = _mqttSubscribeUnit(self._formatPayloadForYield)  # Init an individual object for this subscribe
-                newSrcProtocolMessage = srcProtocolMessage
-                newSrcProtocolMessage.append(newMQTTSubscribeUnit)
-                retCommand = commandSubscribe(newSrcProtocolMessage[1:], self._serialCommunicationServerHub, self._mqttCoreHub, self._mqttSubscribeTable)
-            # Unsubscribe
-            elif srcProtocolMessage[0] == "u":
-                retCommand = commandUnsubscribe(srcProtocolMessage[1:], self._serialCommunicationServerHub, self._mqttCoreHub, self._mqttSubscribeTable)
-            # Shadow init
-            elif srcProtocolMessage[0] == "si":
-                retCommand = AWSIoTCommand.AWSIoTCommand("si")
-                if self._mqttCoreHub is None:
-                    # Should have init a mqttCore and got it connected
-                    retCommand.setInitSuccess(False)
-                else:
-                    # Init the shadowManager if needed
-                    if self._shadowManagerHub is None:
-                        self._shadowManagerHub = shadowManager(self._mqttCoreHub)
-                    # Now register the requested deviceShadow name
-                    if len(srcProtocolMessage[1:]) == 2:
-                        srcShadowName = srcProtocolMessage[1]
-                        srcIsPersistentSubscribe = srcProtocolMessage[2] == "1"
-                        try:
-                            newDeviceShadow = deviceShadow(srcShadowName, srcIsPersistentSubscribe, self._shadowManagerHub)
-                            # Now update the registration table
-                            self._shadowRegistrationTable[srcShadowName] = newDeviceShadow
-                        except TypeError:
-                            retCommand.setInitSuccess(False)
-                    else:
-                        retCommand.setInitSuccess(False)
-            # Shadow get
-            elif srcProtocolMessage[0] == "sg":
-                newSrcProtocolMessage = srcProtocolMessage
-                newSrcProtocolMessage.append(self._shadowCallback)
-                retCommand = commandShadowGet(newSrcProtocolMessage[1:], self._serialCommunicationServerHub, self._shadowRegistrationTable, self._shadowSubscribeRecord)
-            # Shadow update
-            elif srcProtocolMessage[0] == "su":
-                newSrcProtocolMessage = srcProtocolMessage
-                newSrcProtocolMessage.append(self._shadowCallback)
-                retCommand = commandShadowUpdate(newSrcProtocolMessage[1:], self._serialCommunicationServerHub, self._shadowRegistrationTable, self._shadowSubscribeRecord)
-            # Shadow delete
-            elif srcProtocolMessage[0] == "sd":
-                newSrcProtocolMessage = srcProtocolMessage
-                newSrcProtocolMessage.append(self._shadowCallback)
-                retCommand = commandShadowDelete(newSrcProtocolMessage[1:], self._serialCommunicationServerHub, self._shadowRegistrationTable, self._shadowSubscribeRecord)
-            # Shadow register delta
-            elif srcProtocolMessage[0] == "s_rd":
-                newSrcProtocolMessage = srcProtocolMessage
-                newSrcProtocolMessage.append(self._shadowCallback)
-                retCommand = commandShadowRegisterDeltaCallback(newSrcProtocolMessage[1:], self._serialCommunicationServerHub, self._shadowRegistrationTable, self._shadowSubscribeRecord)
-            # Shadow unregister delta
-            elif srcProtocolMessage[0] == "s_ud":
-                retCommand = commandShadowUnregisterDeltaCallback(srcProtocolMessage[1:], self._serialCommunicationServerHub, self._shadowRegistrationTable, self._shadowSubscribeRecord)
-            # Lock message size
-            elif srcProtocolMessage[0] == "z":
-                retCommand = commandLockSize(srcProtocolMessage[1:], self._serialCommunicationServerHub)
-            # Oh the GREAT yield...
-            elif srcProtocolMessage[0] == "y":
-                retCommand = commandYield(srcProtocolMessage[1:], self._serialCommunicationServerHub)
-            # JSON Key-Value Retrieve
-            elif srcProtocolMessage[0] == 'j':
-                retCommand = commandJSONKeyVal(srcProtocolMessage[1:], self._serialCommunicationServerHub, self._jsonManagerHub)
-            # Backoff Timing Config
-            elif srcProtocolMessage[0] == 'bf':
-                retCommand = commandSetBackoffTiming(srcProtocolMessage[1:], self._serialCommunicationServerHub, self._mqttCoreHub)
-            # Offline Publish Queue Config
-            elif srcProtocolMessage[0] == 'pq':
-                retCommand = commandSetOfflinePublishQueueing(srcProtocolMessage[1:], self._serialCommunicationServerHub, self._mqttCoreHub)
-            # Draining Interval Config
-            elif srcProtocolMessage[0] == 'di':
-                retCommand = commandSetDrainingIntervalSecond(srcProtocolMessage[1:], self._serialCommunicationServerHub, self._mqttCoreHub)
-            # Exit the runtimeHub
-            elif srcProtocolMessage[0] == "~":
-                retCommand = AWSIoTCommand.AWSIoTCommand("~")
+        if srcProtocolMessage is not None:
+            retCommand = self._commandRegistryHub.findCommand(srcProtocolMessage)
+        if retCommand is None:
             # Unsupported protocol
-            else:
-                retCommand = AWSIoTCommand.AWSIoTCommand()
+            retCommand = AWSIoTCommand.AWSIoTCommand()
         return retCommand
 
-    def _formatPayloadForYield(self, srcPayload, srcSketchSlotNumber):
-        # Generate the formatted payload for Yield requests
-        ####
-        # Generate the meta data
-        hasMore = 1
-        metaData = "Y " + str(srcSketchSlotNumber) + " " + str(hasMore) + " "
-        # Get configured chunk size
-        configuredChunkSize = self._serialCommunicationServerHub.getChunkSize()
-        # Divide the payload into smaller chunks plus  meta data
-        messageChunkSize = configuredChunkSize - len(metaData)
-        chunks = [metaData + srcPayload[i:i+messageChunkSize] for i in range(0, len(srcPayload), messageChunkSize)]
-        # Change hasMore flag for the last chunk
-        chunks[len(chunks)-1] = "Y " + str(srcSketchSlotNumber) + " 0 " + chunks[len(chunks)-1][len(metaData):]
-        # Concat them together
-        return "".join(chunks)        
-
     # Callbacks
-    def _shadowCallback(self, srcPayload, srcCurrentType, srcCurrentToken):
+    def _shadowCallback(self, srcPayload, srcCurrentType, srcCurrentToken, srcShadowSubscribeRecord):
         # Process the incoming shadow messages
         # Store JSON payload into jsonManager and pass the handler over
-        # Parse the handler into protocol-style chunks that can be transimitted over the serial
-        # and understood by Atmega
+        # Queue the handler for yield, it will be divided into protocol-style chunks that can be
+        # transimitted over the serial and understood by Atmega
         # Execution of this callback is ATOMIC for each shadow action in ONE deviceShadow (Guaranteed by SDK)
         # All token/version controls are performed at deviceShadow level
         # Whatever comes in here should be delivered across serial, with care, of course
         ####
         # srcCurrentType: accepted//rejected//<deviceShadowName>/delta
+        # srcShadowSubscribeRecord: delta records of the session this deviceShadow belongs to
         currentJSONHandler = self._jsonManagerHub.storeNewJSON(srcPayload, srcCurrentType)
-        currentSketchSlotNumber = -1
-        try:
-            # Wait util internal data structure is updated
-            if srcCurrentToken is not None:
-                while srcCurrentToken not in self._shadowSubscribeRecord.keys():
-                    pass
-            # accepted//rejected: Find the sketch slot number by token
-            if srcCurrentType in ["accepted", "rejected", "timeout"]:
-                currentSketchSlotNumber = self._shadowSubscribeRecord[srcCurrentToken]
-                del self._shadowSubscribeRecord[srcCurrentToken]  # Retrieve the memory in dict
-            # delta/<deviceShadowName>: Find the sketch slot number by deviceShadowName
-            else:
+        # accepted//rejected//timeout: Hand over to the token registry, it delivers once the sketch slot is recorded
+        # No waiting here, the request side may still be on its way to record the slot for this token
+        if srcCurrentType in ["accepted", "rejected", "timeout"]:
+            currentMessageClass = yieldScheduler.CLASS_SHADOW_RESPONSE
+            if srcCurrentType == "timeout":
+                currentMessageClass = yieldScheduler.CLASS_TIMEOUT
+            self._shadowTokenRegistryHub.resolve(srcCurrentToken, (srcPayload, currentJSONHandler, currentMessageClass))
+        # delta/<deviceShadowName>: Find the sketch slot number by deviceShadowName
+        else:
+            try:
                 fragments = srcCurrentType.split("/")
                 deviceShadowNameForDelta = fragments[1]
-                currentSketchSlotNumber = self._shadowSubscribeRecord[deviceShadowNameForDelta]
-            # Refactor the JSONHandler by adding protocol head and dividing into reasonable chunks
-            formattedPayload = self._formatPayloadForYield(currentJSONHandler, currentSketchSlotNumber)
-            # Put it into the internal queue of the serialCommunicationServer
-            self._serialCommunicationServerHub.writeToInternalYield(formattedPayload)
-            # This message will get to be transmitted in future Yield requests
-        except KeyError as e:
-            pass  # Ignore messages coming between callback and unregister delta 
+                currentSketchSlotNumber = srcShadowSubscribeRecord[deviceShadowNameForDelta]
+                self._deliverShadowResponse(currentSketchSlotNumber, (srcPayload, currentJSONHandler, yieldScheduler.CLASS_DELTA))
+            except KeyError as e:
+                pass  # Ignore messages coming between callback and unregister delta
+
+    def _deliverShadowResponse(self, srcSketchSlotNumber, srcResponse):
+        # srcResponse: (payload, jsonManager handler, message class)
+        # Put it into the internal queue of the serialCommunicationServer
+        # Delta encoding slots take the document itself, only its changed fields are sent
+        currentPayload, currentJSONHandler, currentMessageClass = srcResponse
+        if self._serialCommunicationServerHub.isYieldDeltaEncoding(srcSketchSlotNumber) and currentMessageClass != yieldScheduler.CLASS_TIMEOUT:
+            self._serialCommunicationServerHub.writeToInternalYield(srcSketchSlotNumber, currentPayload, currentMessageClass)
+        else:
+            self._serialCommunicationServerHub.writeToInternalYield(srcSketchSlotNumber, currentJSONHandler, currentMessageClass)
+        # This message will get to be transmitted in future Yield requests
+
+    def _ticketCallback(self, srcTicketID, srcReply):
+        # Deliver the reply of a finished async command as a yield record on the completion slot
+        # <ticket> <reply>
+        if srcReply is None:
+            srcReply = "X F"
+        currentRecord = str(srcTicketID) + " " + srcReply
+        self._serialCommunicationServerHub.writeToInternalYield(self._ticketExecutorHub.getCompletionSlotNumber(), currentRecord, yieldScheduler.CLASS_TICKET)
+
+    def _executeTicket(self, srcCommand, srcSession=None):
+        # Runs in the ticketExecutor worker thread, returns the reply the command would have sent
+        # srcSession: the session the command was requested for, its snapshot state is updated on success
+        # The command can be a kept one, it gets the serialCommunicationServer back for the next request
+        currentReplyCollector = _ticketReplyCollector(self._serialCommunicationServerHub)
+        srcCommand.setSerialCommServerHandler(currentReplyCollector)
+        try:
+            srcCommand.execute()
+        finally:
+            srcCommand.setSerialCommServerHandler(self._serialCommunicationServerHub)
+        currentReply = currentReplyCollector.getReply()
+        if srcSession is not None:
+            self._recordOutcome(srcCommand, currentReply, srcSession)
+        return currentReply
+
+    def _submitTicket(self, srcCommand):
+        # Queue the command for the ticketExecutor and reply with its ticket right away
+        # <NAME> A <ticket>
+        currentSession = self._currentSession
+        currentPipelineKey = None
+        if srcCommand.getCommandProtocolName() in self._pipelinedCommands:
+            currentPipelineKey = self._getPipelineKey(srcCommand)
+        currentTicketID = self._ticketExecutorHub.submit(lambda: self._executeTicket(srcCommand, currentSession), currentPipelineKey)
+        self._serialCommunicationServerHub.writeToInternalProtocol(srcCommand.getCommandProtocolName().upper() + " A " + str(currentTicketID))
+
+    def _executeCommand(self, srcCommand):
+        # Execute ONE command and queue its reply as an internal protocol message
+        currentCommandProtocolName = srcCommand.getCommandProtocolName()
+        if currentCommandProtocolName == "i":  # MQTT init
+            if srcCommand.getInitSuccess():
+                self._serialCommunicationServerHub.writeToInternalProtocol("I T")
+                self._checkpoint()
+            else:
+                self._serialCommunicationServerHub.writeToInternalProtocol("I F")
+        elif currentCommandProtocolName == "si":  # Shadow init
+            if srcCommand.getInitSuccess():
+                self._serialCommunicationServerHub.writeToInternalProtocol("SI T")
+                self._checkpoint()
+            else:
+                self._serialCommunicationServerHub.writeToInternalProtocol("SI F")
+        elif currentCommandProtocolName in self._asyncCommands and self._ticketExecutorHub.isEnabled():
+            self._submitTicket(srcCommand)
+        elif currentCommandProtocolName in self._snapshotCommands and self._runtimeSnapshotHub is not None:
+            # Executed like a ticket to see whether it succeeded, then replied as usual
+            currentReply = self._executeTicket(srcCommand, self._currentSession)
+            if currentReply is not None:
+                self._serialCommunicationServerHub.writeToInternalProtocol(currentReply)
+        else:
+            srcCommand.execute()
+
+    # Snapshot
+    def _recordOutcome(self, srcCommand, srcReply, srcSession):
+        # Checkpoint what a successful command changed, failed ones leave the state as it was
+        currentCommandProtocolName = srcCommand.getCommandProtocolName()
+        if self._runtimeSnapshotHub is None or currentCommandProtocolName not in self._snapshotCommands:
+            return
+        # <NAME> T, or <NAME> <slot> for u/s_ud, failures come as <NAME><n>F: ...
+        if srcReply is None or not srcReply.startswith(currentCommandProtocolName.upper() + " "):
+            return
+        if currentCommandProtocolName in self._setupCommands:
+            srcSession._setupRecord[currentCommandProtocolName] = list(srcCommand.getParameterList())
+        self._checkpoint()
+
+    def _sessionState(self, srcSession):
+        # Plain values for the snapshot: setup commands, subscriptions, deviceShadows and delta slots of ONE session
+        currentServer = self._serialCommunicationServerHub
+        subscriptionList = []
+        for currentTopic, currentMQTTSubscribeUnit in srcSession._mqttSubscribeTable.items():
+            currentSketchSlotNumber = currentMQTTSubscribeUnit.getSketchSlotNumber()
+            subscriptionList.append([currentTopic, currentMQTTSubscribeUnit.getQoS(), currentSketchSlotNumber, currentServer.isYieldCoalescing(currentSketchSlotNumber)])
+        shadowList = []
+        for currentShadowName, currentDeviceShadow in srcSession._shadowRegistrationTable.items():
+            shadowList.append([currentShadowName, currentDeviceShadow.isPersistentSubscribe()])
+        deltaList = []
+        for currentShadowName, currentSketchSlotNumber in srcSession._shadowSubscribeRecord.items():
+            deltaList.append([currentShadowName, currentSketchSlotNumber, currentServer.isYieldCoalescing(currentSketchSlotNumber)])
+        return {"setup": dict(srcSession._setupRecord), "subscriptions": subscriptionList, "shadows": shadowList, "deltas": deltaList}
+
+    def _checkpoint(self):
+        # Write the state of every session with an mqttCore to the snapshot, nothing is written if it did not change
+        if self._runtimeSnapshotHub is None:
+            return
+        self._snapshotLock.acquire()
+        try:
+            currentState = dict()
+            for currentSessionID, currentSession in self._mqttSessionTable.items():
+                if currentSession._mqttCoreHub is not None and "i" in currentSession._setupRecord:
+                    currentState[currentSessionID] = self._sessionState(currentSession)
+            self._runtimeSnapshotHub.save({"sessions": currentState})
+        except (IOError, OSError) as e:
+            self._logManagerHub.writeLog("Failed to write the snapshot: " + str(e))
+        finally:
+            self._snapshotLock.release()
+
+    def _restoreSession(self, srcSessionState):
+        # Rebuild the selected session from its snapshot state without going to the broker
+        # Subscriptions and delta callbacks are sent together once the sketch connects
+        setupRecord = srcSessionState["setup"]
+        if not self._initMQTTCore(setupRecord["i"]).getInitSuccess():
+            return False
+        for currentCommandProtocolName in self._setupCommands:
+            if currentCommandProtocolName in setupRecord:
+                self._executeTicket(self._commandRegistryHub.createCommand([currentCommandProtocolName] + setupRecord[currentCommandProtocolName]))
+        self._currentSession._setupRecord = dict(setupRecord)
+        for currentTopic, currentQoS, currentSketchSlotNumber, isCoalescing in srcSessionState["subscriptions"]:
+            currentMQTTSubscribeUnit = _mqttSubscribeUnit()
+            currentMQTTSubscribeUnit.setTopicName(currentTopic)
+            currentMQTTSubscribeUnit.setQoS(currentQoS)
+            currentMQTTSubscribeUnit.setSketchSlotNumber(currentSketchSlotNumber)
+            currentMQTTSubscribeUnit.setSerialCommunicationServerHub(self._serialCommunicationServerHub)
+            self._serialCommunicationServerHub.setYieldCoalescing(currentSketchSlotNumber, isCoalescing)
+            self._mqttCoreHub.restoreSubscription(currentTopic, currentQoS, currentMQTTSubscribeUnit.individualCallback)
+            self._mqttSubscribeTable[currentTopic] = currentMQTTSubscribeUnit
+        for currentShadowName, isPersistentSubscribe in srcSessionState["shadows"]:
+            self._initDeviceShadow([currentShadowName, "1" if isPersistentSubscribe else "0"])
+        for currentShadowName, currentSketchSlotNumber, isCoalescing in srcSessionState["deltas"]:
+            currentDeviceShadow = self._shadowRegistrationTable.get(currentShadowName)
+            if currentDeviceShadow is not None:
+                currentDeviceShadow.restoreDeltaCallback(self._currentSession._shadowCallback)
+                self._shadowSubscribeRecord[currentShadowName] = currentSketchSlotNumber
+                self._serialCommunicationServerHub.setYieldCoalescing(currentSketchSlotNumber, isCoalescing)
+        # The sketch setup that follows is answered from the restored state
+        self._currentSession._isWarm = True
+        return True
+
+    def _restoreSnapshot(self):
+        # Take back every session of the last checkpoint, a session that cannot be restored starts clean
+        currentState = self._runtimeSnapshotHub.load()
+        if currentState is None:
+            return
+        for currentSessionID, currentSessionState in currentState.get("sessions", {}).items():
+            self._selectSession(currentSessionID)
+            try:
+                if not self._restoreSession(currentSessionState):
+                    self._logManagerHub.writeLog("Failed to restore session " + currentSessionID + " from the snapshot.")
+            except (KeyError, TypeError, ValueError) as e:
+                self._logManagerHub.writeLog("Invalid snapshot for session " + currentSessionID + ": " + str(e))
+        self._selectSession(self._DEFAULT_SESSION_ID)
+
+    def getSnapshotSaveCount(self):
+        # Number of checkpoints written since start, 0 without a snapshot file
+        if self._runtimeSnapshotHub is None:
+            return 0
+        return self._runtimeSnapshotHub.getSaveCount()
+
+    def _getPipelineKey(self, srcCommand):
+        # Subscribes/unsubscribes for the same topic must reach the broker in their order, the last one wins
+        currentParameterList = srcCommand.getParameterList()
+        if currentParameterList is None or len(currentParameterList) == 0:
+            return ""
+        return currentParameterList[0]
+
+    def _executePipelined(self, srcCommandList):
+        # Execute subscribes/unsubscribes for different topics side by side, so that they wait for their acknowledgements
+        # together. The ones for the same topic are executed one after another in their order.
+        # Returns their replies in request order
+        replyList = [None] * len(srcCommandList)
+        currentSession = self._currentSession
+        chainTable = dict()  # pipelineKey -> indexes of its commands, in order
+        for i in range(0, len(srcCommandList)):
+            chainTable.setdefault(self._getPipelineKey(srcCommandList[i]), []).append(i)
+
+        def executeChain(srcIndexList):
+            for currentIndex in srcIndexList:
+                replyList[currentIndex] = self._executeTicket(srcCommandList[currentIndex], currentSession)
+        if len(chainTable) == 1:
+            executeChain(chainTable.values()[0])
+        elif len(chainTable) > 1:
+            threadList = [threading.Thread(target=executeChain, args=[indexList]) for indexList in chainTable.values()]
+            for currentThread in threadList:
+                currentThread.start()
+            for currentThread in threadList:
+                currentThread.join()
+        return [currentReply if currentReply is not None else "X F" for currentReply in replyList]
+
+    def _executeBatch(self, srcBatchCommand):
+        # Execute the sub-commands in order and put their replies together into ONE reply
+        # Consecutive subscribes/unsubscribes are pipelined, unless they go to tickets in async mode
+        replyList = []
+        pipelinedCommandList = []
+        for subProtocolMessage in srcBatchCommand.getSubCommandList():
+            if len(subProtocolMessage) > 0 and subProtocolMessage[0] in self._pipelinedCommands and not self._ticketExecutorHub.isEnabled():
+                pipelinedCommandList.append(self._findCommand(subProtocolMessage))
+                continue
+            replyList += self._executePipelined(pipelinedCommandList)
+            pipelinedCommandList = []
+            currentCommand = self._findCommand(subProtocolMessage)
+            currentReply = None
+            if currentCommand.getCommandProtocolName() not in self._nonBatchableCommands:
+                self._executeCommand(currentCommand)
+                currentReply = self._serialCommunicationServerHub.takeInternalProtocol()
+            if currentReply is None:
+                currentReply = "X F"
+            replyList.append(currentReply)
+        replyList += self._executePipelined(pipelinedCommandList)
+        self._serialCommunicationServerHub.writeToInternalProtocol(srcBatchCommand.formatReply(replyList))
 
     # Runtime function
     def run(self):
@@ -301,26 +675,19 @@ class runtimeHub:
                 currentCommandProtocolName = currentCommand.getCommandProtocolName()
                 if currentCommandProtocolName == "x":
                     pass # Ignore invalid protocol command
-                if currentCommandProtocolName == "i":  # MQTT init
-                    if currentCommand.getInitSuccess():
-                        self._serialCommunicationServerHub.writeToInternalProtocol("I T")
-                    else:
-                        self._serialCommunicationServerHub.writeToInternalProtocol("I F")
-                    self._serialCommunicationServerHub.writeToExternalProtocol()
-                elif currentCommandProtocolName == "si":  # Shadow init
-                    if currentCommand.getInitSuccess():
-                        self._serialCommunicationServerHub.writeToInternalProtocol("SI T")
-                    else:
-                        self._serialCommunicationServerHub.writeToInternalProtocol("SI F")
-                    self._serialCommunicationServerHub.writeToExternalProtocol()
-                elif currentCommandProtocolName == "~":  # Exit
+                if currentCommandProtocolName == "~":  # Exit
                     break
-                else:  # Other command
+                else:  # Other command, including MQTT/Shadow init
                     # Execute the command
-                    currentCommand.execute()
+                    self._executeCommand(currentCommand)
                     # Write the result back through serial (detailed error code is transmitted here)
-                    if currentCommandProtocolName == "y":
+                    if currentCommandProtocolName == "b" and currentCommand.getSubCommandList() is not None:
+                        self._executeBatch(currentCommand)
+                        self._serialCommunicationServerHub.writeToExternalProtocol()
+                    elif currentCommandProtocolName == "y":
                         self._serialCommunicationServerHub.writeToExternalYield()
+                    elif currentCommandProtocolName == "yb" and currentCommand.getBufferSize() > 0:
+                        self._serialCommunicationServerHub.writeToExternalYieldBurst(currentCommand.getBufferSize())
                     elif currentCommandProtocolName == "j":
                         self._serialCommunicationServerHub.writeToExternalJSON()
                     else:
@@ -329,6 +696,11 @@ class runtimeHub:
             except AWSIoTExceptions.acceptTimeoutException as e:
                 self._logManagerHub.writeLog(str(e.message))
                 break
+            except EOFError as e:
+                self._logManagerHub.writeLog("Remote client closed the tunnel: " + str(e.message))
+                break
             except Exception as e:
                 self._logManagerHub.writeLog("Exception in run: " + str(type(e)) + str(e.message))
                 # traceback.print_exc(file, sys.stdout)
+        # Leave the terminal the way we found it
+        self._serialCommunicationServerHub.restoreTerminal()
@@ -0,0 +1,76 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Stands in for the paho client of mqttCore in runtimeHub tests, no broker needed.
+# SUBSCRIBE/UNSUBSCRIBE take effect on the simulated broker in the order they are sent and are acknowledged
+# from a timer thread after the round trip time, as the paho network thread would.
+
+import threading
+
+
+class simulatedBrokerClient:
+
+    def __init__(self, srcMQTTCore, srcRoundTripSecond):
+        self._mqttCore = srcMQTTCore
+        self._roundTripSecond = srcRoundTripSecond
+        self._lock = threading.Lock()
+        self._lastMid = 0
+        self._subscribedTopicSet = set()
+        self._requestList = []
+
+    def _nextMid(self, srcRequest):
+        self._lock.acquire()
+        self._lastMid += 1
+        ret = self._lastMid
+        self._requestList.append(srcRequest)
+        self._lock.release()
+        return ret
+
+    def getSubscribedTopics(self):
+        self._lock.acquire()
+        ret = set(self._subscribedTopicSet)
+        self._lock.release()
+        return ret
+
+    def getRequests(self):
+        # (s|u, topic) in the order they reached the broker
+        self._lock.acquire()
+        ret = list(self._requestList)
+        self._lock.release()
+        return ret
+
+    def message_callback_add(self, srcTopic, srcCallback):
+        pass
+
+    def message_callback_remove(self, srcTopic):
+        pass
+
+    def subscribe(self, srcTopic, srcQos):
+        mid = self._nextMid(("s", srcTopic))
+        self._lock.acquire()
+        self._subscribedTopicSet.add(srcTopic)
+        self._lock.release()
+        threading.Timer(self._roundTripSecond, self._mqttCore.on_subscribe, [self, None, mid, (srcQos,)]).start()
+        return (0, mid)
+
+    def unsubscribe(self, srcTopic):
+        mid = self._nextMid(("u", srcTopic))
+        self._lock.acquire()
+        self._subscribedTopicSet.discard(srcTopic)
+        self._lock.release()
+        threading.Timer(self._roundTripSecond, self._mqttCore.on_unsubscribe, [self, None, mid]).start()
+        return (0, mid)
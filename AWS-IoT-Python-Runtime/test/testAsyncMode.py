@@ -0,0 +1,123 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Async mode through runtimeHub: broker-bound commands reply with a ticket right away and their usual reply
+# comes back later as a yield record on the completion slot. mqttCore runs against simulatedBrokerClient.
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../runtime/")
+import os
+import time
+import unittest
+from runtimeHub import runtimeHub
+from comm.streamTransport import streamTransport
+from simulatedBrokerClient import simulatedBrokerClient
+
+
+class asyncModeTest(unittest.TestCase):
+
+    _TIMEOUT_SECOND = 5
+    _COMPLETION_SLOT = 7
+
+    def setUp(self):
+        self._readFileDescriptor, self._writeFileDescriptor = os.pipe()
+        self._hub = runtimeHub("asyncModeTest", "./", streamTransport(self._readFileDescriptor))
+        self._server = self._hub._serialCommunicationServerHub
+
+    def tearDown(self):
+        os.close(self._readFileDescriptor)
+        os.close(self._writeFileDescriptor)
+
+    def _connectBroker(self):
+        self.assertEqual("I T", self._execute(["i", "asyncModeTest", "1", "4", "0"]))
+        self._broker = simulatedBrokerClient(self._hub._mqttCoreHub, 0.02)
+        self._hub._mqttCoreHub._pahoClient = self._broker
+
+    def _execute(self, srcProtocolMessage):
+        self._hub._executeCommand(self._hub._findCommand(srcProtocolMessage))
+        return self._server.takeInternalProtocol()
+
+    def _waitForTickets(self):
+        startTime = time.time()
+        while self._hub._ticketExecutorHub.getPendingCount() > 0:
+            self.assertTrue(time.time() - startTime < self._TIMEOUT_SECOND)
+            time.sleep(0.001)
+        ret = []
+        scheduler = self._server.getYieldScheduler()
+        scheduler.lockSize()
+        record = scheduler.getLocked()
+        while record is not None:
+            self.assertEqual(self._COMPLETION_SLOT, record[0])
+            ret.append(record[1])
+            record = scheduler.getLocked()
+        return ret
+
+    def testTickets(self):
+        self._connectBroker()
+        self.assertEqual("AM T", self._execute(["am", "1", str(self._COMPLETION_SLOT)]))
+        self.assertEqual("S A 1", self._execute(["s", "topic/a", "1", "1"]))
+        self.assertEqual("S A 2", self._execute(["s", "topic/b", "1", "2"]))
+        # Other commands are still served while the subscriptions wait for the broker
+        self.assertEqual("YQ T", self._execute(["yq", "10", "0", "0", "0"]))
+        # Subscriptions run side by side, they complete in any order
+        self.assertEqual(["1 S T", "2 S T"], sorted(self._waitForTickets()))
+        self.assertEqual("U A 3", self._execute(["u", "topic/a"]))
+        self.assertEqual(["3 U 1"], self._waitForTickets())
+        self.assertEqual(("u", "topic/a"), self._broker.getRequests()[2])
+        self.assertEqual(set(["topic/b"]), self._broker.getSubscribedTopics())
+        self.assertEqual(["topic/b"], self._hub._mqttSubscribeTable.keys())
+
+    def testSameTopicTickets(self):
+        self._connectBroker()
+        self.assertEqual("AM T", self._execute(["am", "1", str(self._COMPLETION_SLOT)]))
+        self.assertEqual("S A 1", self._execute(["s", "topic/a", "1", "1"]))
+        self.assertEqual("U A 2", self._execute(["u", "topic/a"]))
+        self.assertEqual("S A 3", self._execute(["s", "topic/b", "1", "2"]))
+        self.assertEqual("S A 4", self._execute(["s", "topic/a", "1", "3"]))
+        self.assertEqual("U A 5", self._execute(["u", "topic/b"]))
+        completionList = self._waitForTickets()
+        self.assertEqual(["1 S T", "2 U 1", "3 S T", "4 S T", "5 U 2"], sorted(completionList))
+        # Completions for the same topic come in request order
+        self.assertTrue(completionList.index("1 S T") < completionList.index("2 U 1") < completionList.index("4 S T"))
+        self.assertEqual([("s", "topic/a"), ("u", "topic/a"), ("s", "topic/a")], [request for request in self._broker.getRequests() if request[1] == "topic/a"])
+        self.assertEqual(set(["topic/a"]), self._broker.getSubscribedTopics())
+        self.assertEqual(["topic/a"], self._hub._mqttSubscribeTable.keys())
+        self.assertEqual(3, self._hub._mqttSubscribeTable["topic/a"].getSketchSlotNumber())
+
+    def testFailedTicket(self):
+        # No MQTT init, the usual error reply comes with the ticket
+        self.assertEqual("AM T", self._execute(["am", "1", str(self._COMPLETION_SLOT)]))
+        self.assertEqual("C A 1", self._execute(["c", "60"]))
+        self.assertEqual(["1 C1F: No setup."], self._waitForTickets())
+
+    def testAsyncModeOff(self):
+        self._connectBroker()
+        self.assertEqual("AM T", self._execute(["am", "1", str(self._COMPLETION_SLOT)]))
+        self.assertEqual("AM T", self._execute(["am", "0", "0"]))
+        self.assertEqual("S T", self._execute(["s", "topic/a", "1", "1"]))
+        self.assertEqual([], self._waitForTickets())
+
+    def testInvalidCompletionSlot(self):
+        self.assertTrue(self._execute(["am", "1", "-1"]).startswith("AM3F: "))
+        self.assertTrue(self._execute(["am", "1", "slot"]).startswith("AM3F: "))
+        self.assertEqual("AM1F: No setup.", self._execute(["am", "1"]))
+        self.assertFalse(self._hub._ticketExecutorHub.isEnabled())
+
+
+if __name__ == "__main__":
+    unittest.main()
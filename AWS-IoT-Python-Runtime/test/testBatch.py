@@ -0,0 +1,101 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Batch envelope: "b" requests are parsed by commandBatch and executed by runtimeHub, the combined
+# reply is taken back from the internal protocol queue instead of being written to the serial port.
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../runtime/")
+import time
+import unittest
+from runtimeHub import runtimeHub
+from simulatedBrokerClient import simulatedBrokerClient
+
+
+class batchTest(unittest.TestCase):
+
+    def setUp(self):
+        self._hub = runtimeHub("batchTest", "./")
+        self._server = self._hub._serialCommunicationServerHub
+
+    def _runBatch(self, srcProtocolMessage):
+        batchCommand = self._hub._findCommand(srcProtocolMessage)
+        self._hub._executeCommand(batchCommand)
+        if batchCommand.getSubCommandList() is not None:
+            self._hub._executeBatch(batchCommand)
+        ret = self._server.takeInternalProtocol()
+        self.assertEqual(None, self._server.takeInternalProtocol())
+        return ret
+
+    def testRepliesInOrder(self):
+        reply = self._runBatch(["b", "3", "4", "yq", "10", "0", "0", "0", "4", "p", "topic", "payload", "1", "0", "4", "yq", "-1", "0", "0", "0"])
+        # Each reply keeps its own code, a failing sub-command does not stop the next ones
+        self.assertTrue(reply.startswith("B 3 4:YQ T14:P1F: No setup.79:YQ3F: "))
+        self.assertEqual(len("B 3 4:YQ T14:P1F: No setup.79:") + 79, len(reply))
+
+    def testEmptyBatch(self):
+        self.assertEqual("B 0", self._runBatch(["b", "0"]))
+
+    def testNonBatchableCommands(self):
+        self.assertEqual("B 4 3:X F3:X F3:X F3:X F", self._runBatch(["b", "4", "0", "y", "1", "yb", "100", "1", "b", "0", "0", "unknown"]))
+
+    def testInitInBatch(self):
+        # Shadow init sees the mqttCore created by the MQTT init before it
+        self.assertEqual("B 2 3:I T4:SI T", self._runBatch(["b", "2", "4", "i", "client", "1", "4", "0", "2", "si", "thing", "0"]))
+
+    def testMalformedEnvelope(self):
+        # Counts that do not add up, nothing is executed
+        self.assertEqual("B1F: Invalid information.", self._runBatch(["b", "2", "4", "yq", "10", "0", "0", "0"]))
+        self.assertEqual("B1F: Invalid information.", self._runBatch(["b", "1", "0", "y", "extra"]))
+        self.assertEqual("B1F: Invalid information.", self._runBatch(["b", "one"]))
+        self.assertEqual("B1F: Invalid information.", self._runBatch(["b"]))
+
+    def testSubscriptionsArePipelined(self):
+        self.assertEqual("B 1 3:I T", self._runBatch(["b", "1", "4", "i", "client", "1", "4", "0"]))
+        broker = simulatedBrokerClient(self._hub._mqttCoreHub, 0.2)
+        self._hub._mqttCoreHub._pahoClient = broker
+        batchMessage = ["b", "6"]
+        for i in range(0, 5):
+            batchMessage += ["3", "s", "topic/" + str(i), "1", str(i)]
+        batchMessage += ["4", "yq", "10", "0", "0", "0"]
+        startTime = time.time()
+        self.assertEqual("B 6 " + "3:S T" * 5 + "4:YQ T", self._runBatch(batchMessage))
+        # The SUBACKs were waited for together
+        self.assertTrue(time.time() - startTime < 5 * 0.2)
+        self.assertEqual(set(["topic/" + str(i) for i in range(0, 5)]), broker.getSubscribedTopics())
+        for i in range(0, 5):
+            self.assertEqual(i, self._hub._mqttSubscribeTable["topic/" + str(i)].getSketchSlotNumber())
+
+    def testSameTopicKeepsItsOrder(self):
+        self.assertEqual("B 1 3:I T", self._runBatch(["b", "1", "4", "i", "client", "1", "4", "0"]))
+        broker = simulatedBrokerClient(self._hub._mqttCoreHub, 0.05)
+        self._hub._mqttCoreHub._pahoClient = broker
+        batchMessage = ["b", "5", "3", "s", "topic/a", "1", "1", "3", "s", "topic/b", "1", "2", "1", "u", "topic/a",
+                        "3", "s", "topic/c", "1", "3", "1", "u", "topic/c"]
+        reply = self._runBatch(batchMessage)
+        self.assertEqual("B 5 3:S T3:S T3:U 13:S T3:U 3", reply)
+        # Each topic ends up as its last request left it
+        self.assertEqual(set(["topic/b"]), broker.getSubscribedTopics())
+        self.assertEqual(["topic/b"], self._hub._mqttSubscribeTable.keys())
+        requestList = broker.getRequests()
+        self.assertTrue(requestList.index(("s", "topic/a")) < requestList.index(("u", "topic/a")))
+        self.assertTrue(requestList.index(("s", "topic/c")) < requestList.index(("u", "topic/c")))
+
+
+if __name__ == "__main__":
+    unittest.main()
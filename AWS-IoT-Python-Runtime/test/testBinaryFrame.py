@@ -0,0 +1,80 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Binary framing of requests and replies: frames built by encodeRequest are read back by decodeRequest
+# one srcRead() at a time, the way serialCommunicationServer reads them from the transport.
+
+import sys
+sys.path.append("../lib/")
+import struct
+import unittest
+from StringIO import StringIO
+from comm.binaryFrame import binaryFrame
+
+
+class binaryFrameTest(unittest.TestCase):
+
+    def setUp(self):
+        self._frame = binaryFrame()
+        self._frame.registerOpcode(0x84, "p")
+        self._frame.registerOpcode(0x83, "d")
+
+    def _decode(self, srcBytes):
+        return self._frame.decodeRequest(StringIO(srcBytes).read)
+
+    def testRoundTrip(self):
+        request = self._frame.encodeRequest("p", ["sdk/topic", "payload", 1, ""])
+        self.assertEqual("\x84\x04", request[:2])
+        self.assertEqual(["p", "sdk/topic", "payload", "1", ""], self._decode(request))
+
+    def testNoParameter(self):
+        self.assertEqual(["d"], self._decode(self._frame.encodeRequest("d", [])))
+
+    def testStrayBytesAreSkipped(self):
+        request = self._frame.encodeRequest("p", ["a", "b", "0", "0"])
+        self.assertEqual(["p", "a", "b", "0", "0"], self._decode("\n\r1 \xff\x00" + request))
+
+    def testResetSequence(self):
+        # "1\n~\n" sent by the sketch on boot
+        self.assertEqual(["~"], self._decode("1\n~\n" + self._frame.encodeRequest("d", [])))
+
+    def testExitByteInsideAFrame(self):
+        self.assertEqual(["p", "~", "~~", "0", "0"], self._decode(self._frame.encodeRequest("p", ["~", "~~", "0", "0"])))
+
+    def testLongParameter(self):
+        payload = "x" * 0xFFFF
+        self.assertEqual(["p", "t", payload, "0", "0"], self._decode(self._frame.encodeRequest("p", ["t", payload, "0", "0"])))
+        self.assertRaises(ValueError, self._frame.encodeRequest, "p", ["t", payload + "x", "0", "0"])
+
+    def testRegisteredOpcode(self):
+        self.assertRaises(ValueError, self._frame.encodeRequest, "xx", [])
+        self._frame.registerOpcode(0xF0, "xx")
+        self.assertEqual("xx", self._frame.getProtocolName(0xF0))
+        self.assertEqual(["xx", "1"], self._decode(self._frame.encodeRequest("xx", [1])))
+
+    def testOpcodeOutOfRange(self):
+        self.assertRaises(ValueError, self._frame.registerOpcode, 0x7E, "xx")
+        self.assertRaises(ValueError, self._frame.registerOpcode, 0x100, "xx")
+        self.assertRaises(TypeError, self._frame.registerOpcode, None, "xx")
+
+    def testReplyLength(self):
+        self.assertEqual(struct.pack(">H", 300), self._frame.encodeReplyLength(300))
+        self.assertRaises(ValueError, self._frame.encodeReplyLength, 0x10000)
+
+
+if __name__ == "__main__":
+    unittest.main()
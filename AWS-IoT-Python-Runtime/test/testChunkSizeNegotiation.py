@@ -0,0 +1,106 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Chunk size negotiation: "cs" requests go through runtimeHub the way the sketch sends them,
+# the reply and the sizes left on serialCommunicationServer are checked.
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../runtime/")
+import unittest
+from runtimeHub import runtimeHub
+
+
+class chunkSizeNegotiationTest(unittest.TestCase):
+
+    def setUp(self):
+        self._hub = runtimeHub("chunkSizeNegotiationTest", "./")
+        self._server = self._hub._serialCommunicationServerHub
+
+    def _negotiate(self, srcParameterList):
+        self._hub._executeCommand(self._hub._findCommand(["cs"] + srcParameterList))
+        return self._server.takeInternalProtocol()
+
+    def testDefaults(self):
+        self.assertEqual(50, self._server.getChunkSize())
+        self.assertEqual(50, self._server.getJSONChunkSize())
+        self.assertEqual(0, self._server.getMaximumReplySize())
+
+    def testExplicitSizes(self):
+        self.assertEqual("CS T 32 100", self._negotiate(["128", "32", "100"]))
+        self.assertEqual(32, self._server.getChunkSize())
+        self.assertEqual(100, self._server.getJSONChunkSize())
+        self.assertEqual(127, self._server.getMaximumReplySize())
+
+    def testZeroPicksTheLargestChunk(self):
+        self.assertEqual("CS T 63 40", self._negotiate(["64", "0", "40"]))
+        self.assertEqual("CS T 24 63", self._negotiate(["64", "24", "0"]))
+
+    def testOutOfRange(self):
+        # Chunk bigger than the buffer minus the terminator
+        self.assertTrue(self._negotiate(["64", "64", "0"]).startswith("CS3F: "))
+        # Chunk too small to carry a yield header
+        self.assertTrue(self._negotiate(["64", "8", "0"]).startswith("CS3F: "))
+        # Chunk too small to carry a "Reply too large." reply
+        self.assertTrue(self._negotiate(["64", "23", "0"]).startswith("CS3F: "))
+        # Buffer too small for any chunk
+        self.assertTrue(self._negotiate(["16", "0", "0"]).startswith("CS3F: "))
+        # Nothing changed
+        self.assertEqual(50, self._server.getChunkSize())
+        self.assertEqual(50, self._server.getJSONChunkSize())
+        self.assertEqual(0, self._server.getMaximumReplySize())
+
+    def _send(self, srcProtocolMessage):
+        # Reply as written to the remote client
+        self._hub._executeCommand(self._hub._findCommand(srcProtocolMessage))
+        sentList = []
+        self._server._basicOutput = sentList.append
+        self._server.writeToExternalProtocol()
+        return sentList
+
+    def _sendBatch(self, srcProtocolMessage):
+        batchCommand = self._hub._findCommand(srcProtocolMessage)
+        self._hub._executeCommand(batchCommand)
+        self._hub._executeBatch(batchCommand)
+        sentList = []
+        self._server._basicOutput = sentList.append
+        self._server.writeToExternalProtocol()
+        return sentList
+
+    def testRepliesWithinTheBuffer(self):
+        self.assertEqual(["CS T 31 31"], self._send(["cs", "32", "0", "0"]))
+        batchMessage = ["b", "3"] + ["4", "yq", "10", "0", "0", "0"] * 3
+        self.assertEqual(["B 3 4:YQ T4:YQ T4:YQ T"], self._sendBatch(batchMessage))
+
+    def testReplyTooLarge(self):
+        self.assertEqual(["CS T 31 31"], self._send(["cs", "32", "0", "0"]))
+        batchMessage = ["b", "5"] + ["4", "yq", "10", "0", "0", "0"] * 5
+        # Not cut short: the sketch is told it did not fit
+        self.assertEqual(["BF: Reply too large."], self._sendBatch(batchMessage))
+        self.assertEqual(["YQ T"], self._send(["yq", "10", "0", "0", "0"]))
+
+    def testNoLimitBeforeNegotiation(self):
+        batchMessage = ["b", "5"] + ["4", "yq", "10", "0", "0", "0"] * 5
+        self.assertEqual(["B 5 " + "4:YQ T" * 5], self._sendBatch(batchMessage))
+
+    def testInvalidParameters(self):
+        self.assertTrue(self._negotiate(["big", "0", "0"]).startswith("CS3F: "))
+        self.assertEqual("CS1F: No setup.", self._negotiate(["64", "0"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
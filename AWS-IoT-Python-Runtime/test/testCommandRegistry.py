@@ -0,0 +1,143 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Command registry: lookup by protocol name, kept commands for well-formed requests and fresh ones
+# for malformed requests, and commands registered from outside runtimeHub.
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../runtime/")
+import os
+import unittest
+from command.AWSIoTCommand import AWSIoTCommand
+from command.commandRegistry import commandRegistry
+from comm.streamTransport import streamTransport
+from runtimeHub import runtimeHub
+
+
+class _echoCommand(AWSIoTCommand):
+    # Replies with its parameters, joined by spaces
+    def __init__(self, srcParameterList, srcSerialCommuteServer):
+        self._commandProtocolName = "echo"
+        self._parameterList = srcParameterList
+        self._serialCommServerHandler = srcSerialCommuteServer
+
+    def execute(self):
+        self._serialCommServerHandler.writeToInternalProtocol("ECHO " + " ".join(self._parameterList))
+
+
+class commandRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._registry = commandRegistry()
+        self._builtList = []
+
+    def _factory(self, srcParameterList):
+        ret = _echoCommand(srcParameterList, None)
+        self._builtList.append(ret)
+        return ret
+
+    def testLookup(self):
+        self._registry.register("echo", self._factory)
+        self.assertTrue(self._registry.isRegistered("echo"))
+        self.assertEqual(["a", "b"], self._registry.findCommand(["echo", "a", "b"])._parameterList)
+        self.assertEqual(None, self._registry.findCommand(["other"]))
+        self.assertEqual(None, self._registry.findCommand([]))
+        self._registry.unregister("echo")
+        self.assertEqual(None, self._registry.findCommand(["echo"]))
+
+    def testReusableCommand(self):
+        self._registry.register("echo", self._factory, [1, 2], True)
+        first = self._registry.findCommand(["echo", "a"])
+        second = self._registry.findCommand(["echo", "b", "c"])
+        self.assertTrue(first is second)
+        self.assertEqual(["b", "c"], second._parameterList)
+        # Malformed requests get a command of their own
+        malformed = self._registry.findCommand(["echo"])
+        self.assertFalse(malformed is first)
+        self.assertEqual(["b", "c"], first._parameterList)
+        # createCommand never hands out the kept command
+        self.assertFalse(self._registry.createCommand(["echo", "d"]) is first)
+        self._registry.resetCommands()
+        self.assertFalse(self._registry.findCommand(["echo", "e"]) is first)
+        self.assertEqual(4, len(self._builtList))
+
+    def testNotReusableWithoutParameterCounts(self):
+        self._registry.register("echo", self._factory, None, True)
+        self.assertFalse(self._registry.findCommand(["echo", "a"]) is self._registry.findCommand(["echo", "a"]))
+
+    def testFactoryMustBeCallable(self):
+        self.assertRaises(TypeError, self._registry.register, "echo", "factory")
+        self.assertRaises(TypeError, self._registry.registerModule, "yq", "commandSetYieldQueueing", "factory")
+
+    def testModuleIsLoadedOnFirstRequest(self):
+        self._registry.registerModule("yq", "commandSetYieldQueueing", lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList, None))
+        self.assertEqual("commandSetYieldQueueing", self._registry._entries["yq"]._commandModuleName)
+        command = self._registry.findCommand(["yq", "10", "0", "0", "0"])
+        self.assertEqual("commandSetYieldQueueing", command.__class__.__name__)
+        self.assertEqual(None, self._registry._entries["yq"]._commandModuleName)
+        # Declarations of the command class are collected
+        self.assertTrue(command is self._registry.findCommand(["yq", "20", "0", "0", "0"]))
+
+    def testModuleDeclaresAnotherProtocolName(self):
+        self._registry.registerModule("zz", "commandSetYieldQueueing", lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList, None))
+        self.assertRaises(ValueError, self._registry.findCommand, ["zz"])
+
+    def testOpcodeTable(self):
+        self._registry.register("echo", self._factory, [1], False, 0xF0)
+        self._registry.registerModule("p", "commandPublish", lambda srcCommandClass, srcParameterList: srcCommandClass(srcParameterList, None, None))
+        self._registry.register("other", self._factory)
+        self.assertEqual({0xF0: "echo", 0x84: "p"}, self._registry.getOpcodeTable())
+
+
+class runtimeHubRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._readFileDescriptor, self._writeFileDescriptor = os.pipe()
+        self._hub = runtimeHub("commandRegistryTest", "./", streamTransport(self._readFileDescriptor))
+        self._server = self._hub._serialCommunicationServerHub
+
+    def tearDown(self):
+        os.close(self._readFileDescriptor)
+        os.close(self._writeFileDescriptor)
+
+    def _execute(self, srcProtocolMessage):
+        self._hub._executeCommand(self._hub._findCommand(srcProtocolMessage))
+        return self._server.takeInternalProtocol()
+
+    def testExtraCommand(self):
+        self._hub.getCommandRegistry().register("echo", lambda srcParameterList: _echoCommand(srcParameterList, self._server))
+        self.assertEqual("ECHO hello world", self._execute(["echo", "hello", "world"]))
+
+    def testUnknownCommand(self):
+        self.assertEqual("x", self._hub._findCommand(["unknown"]).getCommandProtocolName())
+
+    def testParameterListIsNotMutated(self):
+        protocolMessage = ["s", "topic", "1", "1"]
+        self._hub._findCommand(protocolMessage)
+        self.assertEqual(["s", "topic", "1", "1"], protocolMessage)
+
+    def testNewMQTTCoreDropsKeptCommands(self):
+        self.assertEqual("P1F: No setup.", self._execute(["p", "topic", "payload", "0", "0"]))
+        self.assertEqual("I T", self._execute(["i", "commandRegistryTest", "1", "4", "0"]))
+        publish = self._hub._findCommand(["p", "topic", "payload", "0", "0"])
+        self.assertTrue(publish._mqttCoreHandler is self._hub._mqttCoreHub)
+        self.assertTrue(publish is self._hub._findCommand(["p", "topic", "other", "0", "0"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Delta encoding of JSON yield payloads, one encoder for several sketch slots: the records expected
+# here are what the sketch receives in its yield chunks.
+
+import sys
+sys.path.append("../lib/")
+import os
+import unittest
+from StringIO import StringIO
+from util.jsonDeltaEncoder import jsonDeltaEncoder
+from util.logManager import logManager
+from comm.serialCommunicationServer import serialCommunicationServer
+from comm.streamTransport import streamTransport
+
+
+class jsonDeltaEncoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self._encoder = jsonDeltaEncoder()
+        self._encoder.setSlotEncoding(1, True)
+
+    def testFirstDocumentInFull(self):
+        self.assertEqual('state.desired.color="red"\tstate.desired.level=3', self._encoder.encode(1, '{"state":{"desired":{"color":"red","level":3}}}'))
+
+    def testChangedAddedAndRemovedFields(self):
+        self._encoder.encode(1, '{"a":1,"b":{"c":"x","d":true}}')
+        self.assertEqual("a=2\tb.e=[1,2]\tb.d", self._encoder.encode(1, '{"a":2,"b":{"c":"x","e":[1,2]}}'))
+
+    def testUnchangedDocument(self):
+        self._encoder.encode(1, '{"a":1,"b":{"c":2}}')
+        # Same fields, other order and spacing
+        self.assertEqual(None, self._encoder.encode(1, '{ "b": {"c": 2}, "a": 1 }'))
+        self.assertEqual("b.c=3", self._encoder.encode(1, '{"a":1,"b":{"c":3}}'))
+
+    def testNullIsNotARemoval(self):
+        self._encoder.encode(1, '{"a":1,"b":null}')
+        self.assertEqual("c=2\ta", self._encoder.encode(1, '{"b":null,"c":2}'))
+        self.assertEqual("b=1", self._encoder.encode(1, '{"b":1,"c":2}'))
+        self.assertEqual("b=null", self._encoder.encode(1, '{"b":null,"c":2}'))
+
+    def testResetSlotDocument(self):
+        self._encoder.setSlotEncoding(2, True)
+        self._encoder.encode(1, '{"a":1,"b":2}')
+        self._encoder.encode(2, '{"a":1}')
+        self._encoder.resetSlotDocument(1)
+        self.assertEqual("a=1\tb=2", self._encoder.encode(1, '{"a":1,"b":2}'))
+        self.assertEqual(None, self._encoder.encode(2, '{"a":1}'))
+
+    def testEmptyObjectIsALeaf(self):
+        self._encoder.encode(1, '{"a":{"b":1}}')
+        self.assertEqual("a={}\ta.b", self._encoder.encode(1, '{"a":{}}'))
+
+    def testValuesKeepTheSeparatorEscaped(self):
+        self.assertEqual('a="x\\ty"', self._encoder.encode(1, '{"a":"x\\ty"}'))
+
+    def testKeyEscapes(self):
+        self.assertEqual("a\\.b.c\\=d=1", self._encoder.encode(1, '{"a.b":{"c=d":1}}'))
+        self._encoder.setSlotEncoding(1, True)
+        self.assertEqual("k\\\\\\t\\r\\n=0", self._encoder.encode(1, '{"k\\\\\\t\\r\\n":0}'))
+
+    def testEscapedKeysDoNotCollide(self):
+        self._encoder.encode(1, '{"a":{"b":1}}')
+        self.assertEqual("a\\.b=2", self._encoder.encode(1, '{"a":{"b":1},"a.b":2}'))
+
+    def testNotAnObjectIsPassedThrough(self):
+        self.assertEqual("plain text", self._encoder.encode(1, "plain text"))
+        self.assertEqual("[1,2]", self._encoder.encode(1, "[1,2]"))
+
+    def testSlotsAreIndependent(self):
+        self._encoder.setSlotEncoding(2, True)
+        self._encoder.encode(1, '{"a":1}')
+        self.assertEqual("a=1", self._encoder.encode(2, '{"a":1}'))
+        self.assertEqual(None, self._encoder.encode(1, '{"a":1}'))
+
+    def testStartOverFromAFullDocument(self):
+        self._encoder.encode(1, '{"a":1,"b":2}')
+        self._encoder.resetDocuments()
+        self.assertEqual("a=1\tb=2", self._encoder.encode(1, '{"a":1,"b":2}'))
+        self._encoder.setSlotEncoding(1, True)
+        self.assertEqual("a=1\tb=2", self._encoder.encode(1, '{"a":1,"b":2}'))
+
+    def testSlotEncodingSetting(self):
+        self.assertTrue(self._encoder.isSlotEncoding(1))
+        self._encoder.setSlotEncoding(1, False)
+        self.assertFalse(self._encoder.isSlotEncoding(1))
+
+
+class yieldDeltaEncodingTest(unittest.TestCase):
+
+    def setUp(self):
+        log = logManager("jsonDeltaEncoderTest", "./")
+        log.disable()
+        self._readFileDescriptor, self._writeFileDescriptor = os.pipe()
+        self._server = serialCommunicationServer(log, streamTransport(self._readFileDescriptor, StringIO()))
+        self._server.setChunkSize(24)
+        self._server.setYieldDeltaEncoding(1, True)
+
+    def tearDown(self):
+        os.close(self._readFileDescriptor)
+        os.close(self._writeFileDescriptor)
+
+    def _takeChunk(self):
+        # Payload slice and has-more flag of the next yield chunk
+        outputFile = self._server._transport.getOutputFile()
+        outputFile.seek(0)
+        outputFile.truncate()
+        self._server.writeToExternalYield()
+        chunk = outputFile.getvalue()[:-1]
+        self.assertTrue(chunk.startswith("Y 1 "))
+        return chunk[6:], chunk[4] == "1"
+
+    def _takeMessage(self):
+        ret = ""
+        hasMore = True
+        while hasMore:
+            payload, hasMore = self._takeChunk()
+            ret += payload
+        return ret
+
+    def _yield(self, srcPayload):
+        self._server.writeToInternalYield(1, srcPayload)
+        self._server.updateLockedQueueSize()
+
+    def testPartlySentDeltaGoesOutInFullAfterReattach(self):
+        self._yield('{"color":"red","level":3,"name":"lamp"}')
+        self.assertEqual('color="red"\tlevel=3\tname="lamp"', self._takeMessage())
+        self._yield('{"color":"green","level":4,"name":"lamp"}')
+        self.assertEqual(('color="green"\tleve', True), self._takeChunk())
+        # The sketch resets in the middle of the message
+        self._server.attachTransport(streamTransport(self._readFileDescriptor, StringIO()))
+        self._server.setChunkSize(24)
+        self.assertEqual('color="green"\tlevel=4\tname="lamp"', self._takeMessage())
+        # Later documents are deltas of the one sent in full
+        self._yield('{"color":"green","level":5,"name":"lamp"}')
+        self.assertEqual("level=5", self._takeMessage())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# In-memory offline publish queue: count and byte limits with both drop behaviors, then "pq" and "p"
+# through runtimeHub while mqttCore is offline.
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../runtime/")
+import os
+import unittest
+from util.offlinePublishQueue import offlinePublishQueue
+from protocol.mqttCore import _publishRequest
+from comm.streamTransport import streamTransport
+from runtimeHub import runtimeHub
+
+
+class offlinePublishQueueTest(unittest.TestCase):
+
+    def _request(self, srcIndex, srcPayloadSize=8):
+        return _publishRequest("topic/%d" % srcIndex, "x" * srcPayloadSize, 0, False)
+
+    def _drain(self, srcQueue):
+        ret = []
+        while len(srcQueue) > 0:
+            ret.append(srcQueue.popleft().topic)
+        return ret
+
+    def testFifo(self):
+        queue = offlinePublishQueue(0)
+        for i in range(0, 1000):
+            self.assertTrue(queue.append(self._request(i)))
+        self.assertEqual(sum([len("topic/%d" % i) + 8 for i in range(0, 1000)]), queue.getByteCount())
+        self.assertEqual(["topic/%d" % i for i in range(0, 1000)], self._drain(queue))
+        self.assertEqual(0, queue.getByteCount())
+        self.assertRaises(IndexError, queue.popleft)
+
+    def testDropNewestBySize(self):
+        queue = offlinePublishQueue(2, 1)
+        self.assertTrue(queue.append(self._request(0)))
+        self.assertTrue(queue.append(self._request(1)))
+        self.assertFalse(queue.append(self._request(2)))
+        self.assertEqual(["topic/0", "topic/1"], self._drain(queue))
+        self.assertEqual((1, len("topic/2") + 8), (queue.getDroppedCount(), queue.getDroppedBytes()))
+
+    def testDropOldestByBytes(self):
+        # Each request is 15 bytes
+        queue = offlinePublishQueue(0, 0, 40)
+        self.assertTrue(queue.append(self._request(0)))
+        self.assertTrue(queue.append(self._request(1)))
+        self.assertFalse(queue.append(self._request(2)))
+        self.assertEqual(30, queue.getByteCount())
+        self.assertEqual((1, 15), (queue.getDroppedCount(), queue.getDroppedBytes()))
+        # A bigger request makes room for itself
+        self.assertFalse(queue.append(self._request(3, 20)))
+        self.assertEqual(["topic/3"], self._drain(queue))
+        self.assertEqual((3, 45), (queue.getDroppedCount(), queue.getDroppedBytes()))
+
+    def testBothLimits(self):
+        queue = offlinePublishQueue(3, 1, 40)
+        self.assertTrue(queue.append(self._request(0, 1)))
+        self.assertTrue(queue.append(self._request(1, 1)))
+        self.assertTrue(queue.append(self._request(2, 1)))
+        # Count limit
+        self.assertFalse(queue.append(self._request(3, 1)))
+        queue.popleft()
+        # Byte limit
+        self.assertFalse(queue.append(self._request(4, 30)))
+        self.assertEqual(2, queue.getDroppedCount())
+
+    def testNeverFits(self):
+        queue = offlinePublishQueue(0, 0, 10)
+        self.assertFalse(queue.append(self._request(0)))
+        self.assertEqual(0, len(queue))
+        self.assertEqual((1, 15), (queue.getDroppedCount(), queue.getDroppedBytes()))
+
+    def testInvalidSettings(self):
+        self.assertRaises(ValueError, offlinePublishQueue, -1)
+        self.assertRaises(ValueError, offlinePublishQueue, 0, 0, -1)
+        self.assertRaises(ValueError, offlinePublishQueue, 0, 2)
+        self.assertRaises(TypeError, offlinePublishQueue, 0, 0, "1")
+
+
+class runtimeHubOfflinePublishTest(unittest.TestCase):
+
+    def setUp(self):
+        self._readFileDescriptor, self._writeFileDescriptor = os.pipe()
+        self._hub = runtimeHub("offlinePublishQueueTest", "./", streamTransport(self._readFileDescriptor))
+        self._server = self._hub._serialCommunicationServerHub
+
+    def tearDown(self):
+        os.close(self._readFileDescriptor)
+        os.close(self._writeFileDescriptor)
+
+    def _execute(self, srcProtocolMessage):
+        self._hub._executeCommand(self._hub._findCommand(srcProtocolMessage))
+        return self._server.takeInternalProtocol()
+
+    def testByteLimitWhileOffline(self):
+        self.assertEqual("I T", self._execute(["i", "offlinePublishQueueTest", "1", "4", "0"]))
+        self.assertEqual("PQ T", self._execute(["pq", "0", "1", "40"]))
+        self.assertEqual("P T", self._execute(["p", "topic/a", "x" * 8, "0", "0"]))
+        self.assertEqual("P T", self._execute(["p", "topic/b", "x" * 8, "0", "0"]))
+        self.assertNotEqual("P T", self._execute(["p", "topic/c", "x" * 8, "0", "0"]))
+        self.assertEqual((1, 15), self._hub._mqttCoreHub.getOfflinePublishQueueDropCounts())
+        # Without maximumBytes the byte limit stays
+        self.assertEqual("PQ T", self._execute(["pq", "10", "1"]))
+        self.assertEqual(40, self._hub._mqttCoreHub._offlinePublishQueue._maximumBytes)
+        self.assertEqual("PQ3F: ", self._execute(["pq", "10", "1", "-1"])[:6])
+
+
+if __name__ == "__main__":
+    unittest.main()
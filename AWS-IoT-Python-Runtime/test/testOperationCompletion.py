@@ -0,0 +1,114 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Per-mid completion of broker operations: the completion table on its own, then mqttCore subscribe/unsubscribe
+# against brokers that acknowledge before paho returns the mid, after a round trip, late or never.
+
+import sys
+sys.path.append("../lib/")
+import time
+import threading
+import unittest
+from protocol.mqttCore import mqttCore
+from protocol.mqttCore import _operationCompletionTable
+from protocol.paho.client import MQTTv311
+from util.logManager import logManager
+from exception.AWSIoTExceptions import subscribeTimeoutException
+from exception.AWSIoTExceptions import unsubscribeTimeoutException
+from simulatedBrokerClient import simulatedBrokerClient
+
+
+class operationCompletionTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self._table = _operationCompletionTable()
+
+    def testCompletedBeforeTheWait(self):
+        self._table.complete(1, 0)
+        self.assertEqual((True, 0), self._table.wait(1, 5))
+
+    def testCompletedDuringTheWait(self):
+        threading.Timer(0.01, self._table.complete, [2, "suback"]).start()
+        startTime = time.time()
+        self.assertEqual((True, "suback"), self._table.wait(2, 5))
+        self.assertTrue(time.time() - startTime < 1)
+
+    def testTimeout(self):
+        self.assertEqual(False, self._table.wait(3, 0.01)[0])
+
+    def testLateAcknowledgementIsDropped(self):
+        self.assertEqual(False, self._table.wait(4, 0.01)[0])
+        self._table.complete(4, "late")
+        # The next operation with the same key does not take the late acknowledgement
+        threading.Timer(0.05, self._table.complete, [4, "current"]).start()
+        self.assertEqual((True, "current"), self._table.wait(4, 5))
+
+    def testKeysAreIndependent(self):
+        self._table.complete(6, "six")
+        self.assertEqual(False, self._table.wait(5, 0.01)[0])
+        self.assertEqual((True, "six"), self._table.wait(6, 5))
+
+
+class _immediateBrokerClient(simulatedBrokerClient):
+    # Acknowledges from inside subscribe/unsubscribe, before the mid gets back to mqttCore
+    def subscribe(self, srcTopic, srcQos):
+        mid = self._nextMid(("s", srcTopic))
+        self._mqttCore.on_subscribe(self, None, mid, (srcQos,))
+        return (0, mid)
+
+    def unsubscribe(self, srcTopic):
+        mid = self._nextMid(("u", srcTopic))
+        self._mqttCore.on_unsubscribe(self, None, mid)
+        return (0, mid)
+
+
+class mqttCoreCompletionTest(unittest.TestCase):
+
+    def setUp(self):
+        self._log = logManager("operationCompletionTest", "./")
+        self._log.disable()
+        self._mqttCore = mqttCore("operationCompletionTest", True, MQTTv311, self._log, False)
+        self._mqttCore.setMQTTOperationTimeoutSecond(5)
+
+    def testAcknowledgedBeforeTheMidIsKnown(self):
+        self._mqttCore._pahoClient = _immediateBrokerClient(self._mqttCore, 0)
+        self.assertTrue(self._mqttCore.subscribe("topic", 1, None))
+        self.assertTrue(self._mqttCore.unsubscribe("topic"))
+
+    def testAcknowledgedAfterTheRoundTrip(self):
+        self._mqttCore._pahoClient = simulatedBrokerClient(self._mqttCore, 0.02)
+        startTime = time.time()
+        self.assertTrue(self._mqttCore.subscribe("topic", 1, None))
+        self.assertTrue(self._mqttCore.unsubscribe("topic"))
+        # No polling interval on top of the round trips
+        self.assertTrue(time.time() - startTime < 1)
+
+    def testTimeoutAndLateAcknowledgement(self):
+        self._mqttCore._pahoClient = simulatedBrokerClient(self._mqttCore, 0.3)
+        self._mqttCore.setMQTTOperationTimeoutSecond(0.05)
+        self.assertRaises(subscribeTimeoutException, self._mqttCore.subscribe, "topic/a", 1, None)
+        self.assertRaises(unsubscribeTimeoutException, self._mqttCore.unsubscribe, "topic/a")
+        self.assertFalse("topic/a" in self._mqttCore._subscribePool)
+        # The late SUBACK/UNSUBACK come in while the next operations wait for their own
+        self._mqttCore._pahoClient._roundTripSecond = 0.5
+        self._mqttCore.setMQTTOperationTimeoutSecond(5)
+        self.assertTrue(self._mqttCore.subscribe("topic/b", 1, None))
+        self.assertEqual(set(["topic/b"]), set(self._mqttCore._subscribePool.keys()))
+
+
+if __name__ == "__main__":
+    unittest.main()
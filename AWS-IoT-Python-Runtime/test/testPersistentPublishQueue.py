@@ -0,0 +1,206 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Disk-backed offline publish queue: each test works in its own temporary queue directory, restarts are a close()
+# followed by a new queue on the same directory, crashes are simulated by cutting or damaging the segment files.
+
+import sys
+sys.path.append("../lib/")
+import os
+import shutil
+import tempfile
+import unittest
+import util.persistentPublishQueue
+from util.persistentPublishQueue import persistentPublishQueue
+
+
+class persistentPublishQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._queues = []
+
+    def tearDown(self):
+        for queue in self._queues:
+            queue.close()
+        shutil.rmtree(self._directory)
+
+    def _open(self, srcMaximumSize=0, srcMaximumBytes=0, srcDropBehavior=1, srcSegmentBytes=64*1024):
+        queue = persistentPublishQueue(self._directory, srcMaximumSize, srcMaximumBytes, srcDropBehavior, srcSegmentBytes=srcSegmentBytes)
+        self._queues.append(queue)
+        return queue
+
+    def _reopen(self, srcQueue, srcSegmentBytes=64*1024):
+        srcQueue.close()
+        self._queues.remove(srcQueue)
+        return self._open(srcSegmentBytes=srcSegmentBytes)
+
+    def _segmentPaths(self):
+        return sorted(os.path.join(self._directory, fileName) for fileName in os.listdir(self._directory) if fileName.endswith(".log"))
+
+    def _request(self, srcIndex):
+        return ("topic/%d" % srcIndex, "payload-%d" % srcIndex, srcIndex % 2, srcIndex % 3 == 0)
+
+    def testFifo(self):
+        queue = self._open()
+        for i in range(0, 10):
+            self.assertTrue(queue.append(self._request(i)))
+        self.assertEqual(10, len(queue))
+        self.assertEqual([self._request(i) for i in range(0, 10)], [queue.popleft() for i in range(0, 10)])
+        self.assertEqual(0, len(queue))
+        self.assertEqual(0, queue.getByteCount())
+        self.assertRaises(IndexError, queue.popleft)
+
+    def testUnicode(self):
+        queue = self._open()
+        queue.append((u"topic/\u00e9", u"\u00e9t\u00e9", 1, False))
+        self.assertEqual(("topic/\xc3\xa9", "\xc3\xa9t\xc3\xa9", 1, False), queue.popleft())
+
+    def testRestartResumesAtTheHead(self):
+        queue = self._open()
+        for i in range(0, 10):
+            queue.append(self._request(i))
+        for i in range(0, 4):
+            queue.popleft()
+        queue = self._reopen(queue)
+        self.assertEqual(6, len(queue))
+        self.assertEqual(self._request(4), queue.popleft())
+
+    def testRestartAcrossSegments(self):
+        queue = self._open(srcSegmentBytes=64)
+        for i in range(0, 20):
+            queue.append(self._request(i))
+        self.assertTrue(len(self._segmentPaths()) > 1)
+        for i in range(0, 12):
+            queue.popleft()
+        queue = self._reopen(queue, 64)
+        self.assertEqual([self._request(i) for i in range(12, 20)], [queue.popleft() for i in range(12, 20)])
+        # Fully read segments are gone
+        self.assertEqual(1, len(self._segmentPaths()))
+
+    def testTruncatedTailIsRecovered(self):
+        queue = self._open()
+        for i in range(0, 5):
+            queue.append(self._request(i))
+        queue.close()
+        self._queues.remove(queue)
+        segmentPath = self._segmentPaths()[-1]
+        # A crash in the middle of the last record
+        segmentFile = open(segmentPath, "r+b")
+        segmentFile.truncate(os.path.getsize(segmentPath) - 3)
+        segmentFile.close()
+        queue = self._open()
+        self.assertEqual(4, len(queue))
+        queue.append(self._request(5))
+        self.assertEqual([self._request(i) for i in [0, 1, 2, 3, 5]], [queue.popleft() for i in range(0, 5)])
+
+    def testCorruptTailIsRecovered(self):
+        queue = self._open()
+        for i in range(0, 5):
+            queue.append(self._request(i))
+        queue.close()
+        self._queues.remove(queue)
+        segmentPath = self._segmentPaths()[-1]
+        sizeBefore = os.path.getsize(segmentPath)
+        # Garbage after the last record, then a flipped byte in the last payload
+        segmentFile = open(segmentPath, "ab")
+        segmentFile.write("\x00\x00\x00\x10garbage")
+        segmentFile.close()
+        segmentFile = open(segmentPath, "r+b")
+        segmentFile.seek(sizeBefore - 1)
+        segmentFile.write("X")
+        segmentFile.close()
+        queue = self._open()
+        self.assertEqual(4, len(queue))
+        self.assertTrue(os.path.getsize(segmentPath) < sizeBefore)
+        self.assertEqual([self._request(i) for i in range(0, 4)], [queue.popleft() for i in range(0, 4)])
+
+    def testMissingCursor(self):
+        queue = self._open()
+        for i in range(0, 3):
+            queue.append(self._request(i))
+        queue.close()
+        self._queues.remove(queue)
+        os.unlink(os.path.join(self._directory, "cursor"))
+        queue = self._open()
+        self.assertEqual(3, len(queue))
+        self.assertEqual(self._request(0), queue.popleft())
+
+    def testDropNewest(self):
+        queue = self._open(2, 0, 1)
+        self.assertTrue(queue.append(self._request(0)))
+        self.assertTrue(queue.append(self._request(1)))
+        self.assertFalse(queue.append(self._request(2)))
+        self.assertEqual(1, queue.getDroppedCount())
+        self.assertEqual([self._request(0), self._request(1)], [queue.popleft(), queue.popleft()])
+
+    def testDropOldestSurvivesRestart(self):
+        queue = self._open(2, 0, 0)
+        for i in range(0, 4):
+            queue.append(self._request(i))
+        self.assertEqual(2, queue.getDroppedCount())
+        queue = self._reopen(queue)
+        self.assertEqual([self._request(2), self._request(3)], [queue.popleft(), queue.popleft()])
+
+    def testMaximumBytes(self):
+        queue = self._open(0, 0, 1)
+        self.assertTrue(queue.append(self._request(0)))
+        recordBytes = queue.getByteCount()
+        queue.close()
+        self._queues.remove(queue)
+        # The first record is still queued after the restart
+        queue = self._open(0, recordBytes * 2, 1)
+        self.assertTrue(queue.append(self._request(2)))
+        self.assertFalse(queue.append(self._request(4)))
+        self.assertEqual(recordBytes, queue.getDroppedBytes())
+        self.assertEqual(recordBytes * 2, queue.getByteCount())
+
+    def _countAppendSyncs(self, srcSyncInterval, srcAppendCount):
+        queue = persistentPublishQueue(self._directory, 0, 0, 1, None, 64*1024, srcSyncInterval)
+        self._queues.append(queue)
+        syncedList = []
+        originalFsync = util.persistentPublishQueue.os.fsync
+        util.persistentPublishQueue.os.fsync = lambda srcFileDescriptor: syncedList.append(srcFileDescriptor)
+        try:
+            for i in range(0, srcAppendCount):
+                queue.append(self._request(i))
+        finally:
+            util.persistentPublishQueue.os.fsync = originalFsync
+        return len(syncedList)
+
+    def testSyncEveryAppend(self):
+        self.assertEqual(10, self._countAppendSyncs(1, 10))
+
+    def testBatchedSync(self):
+        self.assertEqual(2, self._countAppendSyncs(4, 10))
+        # The rest is synced on close
+        queue = self._reopen(self._queues[0])
+        self.assertEqual(10, len(queue))
+
+    def testNoSync(self):
+        self.assertEqual(0, self._countAppendSyncs(0, 10))
+
+    def testInvalidSettings(self):
+        self.assertRaises(TypeError, persistentPublishQueue, None, 0, 0)
+        self.assertRaises(ValueError, persistentPublishQueue, self._directory, -1, 0)
+        self.assertRaises(ValueError, persistentPublishQueue, self._directory, 0, 0, 2)
+        self.assertRaises(ValueError, persistentPublishQueue, self._directory, 0, 0, 1, None, 0)
+        self.assertRaises(ValueError, persistentPublishQueue, self._directory, 0, 0, 1, None, 1024, -1)
+
+
+if __name__ == "__main__":
+    unittest.main()
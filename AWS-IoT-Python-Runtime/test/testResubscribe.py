@@ -0,0 +1,118 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Resubscription after a reconnect: mqttCore._doResubscribe sends its subscribe pool as multi-topic SUBSCRIBEs
+# to a broker that can refuse topics (0x80) or drop whole SUBSCRIBEs, only the failed topics are sent again.
+
+import sys
+sys.path.append("../lib/")
+import time
+import threading
+import unittest
+from protocol.mqttCore import mqttCore
+from protocol.mqttCore import _publishRequest
+from protocol.paho.client import MQTTv311
+from util.logManager import logManager
+
+
+class _resubscribeBrokerClient:
+
+    def __init__(self, srcMQTTCore, srcRoundTripSecond):
+        self._mqttCore = srcMQTTCore
+        self._roundTripSecond = srcRoundTripSecond
+        self._lock = threading.Lock()
+        self._lastMid = 0
+        self.packetList = []  # Topics of each SUBSCRIBE, in the order they were sent
+        self.publishList = []
+        self.refusedTopicCount = dict()  # topic -> number of SUBSCRIBEs to refuse it in
+        self.droppedPacketCount = 0  # Number of SUBSCRIBEs to leave without a SUBACK
+
+    def subscribe(self, srcTopicQoSList):
+        self._lock.acquire()
+        self._lastMid += 1
+        mid = self._lastMid
+        self.packetList.append([topic for (topic, qos) in srcTopicQoSList])
+        grantedQoSList = []
+        for (topic, qos) in srcTopicQoSList:
+            if self.refusedTopicCount.get(topic, 0) > 0:
+                self.refusedTopicCount[topic] -= 1
+                grantedQoSList.append(0x80)
+            else:
+                grantedQoSList.append(qos)
+        isDropped = self.droppedPacketCount > 0
+        if isDropped:
+            self.droppedPacketCount -= 1
+        self._lock.release()
+        if not isDropped:
+            threading.Timer(self._roundTripSecond, self._mqttCore.on_subscribe, [self, None, mid, tuple(grantedQoSList)]).start()
+        return (0, mid)
+
+    def publish(self, srcTopic, srcPayload, srcQos, srcRetain):
+        self.publishList.append((srcTopic, srcPayload))
+        return (0, len(self.publishList))
+
+
+class resubscribeTest(unittest.TestCase):
+
+    def setUp(self):
+        self._log = logManager("resubscribeTest", "./")
+        self._log.disable()
+        self._mqttCore = mqttCore("resubscribeTest", True, MQTTv311, self._log, False)
+        self._mqttCore.setMQTTOperationTimeoutSecond(0.2)
+        self._mqttCore.setDrainingIntervalSecond(0.01)
+        self._broker = _resubscribeBrokerClient(self._mqttCore, 0.05)
+        self._mqttCore._pahoClient = self._broker
+        self._mqttCore._connectResultCode = 0  # Connected
+        for i in range(0, 20):
+            self._mqttCore._subscribePool["topic/" + str(i)] = (1, None)
+
+    def testPacketsInFlightTogether(self):
+        startTime = time.time()
+        self._mqttCore._doResubscribe()
+        self.assertTrue(time.time() - startTime < 3 * 0.05)
+        self.assertEqual([8, 8, 4], [len(packet) for packet in self._broker.packetList])
+        self.assertEqual(sorted(self._mqttCore._subscribePool.keys()), sorted(sum(self._broker.packetList, [])))
+
+    def testOnlyRefusedTopicsAreRetried(self):
+        self._broker.refusedTopicCount = {"topic/3": 1, "topic/11": 2}
+        self._mqttCore._doResubscribe()
+        self.assertEqual(5, len(self._broker.packetList))
+        self.assertEqual(sorted(["topic/3", "topic/11"]), sorted(self._broker.packetList[3]))
+        self.assertEqual(["topic/11"], self._broker.packetList[4])
+
+    def testMissingSubackRetriesTheWholePacket(self):
+        self._broker.droppedPacketCount = 1
+        self._mqttCore._doResubscribe()
+        self.assertEqual(4, len(self._broker.packetList))
+        self.assertEqual(self._broker.packetList[0], self._broker.packetList[3])
+
+    def testGiveUpAfterTheLastAttempt(self):
+        self._broker.refusedTopicCount = {"topic/5": 10}
+        self._mqttCore._doResubscribe()
+        self.assertEqual([["topic/5"]] * (mqttCore._MAXIMUM_RESUBSCRIBE_ATTEMPTS - 1), self._broker.packetList[3:])
+        # Left in the pool for the next reconnect
+        self.assertTrue("topic/5" in self._mqttCore._subscribePool)
+
+    def testQueuedPublishesAfterResubscription(self):
+        self._broker.refusedTopicCount = {"topic/5": 10}
+        self._mqttCore._offlinePublishQueue.append(_publishRequest("topic/queued", "payload", 0, False))
+        self._mqttCore._doResubscribe()
+        self.assertEqual([("topic/queued", "payload")], self._broker.publishList)
+
+
+if __name__ == "__main__":
+    unittest.main()
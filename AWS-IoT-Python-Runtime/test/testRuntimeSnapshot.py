@@ -0,0 +1,131 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Runtime snapshot: checkpoints written by one runtimeHub are taken back by the next one on the same file,
+# which then answers the sketch's setup replay without going to the broker.
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../runtime/")
+import os
+import shutil
+import tempfile
+import unittest
+from util.runtimeSnapshot import runtimeSnapshot
+from comm.streamTransport import streamTransport
+from runtimeHub import runtimeHub
+from simulatedBrokerClient import simulatedBrokerClient
+
+
+class runtimeSnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._filePath = os.path.join(self._directory, "runtime.snapshot")
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def testSaveAndLoad(self):
+        snapshot = runtimeSnapshot(self._filePath)
+        self.assertEqual(None, snapshot.load())
+        self.assertTrue(snapshot.save({"sessions": {"0": {"setup": {"i": ["client", "1", "4", "0"]}}}}))
+        # Unchanged state is not written again
+        self.assertFalse(snapshot.save({"sessions": {"0": {"setup": {"i": ["client", "1", "4", "0"]}}}}))
+        self.assertEqual(1, snapshot.getSaveCount())
+        self.assertFalse(os.path.exists(self._filePath + ".tmp"))
+        state = runtimeSnapshot(self._filePath).load()
+        self.assertEqual({"sessions": {"0": {"setup": {"i": ["client", "1", "4", "0"]}}}}, state)
+        self.assertTrue(isinstance(state["sessions"]["0"]["setup"]["i"][0], str))
+        snapshot.clear()
+        self.assertFalse(os.path.exists(self._filePath))
+
+    def testUnusableSnapshots(self):
+        for content in ['{"version":0,"state":{}}', '{"version":1,"state":[]}', '{"version":1', "[]"]:
+            snapshotFile = open(self._filePath, "w")
+            snapshotFile.write(content)
+            snapshotFile.close()
+            self.assertEqual(None, runtimeSnapshot(self._filePath).load())
+
+
+class runtimeHubSnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._filePath = os.path.join(self._directory, "runtime.snapshot")
+        self._fileDescriptorList = []
+
+    def tearDown(self):
+        for fileDescriptor in self._fileDescriptorList:
+            os.close(fileDescriptor)
+        shutil.rmtree(self._directory)
+
+    def _newHub(self):
+        readFileDescriptor, writeFileDescriptor = os.pipe()
+        self._fileDescriptorList += [readFileDescriptor, writeFileDescriptor]
+        return runtimeHub("runtimeSnapshotTest", "./", streamTransport(readFileDescriptor), self._filePath)
+
+    def _execute(self, srcHub, srcProtocolMessage):
+        srcHub._executeCommand(srcHub._findCommand(srcProtocolMessage))
+        return srcHub._serialCommunicationServerHub.takeInternalProtocol()
+
+    def testRestoreAfterRestart(self):
+        hub = self._newHub()
+        self.assertEqual("I T", self._execute(hub, ["i", "snapshotClient", "1", "4", "0"]))
+        self.assertEqual("BF T", self._execute(hub, ["bf", "1", "32", "20"]))
+        hub._mqttCoreHub._pahoClient = simulatedBrokerClient(hub._mqttCoreHub, 0)
+        self.assertEqual("S T", self._execute(hub, ["s", "topic/a", "1", "3"]))
+        self.assertEqual("S T", self._execute(hub, ["s", "topic/b", "0", "4"]))
+        self.assertEqual("U 4", self._execute(hub, ["u", "topic/b"]))
+        saveCount = hub.getSnapshotSaveCount()
+        # A failed command leaves the snapshot as it was
+        self.assertTrue(self._execute(hub, ["bf", "one", "32", "20"]).startswith("BF3F: "))
+        self.assertEqual(saveCount, hub.getSnapshotSaveCount())
+
+        restartedHub = self._newHub()
+        self.assertTrue(restartedHub._currentSession._isWarm)
+        self.assertEqual(["topic/a"], restartedHub._mqttSubscribeTable.keys())
+        self.assertEqual(3, restartedHub._mqttSubscribeTable["topic/a"].getSketchSlotNumber())
+        self.assertEqual(1, restartedHub._mqttCoreHub._subscribePool["topic/a"][0])
+        self.assertEqual({"i": ["snapshotClient", "1", "4", "0"], "bf": ["1", "32", "20"]}, restartedHub._currentSession._setupRecord)
+        # The sketch replays its setup, answered from the restored state
+        restoredMQTTCore = restartedHub._mqttCoreHub
+        self.assertEqual("I T", self._execute(restartedHub, ["i", "snapshotClient", "1", "4", "0"]))
+        self.assertTrue(restoredMQTTCore is restartedHub._mqttCoreHub)
+        self.assertEqual("S T", self._execute(restartedHub, ["s", "topic/a", "1", "6"]))
+        self.assertEqual(6, restartedHub._mqttSubscribeTable["topic/a"].getSketchSlotNumber())
+
+    def testOtherClientStartsOver(self):
+        hub = self._newHub()
+        self.assertEqual("I T", self._execute(hub, ["i", "snapshotClient", "1", "4", "0"]))
+        restartedHub = self._newHub()
+        restoredMQTTCore = restartedHub._mqttCoreHub
+        self.assertEqual("I T", self._execute(restartedHub, ["i", "otherClient", "1", "4", "0"]))
+        self.assertFalse(restoredMQTTCore is restartedHub._mqttCoreHub)
+        self.assertFalse(restartedHub._currentSession._isWarm)
+
+    def testNoSnapshotFile(self):
+        readFileDescriptor, writeFileDescriptor = os.pipe()
+        self._fileDescriptorList += [readFileDescriptor, writeFileDescriptor]
+        hub = runtimeHub("runtimeSnapshotTest", "./", streamTransport(readFileDescriptor))
+        self.assertEqual("I T", self._execute(hub, ["i", "snapshotClient", "1", "4", "0"]))
+        self.assertEqual(0, hub.getSnapshotSaveCount())
+        self.assertFalse(os.path.exists(self._filePath))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Named MQTT client sessions in one runtimeHub: "ss" selects the session the following commands go to,
+# each session has its own mqttCore (running against its own simulatedBrokerClient) and its own tables.
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../runtime/")
+import os
+import unittest
+from runtimeHub import runtimeHub
+from comm.streamTransport import streamTransport
+from simulatedBrokerClient import simulatedBrokerClient
+
+
+class sessionsTest(unittest.TestCase):
+
+    def setUp(self):
+        self._readFileDescriptor, self._writeFileDescriptor = os.pipe()
+        self._hub = runtimeHub("sessionsTest", "./", streamTransport(self._readFileDescriptor))
+        self._server = self._hub._serialCommunicationServerHub
+
+    def tearDown(self):
+        os.close(self._readFileDescriptor)
+        os.close(self._writeFileDescriptor)
+
+    def _execute(self, srcProtocolMessage):
+        self._hub._executeCommand(self._hub._findCommand(srcProtocolMessage))
+        return self._server.takeInternalProtocol()
+
+    def _initSession(self, srcSessionID, srcNumberOfSessions):
+        self.assertEqual("SS T " + str(srcNumberOfSessions), self._execute(["ss", srcSessionID]))
+        self.assertEqual("I T", self._execute(["i", "client" + srcSessionID, "1", "4", "0"]))
+        ret = simulatedBrokerClient(self._hub._mqttCoreHub, 0)
+        self._hub._mqttCoreHub._pahoClient = ret
+        return ret
+
+    def testDefaultSession(self):
+        self.assertEqual("0", self._hub.getCurrentSessionID())
+        self.assertEqual(1, self._hub.getSessionCount())
+
+    def testCommandsGoToTheSelectedSession(self):
+        firstBroker = self._initSession("0", 1)
+        secondBroker = self._initSession("second", 2)
+        self.assertEqual("S T", self._execute(["s", "topic/second", "1", "2"]))
+        self.assertEqual("SS T 2", self._execute(["ss", "0"]))
+        self.assertEqual("S T", self._execute(["s", "topic/first", "1", "1"]))
+        self.assertEqual("U 1", self._execute(["u", "topic/first"]))
+        self.assertEqual([("s", "topic/first"), ("u", "topic/first")], firstBroker.getRequests())
+        self.assertEqual([("s", "topic/second")], secondBroker.getRequests())
+        self.assertEqual({}, self._hub._mqttSubscribeTable)
+        self.assertEqual(["topic/second"], self._hub._mqttSessionTable["second"]._mqttSubscribeTable.keys())
+        self.assertFalse(self._hub._mqttSessionTable["0"]._mqttCoreHub is self._hub._mqttSessionTable["second"]._mqttCoreHub)
+
+    def testKeptCommandsFollowTheSession(self):
+        self._initSession("0", 1)
+        firstPublish = self._hub._findCommand(["p", "topic", "payload", "0", "0"])
+        self._execute(["ss", "second"])
+        secondPublish = self._hub._findCommand(["p", "topic", "payload", "0", "0"])
+        self.assertFalse(firstPublish is secondPublish)
+        self.assertTrue(secondPublish._mqttCoreHandler is None)
+        self.assertEqual("P1F: No setup.", self._execute(["p", "topic", "payload", "0", "0"]))
+
+    def testDeltasStayInTheirSession(self):
+        self._execute(["ss", "second"])
+        self._hub._mqttSessionTable["0"]._shadowSubscribeRecord["thing"] = 1
+        self._hub._mqttSessionTable["second"]._shadowSubscribeRecord["thing"] = 2
+        self._hub._mqttSessionTable["0"]._shadowCallback('{"state":{"a":1}}', "delta/thing", None)
+        scheduler = self._server.getYieldScheduler()
+        scheduler.lockSize()
+        self.assertEqual(1, scheduler.getLocked()[0])
+        self.assertEqual(None, scheduler.getLocked())
+
+    def testSessionInBatch(self):
+        self._initSession("0", 1)
+        batchCommand = self._hub._findCommand(["b", "2", "1", "ss", "other", "4", "p", "topic", "payload", "0", "0"])
+        self._hub._executeCommand(batchCommand)
+        self._hub._executeBatch(batchCommand)
+        self.assertEqual("B 2 6:SS T 214:P1F: No setup.", self._server.takeInternalProtocol())
+        self.assertEqual("other", self._hub.getCurrentSessionID())
+
+    def testInvalidSessionID(self):
+        self.assertEqual("SS2F: Invalid session id.", self._execute(["ss", ""]))
+        self.assertEqual("SS1F: No setup.", self._execute(["ss"]))
+        self.assertEqual(1, self._hub.getSessionCount())
+
+
+if __name__ == "__main__":
+    unittest.main()
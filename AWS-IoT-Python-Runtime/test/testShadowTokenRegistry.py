@@ -0,0 +1,122 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Shadow token registry: the request side and the response side meet in either order, orphans on
+# either side are dropped after their timeout. The runtimeHub part feeds responses through _shadowCallback.
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../runtime/")
+import os
+import time
+import unittest
+from shadow.shadowTokenRegistry import shadowTokenRegistry
+from comm.streamTransport import streamTransport
+from runtimeHub import runtimeHub
+
+
+class shadowTokenRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._deliveries = []
+        self._registry = shadowTokenRegistry(self._deliver)
+
+    def _deliver(self, srcSketchSlotNumber, srcResponse):
+        self._deliveries.append((srcSketchSlotNumber, srcResponse))
+
+    def testRegisterFirst(self):
+        self._registry.register("token1", 3)
+        self.assertEqual([], self._deliveries)
+        self.assertEqual((1, 0), self._registry.getPendingCount())
+        self._registry.resolve("token1", "accepted")
+        self.assertEqual([(3, "accepted")], self._deliveries)
+        self.assertEqual((0, 0), self._registry.getPendingCount())
+
+    def testResponseFirst(self):
+        self._registry.resolve("token1", "accepted")
+        self.assertEqual((0, 1), self._registry.getPendingCount())
+        self._registry.register("token1", 3)
+        self.assertEqual([(3, "accepted")], self._deliveries)
+        self.assertEqual((0, 0), self._registry.getPendingCount())
+
+    def testTokensAreMatchedOnlyOnce(self):
+        self._registry.register("token1", 1)
+        self._registry.register("token2", 2)
+        self._registry.resolve("token2", "b")
+        self._registry.resolve("token1", "a")
+        self._registry.resolve("token1", "again")
+        self.assertEqual([(2, "b"), (1, "a")], self._deliveries)
+        self.assertEqual((0, 1), self._registry.getPendingCount())
+
+    def testOrphansAreDropped(self):
+        self._registry = shadowTokenRegistry(self._deliver, 0.01, 0.01)
+        self._registry.resolve("neverRegistered", "accepted")
+        self._registry.register("neverResolved", 1)
+        time.sleep(0.02)
+        # Any token coming or going cleans up
+        self._registry.register("token", 2)
+        self.assertEqual((1, 0), self._registry.getPendingCount())
+        self.assertEqual(2, self._registry.getOrphanCount())
+        self._registry.resolve("neverRegistered", "late")
+        self.assertEqual([], self._deliveries)
+
+    def testSweepWithoutNewTokens(self):
+        self._registry = shadowTokenRegistry(self._deliver, 0.01, 0.01)
+        self._registry.resolve("neverRegistered", "accepted")
+        self._registry.register("neverResolved", 1)
+        self._registry.sweepOrphans()
+        self.assertEqual((1, 1), self._registry.getPendingCount())
+        time.sleep(0.02)
+        self._registry.sweepOrphans()
+        self.assertEqual((0, 0), self._registry.getPendingCount())
+        self.assertEqual(2, self._registry.getOrphanCount())
+
+
+class runtimeHubShadowResponseTest(unittest.TestCase):
+
+    def setUp(self):
+        self._readFileDescriptor, self._writeFileDescriptor = os.pipe()
+        self._hub = runtimeHub("shadowTokenRegistryTest", "./", streamTransport(self._readFileDescriptor))
+        self._scheduler = self._hub._serialCommunicationServerHub.getYieldScheduler()
+
+    def tearDown(self):
+        os.close(self._readFileDescriptor)
+        os.close(self._writeFileDescriptor)
+
+    def testSweepRunsAsHousekeeping(self):
+        server = self._hub._serialCommunicationServerHub
+        self.assertTrue(self._hub._shadowTokenRegistryHub.sweepOrphans in server._housekeepingTaskList)
+        self.assertEqual(1, server._housekeepingInterval)
+
+    def testResponsesReachTheirSlot(self):
+        tokenRegistry = self._hub._shadowTokenRegistryHub
+        # Response before the request side recorded the slot, the callback does not wait
+        self._hub._currentSession._shadowCallback('{"state":{}}', "accepted", "token1")
+        self.assertEqual(0, self._scheduler.qsize())
+        tokenRegistry.register("token2", 5)
+        self._hub._currentSession._shadowCallback("REQUEST TIME OUT", "timeout", "token2")
+        self.assertEqual(1, self._scheduler.qsize())
+        tokenRegistry.register("token1", 4)
+        self.assertEqual(2, self._scheduler.qsize())
+        # Shadow responses are served before timeouts
+        self._scheduler.lockSize()
+        self.assertEqual(4, self._scheduler.getLocked()[0])
+        self.assertEqual(5, self._scheduler.getLocked()[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
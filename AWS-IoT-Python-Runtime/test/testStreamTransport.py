@@ -0,0 +1,116 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Transports: a remote client talks to runtimeHub.run() over a UNIX domain socket, TCP and a pty,
+# using the line protocol the sketch uses on stdin/stdout.
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../runtime/")
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import tty
+import unittest
+from comm.streamTransport import *
+from runtimeHub import runtimeHub
+
+
+class streamTransportTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._threadList = []
+
+    def tearDown(self):
+        for thread in self._threadList:
+            thread.join(5)
+        shutil.rmtree(self._directory)
+
+    def _serve(self, srcTransport):
+        def _run():
+            try:
+                runtimeHub("streamTransportTest", "./", srcTransport).run()
+            finally:
+                srcTransport.close()
+        thread = threading.Thread(target=_run)
+        thread.daemon = True
+        thread.start()
+        self._threadList.append(thread)
+
+    def _request(self, srcFile, srcProtocolMessage):
+        srcFile.write(str(len(srcProtocolMessage)) + "\n" + "".join([parameter + "\n" for parameter in srcProtocolMessage]))
+        srcFile.flush()
+        return srcFile.readline()
+
+    def _exit(self, srcFile):
+        srcFile.write("1\n~\n")
+        srcFile.flush()
+        self.assertEqual("", srcFile.readline())  # Runtime closed the transport
+
+    def testUnixSocketClientsAreIndependent(self):
+        address = os.path.join(self._directory, "runtime.sock")
+        listener = socketListener(address)
+        fileList = []
+        for i in range(0, 2):
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client.connect(address)
+            self._serve(listener.acceptTransport())
+            fileList.append(client.makefile("rwb", 0))
+            client.close()
+        # Each client has its own serialCommunicationServer
+        self.assertEqual("CS T 31 31\n", self._request(fileList[0], ["cs", "32", "0", "0"]))
+        self.assertEqual("CS T 63 63\n", self._request(fileList[1], ["cs", "64", "0", "0"]))
+        self.assertEqual("CS T 31 24\n", self._request(fileList[0], ["cs", "32", "0", "24"]))
+        for clientFile in fileList:
+            self._exit(clientFile)
+        listener.close()
+        self.assertFalse(os.path.exists(address))
+
+    def testTCP(self):
+        listener = socketListener(("127.0.0.1", 0))
+        client = socket.create_connection(listener.getAddress())
+        transport = listener.acceptTransport()
+        self.assertTrue(transport.getName().startswith("socket:"))
+        self.assertFalse(transport.isTerminal())
+        self._serve(transport)
+        clientFile = client.makefile("rwb", 0)
+        client.close()
+        self.assertEqual("YQ T\n", self._request(clientFile, ["yq", "10", "0", "0", "0"]))
+        self.assertEqual("CS T 40 40\n", self._request(clientFile, ["cs", "128", "40", "40"]))
+        self._exit(clientFile)
+        listener.close()
+
+    def testPty(self):
+        transport = ptyTransport()
+        self.assertTrue(transport.isTerminal())
+        slaveFileDescriptor = os.open(transport.getSlaveName(), os.O_RDWR | os.O_NOCTTY)
+        tty.setraw(slaveFileDescriptor)  # Like any serial client, no echo and no CR/LF translation
+        self._serve(transport)
+        clientFile = os.fdopen(slaveFileDescriptor, "r+b", 0)
+        self.assertEqual("CS T 50 50\n", self._request(clientFile, ["cs", "51", "0", "0"]))
+        clientFile.write("1\n~\n")
+        clientFile.flush()
+        self._threadList[0].join(5)
+        self.assertFalse(self._threadList[0].isAlive())
+        clientFile.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
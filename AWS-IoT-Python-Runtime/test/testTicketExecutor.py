@@ -0,0 +1,158 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# ticketExecutor on its own: ticket ids, submission order, failed tasks and pipelined tasks, with plain callables as tasks.
+
+import sys
+sys.path.append("../lib/")
+import threading
+import time
+import unittest
+from util.ticketExecutor import ticketExecutor
+
+
+class ticketExecutorTest(unittest.TestCase):
+
+    _TIMEOUT_SECOND = 5
+
+    def setUp(self):
+        self._completionLock = threading.Lock()
+        self._completions = []
+        self._executor = ticketExecutor(self._complete)
+
+    def _complete(self, srcTicketID, srcReply):
+        self._completionLock.acquire()
+        self._completions.append((srcTicketID, srcReply))
+        self._completionLock.release()
+
+    def _waitForCompletions(self, srcCount):
+        startTime = time.time()
+        while len(self._completions) < srcCount:
+            self.assertTrue(time.time() - startTime < self._TIMEOUT_SECOND)
+            time.sleep(0.001)
+        return list(self._completions)
+
+    def _blockingTask(self, srcEvent, srcReply, srcStartedList=None):
+        def task():
+            if srcStartedList is not None:
+                srcStartedList.append(srcReply)
+            srcEvent.wait(self._TIMEOUT_SECOND)
+            return srcReply
+        return task
+
+    def testTicketIDs(self):
+        self.assertEqual([1, 2, 3], [self._executor.submit(lambda: None) for i in range(0, 3)])
+        self._executor._lastTicketID = ticketExecutor._MAXIMUM_TICKET_ID - 1
+        self.assertEqual([ticketExecutor._MAXIMUM_TICKET_ID, 1], [self._executor.submit(lambda: None) for i in range(0, 2)])
+
+    def testSubmissionOrder(self):
+        releaseEvent = threading.Event()
+        self._executor.submit(self._blockingTask(releaseEvent, "connect"))
+        for i in range(0, 20):
+            self._executor.submit(lambda i=i: "task%d" % i)
+        self.assertEqual(21, self._executor.getPendingCount())
+        releaseEvent.set()
+        completions = self._waitForCompletions(21)
+        self.assertEqual(range(1, 22), [ticketID for (ticketID, reply) in completions])
+        self.assertEqual(["connect"] + ["task%d" % i for i in range(0, 20)], [reply for (ticketID, reply) in completions])
+        self.assertEqual(0, self._executor.getPendingCount())
+
+    def testFailedTaskRepliesNone(self):
+        self._executor.submit(lambda: 1 / 0)
+        self._executor.submit(lambda: "next")
+        self.assertEqual([(1, None), (2, "next")], self._waitForCompletions(2))
+
+    def testPipelinedTasksCompleteOutOfOrder(self):
+        releaseEvent = threading.Event()
+        self._executor.submit(self._blockingTask(releaseEvent, "slow"), "topic/a")
+        self._executor.submit(lambda: "fast", "topic/b")
+        self.assertEqual([(2, "fast")], self._waitForCompletions(1))
+        releaseEvent.set()
+        self.assertEqual((1, "slow"), self._waitForCompletions(2)[1])
+
+    def testSameKeyRunsInOrder(self):
+        releaseEvent = threading.Event()
+        self._executor.submit(self._blockingTask(releaseEvent, "subscribe"), "topic/a")
+        self._executor.submit(lambda: "unsubscribe", "topic/a")
+        self._executor.submit(lambda: "other", "topic/b")
+        self.assertEqual([(3, "other")], self._waitForCompletions(1))
+        time.sleep(0.05)
+        self.assertEqual(1, len(self._completions))
+        releaseEvent.set()
+        self.assertEqual([(1, "subscribe"), (2, "unsubscribe")], self._waitForCompletions(3)[1:])
+        self.assertEqual(0, self._executor.getPendingCount())
+
+    def testSameKeyTakesNoExtraPlace(self):
+        releaseEvent = threading.Event()
+        startedList = []
+        for i in range(0, ticketExecutor._MAXIMUM_PIPELINED_TASKS):
+            self._executor.submit(self._blockingTask(releaseEvent, i, startedList), "topic/%d" % i)
+        # Queued behind the running task for its key, the next key still waits for a free place
+        self._executor.submit(lambda: "again", "topic/0")
+        self._executor.submit(lambda: "last", "topic/last")
+        time.sleep(0.05)
+        self.assertEqual([], self._completions)
+        releaseEvent.set()
+        completions = self._waitForCompletions(ticketExecutor._MAXIMUM_PIPELINED_TASKS + 2)
+        replyList = [reply for (ticketID, reply) in completions]
+        self.assertTrue(replyList.index(0) < replyList.index("again"))
+        self.assertEqual(0, self._executor.getPendingCount())
+
+    def testTaskWaitsForThePipelinedTasksBeforeIt(self):
+        releaseEvent = threading.Event()
+        self._executor.submit(self._blockingTask(releaseEvent, "subscribe"), "topic")
+        self._executor.submit(lambda: "publish")
+        time.sleep(0.05)
+        self.assertEqual([], self._completions)
+        releaseEvent.set()
+        self.assertEqual([(1, "subscribe"), (2, "publish")], self._waitForCompletions(2))
+
+    def testPipelinedTaskWaitsForTheTaskBeforeIt(self):
+        releaseEvent = threading.Event()
+        self._executor.submit(self._blockingTask(releaseEvent, "connect"))
+        self._executor.submit(lambda: "subscribe", "topic")
+        time.sleep(0.05)
+        self.assertEqual([], self._completions)
+        releaseEvent.set()
+        self.assertEqual([(1, "connect"), (2, "subscribe")], self._waitForCompletions(2))
+
+    def testPipelineLimit(self):
+        releaseEvent = threading.Event()
+        startedList = []
+        numberOfTasks = ticketExecutor._MAXIMUM_PIPELINED_TASKS + 2
+        for i in range(0, numberOfTasks):
+            self._executor.submit(self._blockingTask(releaseEvent, i, startedList), "topic/%d" % i)
+        startTime = time.time()
+        while len(startedList) < ticketExecutor._MAXIMUM_PIPELINED_TASKS:
+            self.assertTrue(time.time() - startTime < self._TIMEOUT_SECOND)
+            time.sleep(0.001)
+        time.sleep(0.05)
+        self.assertEqual(ticketExecutor._MAXIMUM_PIPELINED_TASKS, len(startedList))
+        releaseEvent.set()
+        self.assertEqual(numberOfTasks, len(self._waitForCompletions(numberOfTasks)))
+
+    def testAsyncMode(self):
+        self.assertFalse(self._executor.isEnabled())
+        self._executor.setAsyncMode(True, 3)
+        self.assertTrue(self._executor.isEnabled())
+        self.assertEqual(3, self._executor.getCompletionSlotNumber())
+        self.assertRaises(ValueError, self._executor.setAsyncMode, True, -1)
+        self.assertRaises(TypeError, self._executor.setAsyncMode, 1, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
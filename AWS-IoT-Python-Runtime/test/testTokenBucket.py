@@ -0,0 +1,191 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Token bucket on a fake clock, then the publish rate limit of mqttCore with paho's publish replaced
+# by a recorder, for live publish requests and for the draining of queued ones.
+
+import sys
+sys.path.append("../lib/")
+import time
+import unittest
+import util.tokenBucket
+from util.tokenBucket import tokenBucket
+from util.logManager import logManager
+from util.offlinePublishQueue import offlinePublishQueue
+from protocol.mqttCore import mqttCore
+from protocol.mqttCore import _publishRequest
+from protocol.paho.client import MQTTv311
+
+
+# Stands in for the time module of tokenBucket, sleeping moves the clock forward
+class _fakeClock:
+    def __init__(self):
+        self.currentTime = 1000.0
+        self.sleepTimes = []
+
+    def time(self):
+        return self.currentTime
+
+    def sleep(self, srcSecond):
+        self.sleepTimes.append(srcSecond)
+        self.currentTime += srcSecond
+
+
+class tokenBucketTest(unittest.TestCase):
+
+    def setUp(self):
+        self._clock = _fakeClock()
+        util.tokenBucket.time = self._clock
+
+    def tearDown(self):
+        util.tokenBucket.time = time
+
+    def testNoLimit(self):
+        bucket = tokenBucket()
+        self.assertFalse(bucket.isLimited())
+        for i in range(0, 100):
+            self.assertEqual(0.0, bucket.reserve())
+            self.assertTrue(bucket.tryAcquire())
+
+    def testBurstThenRate(self):
+        bucket = tokenBucket(10, 3)
+        for i in range(0, 3):
+            self.assertEqual(0.0, bucket.reserve())
+        self.assertAlmostEqual(0.1, bucket.reserve())
+        self.assertAlmostEqual(0.2, bucket.reserve())
+
+    def testAcquireSleepsForItsTurn(self):
+        bucket = tokenBucket(4, 1)
+        for i in range(0, 5):
+            bucket.acquire()
+        self.assertEqual([0.25] * 4, self._clock.sleepTimes)
+        self.assertAlmostEqual(1001.0, self._clock.currentTime)
+
+    def testRefillIsCappedAtBurst(self):
+        bucket = tokenBucket(10, 2)
+        bucket.reserve()
+        bucket.reserve()
+        self._clock.currentTime += 60
+        self.assertEqual(0.0, bucket.reserve())
+        self.assertEqual(0.0, bucket.reserve())
+        self.assertAlmostEqual(0.1, bucket.reserve())
+
+    def testTryAcquire(self):
+        bucket = tokenBucket(2, 2)
+        self.assertTrue(bucket.tryAcquire())
+        self.assertTrue(bucket.tryAcquire())
+        self.assertFalse(bucket.tryAcquire())
+        self._clock.currentTime += 0.25
+        self.assertFalse(bucket.tryAcquire())
+        self._clock.currentTime += 0.25
+        self.assertTrue(bucket.tryAcquire())
+        self.assertEqual([], self._clock.sleepTimes)
+
+    def testClockSetBackwards(self):
+        bucket = tokenBucket(10, 1)
+        bucket.reserve()
+        self._clock.currentTime -= 3600
+        self.assertAlmostEqual(0.1, bucket.reserve())
+
+    def testSetRateRefills(self):
+        bucket = tokenBucket(1, 1)
+        bucket.reserve()
+        bucket.setRate(5, 2)
+        self.assertEqual(5, bucket.getRatePerSecond())
+        self.assertEqual(2, bucket.getBurst())
+        self.assertTrue(bucket.tryAcquire())
+        self.assertTrue(bucket.tryAcquire())
+        self.assertFalse(bucket.tryAcquire())
+
+    def testInvalidRate(self):
+        bucket = tokenBucket()
+        self.assertRaises(ValueError, bucket.setRate, -1, 1)
+        self.assertRaises(ValueError, bucket.setRate, 1, 0)
+        self.assertRaises(TypeError, bucket.setRate, "1", 1)
+        self.assertRaises(TypeError, bucket.setRate, 1, 1.5)
+
+
+class publishRateLimitTest(unittest.TestCase):
+
+    def setUp(self):
+        log = logManager("publishRateLimitTest", "./")
+        log.disable()
+        self._publishedList = []
+        self._core = mqttCore("publishRateLimitTest", True, MQTTv311, log)
+        self._core._offlinePublishQueue = offlinePublishQueue(0)
+        self._core._pahoClient.publish = lambda topic, payload, qos, retain: (self._publishedList.append(payload), (0, 1))[1]
+        self._core._connectResultCode = 0  # Connected
+
+    def testThrottledPublishIsQueued(self):
+        self._core.setPublishRateLimit(20, 2)
+        startTime = time.time()
+        for i in range(0, 6):
+            self._core.publish("topic", "m%d" % i, 1, False)
+        # Over the limit, the caller did not wait for tokens
+        self.assertTrue(time.time() - startTime < 0.1)
+        self.assertEqual(["m0", "m1"], self._publishedList[:2])
+        while not self._core._drainingComplete:
+            self.assertTrue(time.time() - startTime < 5)
+            time.sleep(0.01)
+        self.assertEqual(["m%d" % i for i in range(0, 6)], self._publishedList)
+        self.assertEqual(6, self._core.getPublishStatistics()[0])
+        self.assertTrue(self._core._drainingComplete)
+
+    def testOneDrainingAtATime(self):
+        drainingList = []
+        originalDraining = self._core._doPublishDraining
+
+        def countedDraining():
+            drainingList.append(1)
+            originalDraining()
+        self._core._doPublishDraining = countedDraining
+        self._core.setPublishRateLimit(20, 1)
+        for i in range(0, 4):
+            self._core.publish("topic", "m%d" % i, 1, False)
+        # Reconnect while the throttled requests are being drained
+        self._core.on_connect(None, None, None, 0)
+        self._core.on_connect(None, None, None, 0)
+        startTime = time.time()
+        while not self._core._drainingComplete:
+            self.assertTrue(time.time() - startTime < 5)
+            time.sleep(0.01)
+        self.assertEqual(1, len(drainingList))
+        self.assertEqual(["m%d" % i for i in range(0, 4)], self._publishedList)
+        self.assertFalse(self._core._isDraining)
+
+    def testDrainingIsPaced(self):
+        self._core.setPublishRateLimit(20, 1)
+        self._core.setDrainingIntervalSecond(10)
+        for i in range(0, 5):
+            self._core._offlinePublishQueue.append(_publishRequest("topic", "m%d" % i, 1, False))
+        startTime = time.time()
+        self._core._doPublishDraining()
+        # Paced by the rate limit, not by the draining interval
+        self.assertTrue(0.15 <= time.time() - startTime < 5)
+        self.assertEqual(["m%d" % i for i in range(0, 5)], self._publishedList)
+        self.assertEqual(5, self._core.getPublishStatistics()[0])
+        self.assertTrue(self._core._drainingComplete)
+
+    def testNoLimit(self):
+        for i in range(0, 6):
+            self._core.publish("topic", "m%d" % i, 1, False)
+        self.assertEqual(["m%d" % i for i in range(0, 6)], self._publishedList)
+        self.assertEqual(0, len(self._core._offlinePublishQueue))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Burst yield through runtimeHub: error replies of "yb", then one burst written to the remote client
+# with as many whole chunks as fit and its terminator.
+
+import sys
+sys.path.append("../lib/")
+sys.path.append("../runtime/")
+import os
+import unittest
+from StringIO import StringIO
+from runtimeHub import runtimeHub
+from comm.streamTransport import streamTransport
+
+
+class yieldBurstTest(unittest.TestCase):
+
+    def setUp(self):
+        self._readFileDescriptor, self._writeFileDescriptor = os.pipe()
+        self._outputFile = StringIO()
+        self._hub = runtimeHub("yieldBurstTest", "./", streamTransport(self._readFileDescriptor, self._outputFile))
+        self._server = self._hub._serialCommunicationServerHub
+
+    def tearDown(self):
+        os.close(self._readFileDescriptor)
+        os.close(self._writeFileDescriptor)
+
+    def _execute(self, srcProtocolMessage):
+        currentCommand = self._hub._findCommand(srcProtocolMessage)
+        self._hub._executeCommand(currentCommand)
+        return currentCommand, self._server.takeInternalProtocol()
+
+    def testInvalidBufferSize(self):
+        self.assertEqual("YB3F: Invalid buffer size.", self._execute(["yb", "big"])[1])
+        self.assertEqual("YB3F: Invalid buffer size.", self._execute(["yb", ""])[1])
+
+    def testBufferTooSmall(self):
+        minimumBufferSize = self._server.getMinimumYieldBurstBufferSize()
+        self.assertEqual("YB2F: Buffer too small.", self._execute(["yb", str(minimumBufferSize - 1)])[1])
+        currentCommand, reply = self._execute(["yb", str(minimumBufferSize)])
+        self.assertEqual(None, reply)
+        self.assertEqual(minimumBufferSize, currentCommand.getBufferSize())
+
+    def testInvalidInformation(self):
+        self.assertEqual("YB1F: Invalid information.", self._execute(["yb"])[1])
+
+    def testBurst(self):
+        for i in range(0, 3):
+            self._server.writeToInternalYield(i, "payload%d" % i)
+        self._server.updateLockedQueueSize()
+        currentCommand, reply = self._execute(["yb", "1024"])
+        self.assertEqual(None, reply)
+        self._server.writeToExternalYieldBurst(currentCommand.getBufferSize())
+        self.assertEqual("Y 0 0 payload0\nY 1 0 payload1\nY 2 0 payload2\nY E 0 0\n", self._outputFile.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
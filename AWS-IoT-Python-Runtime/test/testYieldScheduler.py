@@ -0,0 +1,127 @@
+'''
+/*
+ * Copyright 2010-2016 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License").
+ * You may not use this file except in compliance with the License.
+ * A copy of the License is located at
+ *
+ *  http://aws.amazon.com/apache2.0
+ *
+ * or in the "license" file accompanying this file. This file is distributed
+ * on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+ * express or implied. See the License for the specific language governing
+ * permissions and limitations under the License.
+ */
+ '''
+
+# Yield queue bounds: records are put with their message class and read back through lockSize()/getLocked()
+# the way serialCommunicationServer serves yield requests, drops are checked per sketch slot.
+
+import sys
+sys.path.append("../lib/")
+import unittest
+from comm.yieldScheduler import yieldScheduler
+
+
+class yieldSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._scheduler = yieldScheduler()
+
+    def _drain(self):
+        ret = []
+        self._scheduler.lockSize()
+        record = self._scheduler.getLocked()
+        while record is not None:
+            ret.append(record)
+            record = self._scheduler.getLocked()
+        return ret
+
+    def testUnbounded(self):
+        for i in range(0, 100):
+            self.assertTrue(self._scheduler.put((1, "m%d" % i)))
+        self.assertEqual(100, self._scheduler.qsize())
+        self.assertEqual([(1, "m%d" % i) for i in range(0, 100)], self._drain())
+        self.assertEqual({}, self._scheduler.getDropCounts())
+
+    def testDropOldestBySize(self):
+        self._scheduler.setQueueing(3, 0, 0)
+        for i in range(0, 5):
+            self.assertTrue(self._scheduler.put((1, "m%d" % i)))
+        self.assertEqual([(1, "m2"), (1, "m3"), (1, "m4")], self._drain())
+        self.assertEqual({1: 2}, self._scheduler.getDropCounts())
+
+    def testDropOldestTakesTheLowestPriorityLane(self):
+        self._scheduler.setQueueing(2, 0, 0)
+        self._scheduler.put((1, "response"), yieldScheduler.CLASS_SHADOW_RESPONSE)
+        self._scheduler.put((2, "sub"), yieldScheduler.CLASS_SUBSCRIPTION)
+        self._scheduler.put((3, "delta"), yieldScheduler.CLASS_DELTA)
+        self.assertEqual([(1, "response"), (3, "delta")], self._drain())
+        self.assertEqual({2: 1}, self._scheduler.getDropCounts())
+
+    def testDropNewest(self):
+        self._scheduler.setQueueing(2, 0, 1)
+        self.assertTrue(self._scheduler.put((1, "a")))
+        self.assertTrue(self._scheduler.put((1, "b")))
+        self.assertFalse(self._scheduler.put((2, "c")))
+        self.assertEqual([(1, "a"), (1, "b")], self._drain())
+        self.assertEqual({2: 1}, self._scheduler.getDropCounts())
+
+    def testDropByBytes(self):
+        self._scheduler.setQueueing(0, 10, 0)
+        self.assertTrue(self._scheduler.put((1, "aaaa")))
+        self.assertTrue(self._scheduler.put((1, "bbbb")))
+        self.assertTrue(self._scheduler.put((1, "cccc")))
+        self.assertEqual(8, self._scheduler.getBytes())
+        self.assertEqual([(1, "bbbb"), (1, "cccc")], self._drain())
+        self.assertEqual(0, self._scheduler.getBytes())
+        # Larger than the limit on its own
+        self.assertTrue(self._scheduler.put((1, "aaaa")))
+        self.assertFalse(self._scheduler.put((1, "x" * 11)))
+        self.assertEqual([(1, "aaaa")], self._drain())
+
+    def testDropNewestByBytes(self):
+        self._scheduler.setQueueing(0, 10, 1)
+        self.assertTrue(self._scheduler.put((1, "aaaaaa")))
+        self.assertFalse(self._scheduler.put((1, "bbbbbb")))
+        self.assertTrue(self._scheduler.put((1, "cccc")))
+        self.assertEqual([(1, "aaaaaa"), (1, "cccc")], self._drain())
+
+    def testSlotQuota(self):
+        self._scheduler.setQueueing(0, 0, 2, 2)
+        for i in range(0, 4):
+            self._scheduler.put((1, "a%d" % i))
+        self._scheduler.put((2, "b0"))
+        self.assertEqual([(1, "a2"), (1, "a3"), (2, "b0")], self._drain())
+        self.assertEqual({1: 2}, self._scheduler.getDropCounts())
+
+    def testSlotQuotaFullQueueDropsTheBusiestSlot(self):
+        self._scheduler.setQueueing(3, 0, 2, 5)
+        self._scheduler.put((1, "a0"))
+        self._scheduler.put((1, "a1"))
+        self._scheduler.put((2, "b0"))
+        self.assertTrue(self._scheduler.put((3, "c0")))
+        self.assertEqual([(1, "a1"), (2, "b0"), (3, "c0")], self._drain())
+        self.assertEqual({1: 1}, self._scheduler.getDropCounts())
+
+    def testDropLockedRecord(self):
+        self._scheduler.setQueueing(2, 0, 0)
+        self._scheduler.put((1, "a"))
+        self._scheduler.put((1, "b"))
+        self.assertEqual(2, self._scheduler.lockSize())
+        self._scheduler.put((1, "c"))
+        self.assertEqual(1, self._scheduler.getLockedSize())
+        self.assertEqual((1, "b"), self._scheduler.getLocked())
+        # Arrived after the lock
+        self.assertEqual(None, self._scheduler.getLocked())
+        self.assertEqual([(1, "c")], self._drain())
+
+    def testInvalidQueueing(self):
+        self.assertRaises(ValueError, self._scheduler.setQueueing, -1, 0)
+        self.assertRaises(ValueError, self._scheduler.setQueueing, 0, 0, 3)
+        self.assertRaises(TypeError, self._scheduler.setQueueing, "1", 0)
+
+
+if __name__ == "__main__":
+    unittest.main()